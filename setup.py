@@ -9,7 +9,12 @@ setup(
         version='0.1',
         author=u'Vytautas Astrauskas'.encode('utf-8'),
         author_email=u'vastrauskas@gmail.com'.encode('utf-8'),
-        packages=['nmadb_academics',],
+        packages=[
+            'nmadb_academics',
+            'nmadb_academics.management',
+            'nmadb_academics.management.commands',
+            'nmadb_academics.migrations',
+            ],
         package_dir={'': 'src'},
         #package_data={'nmadb_academics': []},
                                         # List of data files to be included 
@@ -19,6 +24,7 @@ setup(
             ],
         install_requires=[              # Dependencies for the package.
             'nmadb_students',
+            'xlrd',
             ],
         scripts=[],                     # List of python script files.
         #data_files=[('/etc/init.d', ['init-script'])]
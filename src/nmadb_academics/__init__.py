@@ -1 +1,4 @@
 #!/usr/bin/python
+
+
+default_app_config = 'nmadb_academics.apps.AcademicsConfig'
@@ -1,10 +1,15 @@
-import datetime
-
-from django.contrib import admin
-from django.db import models as django_models
+import functools
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.core import urlresolvers
+from django.db.models.query import prefetch_related_objects
+from django.forms.models import BaseInlineFormSet
 from django.utils.translation import ugettext as _
 
-from nmadb_academics import models
+from nmadb_academics import exporting, leaving, models, queries, search
 from nmadb_students import models as students_models
 from nmadb_students import admin as students_admin
 from nmadb_utils import admin as utils
@@ -33,18 +38,122 @@ class AcademicInline(admin.StackedInline):
     extra = 0
 
 
+class AchievementInlineFormSet(BaseInlineFormSet):
+    """ Formset, whose forms share academic choices, so that they are
+    loaded with one query instead of one query per form.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AchievementInlineFormSet, self).__init__(*args, **kwargs)
+        self._academic_choices = None
+
+    def _construct_form(self, i, **kwargs):
+        form = super(AchievementInlineFormSet, self)._construct_form(
+                i, **kwargs)
+        field = form.fields['academic']
+        if self._academic_choices is None:
+            self._academic_choices = list(field.choices)
+        field.choices = self._academic_choices
+        return form
+
+
 class AchievementInline(admin.StackedInline):
     """ Inline for achievement information.
+
+    Academic can be chosen only from the student academics, which are
+    loaded together with their sections.
     """
 
     model = models.Achievement
+    formset = AchievementInlineFormSet
     extra = 0
 
+    def get_formset(self, request, obj=None, **kwargs):
+        kwargs['formfield_callback'] = functools.partial(
+                self.formfield_for_dbfield, request=request, student=obj)
+        return super(AchievementInline, self).get_formset(
+                request, obj, **kwargs)
+
+    def formfield_for_dbfield(self, db_field, **kwargs):
+        student = kwargs.pop('student', None)
+        if db_field.name == 'academic':
+            queryset = models.Academic.objects.select_related(
+                    'student', 'section')
+            if student is None:
+                kwargs['queryset'] = queryset.none()
+            else:
+                kwargs['queryset'] = queryset.filter(student=student)
+        return super(AchievementInline, self).formfield_for_dbfield(
+                db_field, **kwargs)
+
+
+class LeavingActionForm(helpers.ActionForm):
+    """ Action form with leaving date and reason used by
+    :meth:`LeavingActionsMixin.mark_left`.
+    """
 
-class AcademicAdmin(utils.ModelAdmin):
+    left = forms.DateField(
+            label=_(u'left'),
+            required=False,
+            help_text=_(u'Today, if empty.'),
+            )
+
+    leaving_reason = forms.ChoiceField(
+            label=_(u'leaving reason'),
+            choices=models.Academic.LEAVING_REASON,
+            initial=leaving.FINISHED,
+            required=False,
+            )
+
+
+class LeavingActionsMixin(object):
+    """ Adds action, which marks selected academics, who still study,
+    as left with one ``UPDATE``.
+    """
+
+    action_form = LeavingActionForm
+
+    def get_actions(self, request):
+        actions = super(LeavingActionsMixin, self).get_actions(request)
+        if actions is not None:
+            action = self.get_action('mark_left')
+            actions[action[1]] = action
+        return actions
+
+    def mark_left(self, request, queryset):
+        """ Marks selected academics as left on the date and for the
+        reason given in action form.
+        """
+        form = self.action_form(request.POST)
+        # The action field has choices only on the changelist form.
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            self.message_user(
+                    request, _(u'Invalid leaving date.'), messages.ERROR)
+            return
+        summary = leaving.mark_left(
+                queryset,
+                form.cleaned_data['left'],
+                form.cleaned_data['leaving_reason'] or leaving.FINISHED)
+        self.message_user(
+                request,
+                _(u'{0} academics marked as left on {1} ({2}).').format(
+                    summary.total, summary.left, unicode(summary)))
+    mark_left.short_description = _(
+            u'Mark selected, who still study, as left')
+
+
+class AcademicAdmin(
+        LeavingActionsMixin,
+        search.IndexedSearchMixin, exporting.SheetExportMixin,
+        utils.ModelAdmin):
     """ Administration for academic.
     """
 
+    search_index_kind = search.ACADEMIC
+
+    list_select_related = ('student', 'section')
+
     list_display = (
             'id',
             'student',
@@ -91,6 +200,10 @@ class AcademicWorkbookProxy(models.Academic):
         verbose_name_plural = _(u'academics workbook')
         proxy = True
 
+
+search.connect_proxy(AcademicWorkbookProxy)
+
+
 class SchoolClassFilter(admin.SimpleListFilter):
     """ Allows to filter by current student class.
     """
@@ -115,25 +228,12 @@ class SchoolClassFilter(admin.SimpleListFilter):
         except (TypeError, ValueError):
             return queryset
         else:
-            today =  datetime.date.today()
-            if today.month >= 9:
-                year = today.year + 1
-            else:
-                year = today.year
+            year = leaving.get_school_year()
             if value == 13:
-                return queryset.filter(
-                        student__school_year__lt=(
-                            (year-12) +
-                            django_models.F('student__school_class')
-                            )
-                        )
+                return queryset.filter(graduation_year__lt=year)
             else:
                 return queryset.filter(
-                        student__school_year=(
-                            (year-value) +
-                            django_models.F('student__school_class')
-                            )
-                        )
+                        graduation_year=year - value + 12)
 
 
 class AcademicStatusFilter(admin.SimpleListFilter):
@@ -173,11 +273,13 @@ class YearEnteredFilter(admin.SimpleListFilter):
     def lookups(self, request, model_admin):
         """ Returns the list of years.
         """
-        entered = models.Academic.objects.all()
-        first = entered.order_by('entered')[0]
-        last = entered.order_by('-entered')[0]
-        for year in range(first.entered.year, last.entered.year + 1):
-            yield (unicode(year), unicode(year))
+        first, last = models.get_entered_range()
+        if first is None:
+            return []
+        return [
+                (unicode(year), unicode(year))
+                for year in range(first.year, last.year + 1)
+                ]
 
     def queryset(self, request, queryset):
         """ Returns filtered by year.
@@ -194,10 +296,35 @@ class YearEnteredFilter(admin.SimpleListFilter):
                     )
 
 
-class AcademicWorkbookAdmin(utils.ModelAdmin):
+class AcademicWorkbookChangeList(ChangeList):
+    """ Loads data shown in columns of the academics, whose roster rows
+    were not built yet (for example, right after migrating), with a
+    constant number of queries.
+    """
+
+    def get_results(self, request):
+        super(AcademicWorkbookChangeList, self).get_results(request)
+        missing = [
+                academic for academic in self.result_list
+                if self.model_admin.get_roster(academic) is None]
+        if missing:
+            prefetch_related_objects(
+                    missing,
+                    [queries.prefetch_current_school()] +
+                    queries.prefetch_used_contacts())
+
+
+class AcademicWorkbookAdmin(
+        LeavingActionsMixin,
+        search.IndexedSearchMixin, exporting.SheetExportMixin,
+        utils.ModelAdmin):
     """ Administration for academic.
     """
 
+    search_index_kind = search.ACADEMIC
+
+    list_select_related = ('student', 'section', 'roster')
+
     list_display = (
             'student',
             'section',
@@ -212,13 +339,13 @@ class AcademicWorkbookAdmin(utils.ModelAdmin):
 
     search_fields = (
             'id',
-            'student__first_name',
-            'student__last_name',
-            'student__old_last_name',
+            'roster__first_name',
+            'roster__last_name',
+            'roster__old_last_name',
             'entered',
             'left',
-            'section__title',
-            'student__schools__title',
+            'roster__section_title',
+            'roster__school_title',
             )
 
     list_filter = (
@@ -231,6 +358,31 @@ class AcademicWorkbookAdmin(utils.ModelAdmin):
     list_max_show_all = 100
     list_per_page = 10
 
+    sheet_mapping = (
+            (_(u'First name'), ('student', 'first_name',)),
+            (_(u'Last name'), ('student', 'last_name',)),
+            (_(u'Section'), ('section', 'title')),
+            (_(u'Phone numbers'), ('student', 'used_phones')),
+            (_(u'Email addresses'), ('student', 'used_emails')),
+            (_(u'Class'), ('student', 'current_school_class')),
+            (_(u'Entered'), ('entered',)),
+            (_(u'Left'), ('left',)),
+            (_(u'Leaving reason'), ('get_leaving_reason_display',)),
+            (_(u'School'), ('student', 'current_school', 'title')),
+            )
+
+    def get_changelist(self, request, **kwargs):
+        return AcademicWorkbookChangeList
+
+    def get_roster(self, obj):
+        """ Returns roster row of the academic or None, if roster was
+        not built yet.
+        """
+        try:
+            return obj.roster
+        except models.AcademicRoster.DoesNotExist:
+            return None
+
     def current_school_class(self, obj):
         """ Forwarding to student.
         """
@@ -241,32 +393,45 @@ class AcademicWorkbookAdmin(utils.ModelAdmin):
         """ Returns concatenation of all used phone numbers.
         """
 
-        return db_utils.join(
-                obj.student.phone_set.exclude(used=False),
-                'number')
+        roster = self.get_roster(obj)
+        if roster is not None:
+            return roster.phones
+        return db_utils.join(queries.used_phones(obj.student), 'number')
     get_phones.short_description = _("Phone numbers")
 
     def get_emails(self, obj):
         """ Returns concatenation of all used emails.
         """
 
-        return db_utils.join(
-                obj.student.email_set.exclude(used=False),
-                'address')
+        roster = self.get_roster(obj)
+        if roster is not None:
+            return roster.emails
+        return db_utils.join(queries.used_emails(obj.student), 'address')
     get_emails.short_description = _("Email addresses")
 
     def current_school(self, obj):
         """ Forwarding to student.
         """
 
-        return obj.student.current_school().title
+        roster = self.get_roster(obj)
+        if roster is not None:
+            return roster.school_title
+        school = queries.current_school(obj.student)
+        return school.title if school else u''
     current_school.short_description = _("current school")
 
 
-class AchievementAdmin(utils.ModelAdmin):
+class AchievementAdmin(
+        search.IndexedSearchMixin, exporting.SheetExportMixin,
+        utils.ModelAdmin):
     """ Administration for achievement.
     """
 
+    search_index_kind = search.ACHIEVEMENT
+
+    list_select_related = (
+            'student', 'academic__student', 'academic__section')
+
     list_display = (
             'id',
             'student',
@@ -307,13 +472,76 @@ class AchievementAdmin(utils.ModelAdmin):
             )
 
 
+class ImportJobAdmin(utils.ModelAdmin):
+    """ Administration for background import jobs.
+    """
+
+    list_display = (
+            'id',
+            'spreadsheet',
+            'status',
+            'created',
+            'started',
+            'finished',
+            'batches',
+            'skipped_batches',
+            'imported',
+            'get_progress_link',
+            )
+
+    list_filter = (
+            'status',
+            )
+
+    readonly_fields = (
+            'status',
+            'started',
+            'updated',
+            'finished',
+            'batches',
+            'skipped_batches',
+            'imported',
+            'errors',
+            )
+
+    def get_progress_link(self, obj):
+        """ Returns link to the job progress page.
+        """
+        return u'<a href="{0}">{1}</a>'.format(
+                urlresolvers.reverse(
+                    'nmadb-academics-import-job', args=(obj.id,)),
+                _(u'Progress'))
+    get_progress_link.short_description = _(u'progress')
+    get_progress_link.allow_tags = True
+
+
+class ImportBatchAdmin(utils.ModelAdmin):
+    """ Administration for committed import batches. Deleting a batch
+    allows to import its rows of the same file again.
+    """
+
+    list_display = (
+            'id',
+            'file_hash',
+            'first_row',
+            'rows',
+            'imported',
+            )
+
+    readonly_fields = (
+            'file_hash',
+            'first_row',
+            'rows',
+            )
+
+
 class StudentAdmin(students_admin.StudentAdmin):
     """ Administration for student, who is also an academic.
     """
 
     inlines = students_admin.StudentAdmin.inlines + [
             AcademicInline,
-#           AchievementInline,          # FIXME: Runs into infinitive loop.
+            AchievementInline,
             ]
     list_max_show_all = 100
     list_per_page = 10
@@ -323,6 +551,26 @@ actions.register(
         'nmadb-academics-import-academic',
         _(u'Import academics'),
         'nmadb-academics-import-academic')
+actions.register(
+        'nmadb-academics-stream-import-academic',
+        _(u'Import academics from large file'),
+        'nmadb-academics-stream-import-academic')
+actions.register(
+        'nmadb-academics-validate-academic',
+        _(u'Check academics file'),
+        'nmadb-academics-validate-academic')
+actions.register(
+        'nmadb-academics-import-achievement',
+        _(u'Import achievements'),
+        'nmadb-academics-import-achievement')
+actions.register(
+        'nmadb-academics-statistics',
+        _(u'Academics statistics'),
+        'nmadb-academics-statistics')
+actions.register(
+        'nmadb-academics-analytics',
+        _(u'Academics retention analytics'),
+        'nmadb-academics-analytics')
 
 admin.site.unregister(students_models.Student)
 admin.site.register(students_models.Student, StudentAdmin)
@@ -330,3 +578,5 @@ admin.site.register(models.Section, SectionAdmin)
 admin.site.register(models.Academic, AcademicAdmin)
 admin.site.register(AcademicWorkbookProxy, AcademicWorkbookAdmin)
 admin.site.register(models.Achievement, AchievementAdmin)
+admin.site.register(models.ImportJob, ImportJobAdmin)
+admin.site.register(models.ImportBatch, ImportBatchAdmin)
@@ -0,0 +1,283 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Whole table analytics of academics over columnar arrays.
+
+:class:`AcademicColumns` loads ``(student, section, entered, left,
+leaving reason)`` of all academics with one ``values_list`` query into
+compact NumPy arrays; retention curves, section transitions and
+survival tables are computed from them with vectorized operations.
+
+NumPy is imported only when analytics are used, so it is needed only
+by sites, which use them.
+"""
+
+
+import array
+import datetime
+
+
+YEAR_DAYS = 365.25
+
+# Leaving reason codes; index in this list is stored in the reason
+# column, 0 means that academic still studies.
+REASONS = [None, u'F', u'W', u'R', u'C', u'U']
+
+CHANGED = REASONS.index(u'C')
+
+# Reason index of codes, which are not in REASONS (for example, set
+# before a reason was removed from choices).
+OTHER = len(REASONS)
+
+REASON_INDEXES = dict((code, i) for i, code in enumerate(REASONS))
+
+
+def _numpy():
+    """ Imports NumPy.
+    """
+    import numpy
+    return numpy
+
+
+def is_available():
+    """ Returns True if NumPy is installed.
+    """
+    try:
+        _numpy()
+    except ImportError:
+        return False
+    return True
+
+
+class AcademicColumns(object):
+    """ Academics as columns: ``student`` and ``section`` ids,
+    ``entered`` and ``left`` days since epoch (``left`` is -1 for
+    academics, who still study) and ``reason`` index in
+    :data:`REASONS` (:data:`OTHER` for unknown codes).
+    """
+
+    def __init__(self, student, section, entered, left, reason):
+        self.student = student
+        self.section = section
+        self.entered = entered
+        self.left = left
+        self.reason = reason
+
+    def __len__(self):
+        return len(self.student)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """ Creates columns from ``(student id, section id, entered,
+        left, leaving reason)`` tuples. Rows are appended to typed
+        arrays, so that Python objects are not kept in memory.
+        """
+        numpy = _numpy()
+        epoch = datetime.date(1970, 1, 1).toordinal()
+        student = array.array('l')
+        section = array.array('l')
+        entered = array.array('l')
+        left = array.array('l')
+        reason = array.array('b')
+        for student_id, section_id, entered_date, left_date, code in rows:
+            student.append(student_id)
+            section.append(section_id)
+            entered.append(entered_date.toordinal() - epoch)
+            left.append(
+                    left_date.toordinal() - epoch
+                    if left_date is not None else -1)
+            reason.append(REASON_INDEXES.get(code or None, OTHER))
+        return cls(*[
+            numpy.array(column, dtype=dtype)
+            for column, dtype in (
+                (student, numpy.int64),
+                (section, numpy.int64),
+                (entered, numpy.int32),
+                (left, numpy.int32),
+                (reason, numpy.int8),
+                )])
+
+    @classmethod
+    def load(cls, queryset=None):
+        """ Loads academics of the queryset (all by default) with one
+        query.
+        """
+        if queryset is None:
+            from nmadb_academics import models
+            queryset = models.Academic.objects.all()
+        return cls.from_rows(queryset.order_by().values_list(
+            u'student_id', u'section_id', u'entered', u'left',
+            u'leaving_reason').iterator())
+
+    def select(self, mask):
+        """ Returns columns of academics selected by the mask.
+        """
+        return AcademicColumns(
+                self.student[mask], self.section[mask],
+                self.entered[mask], self.left[mask], self.reason[mask])
+
+    def entry_years(self):
+        """ Returns the array of years, in which academics entered.
+        """
+        numpy = _numpy()
+        return self.entered.astype('datetime64[D]').astype(
+                'datetime64[Y]').astype(numpy.int64) + 1970
+
+    def known(self):
+        """ Returns the mask of academics, whose time of studying is
+        known: they still study or have leaving date (academics, who
+        left for unknown reason, usually do not).
+        """
+        return (self.left >= 0) | (self.reason == 0)
+
+    def durations(self, today):
+        """ Returns the array of days studied until leaving or until
+        ``today`` (days since epoch) for academics, who still study.
+        """
+        numpy = _numpy()
+        return numpy.where(
+                self.left >= 0, self.left, today) - self.entered
+
+
+def _today(today=None):
+    """ Returns days since epoch of the given date (today by default).
+    """
+    if today is None:
+        today = datetime.date.today()
+    return today.toordinal() - datetime.date(1970, 1, 1).toordinal()
+
+
+def retention(columns, max_years=6, today=None):
+    """ Computes fractions of each entry cohort, which still studied
+    after 0..``max_years`` years. Academics without leaving date,
+    who left, are skipped.
+
+    Returns ``(cohorts, fractions)``: the list of ``(entry year,
+    section id)`` pairs and the array of shape ``(len(cohorts),
+    max_years + 1)``. Fraction is NaN, if none of the cohort has
+    studied long enough to be observed.
+    """
+    numpy = _numpy()
+    today = _today(today)
+    columns = columns.select(columns.known())
+    if not len(columns):
+        return [], numpy.empty((0, max_years + 1))
+    # Cohort is encoded as one integer, so that a flat unique gives
+    # the index of each academic cohort.
+    width = int(columns.section.max()) + 1
+    keys, cohort_index = numpy.unique(
+            columns.entry_years() * width + columns.section,
+            return_inverse=True)
+    cohort_index = cohort_index.reshape(-1)
+    durations = columns.durations(today)
+    fractions = numpy.empty((len(keys), max_years + 1))
+    for years in range(max_years + 1):
+        days = years * YEAR_DAYS
+        observed = columns.entered + days <= today
+        retained = observed & (durations >= days)
+        total = numpy.bincount(
+                cohort_index[observed], minlength=len(keys))
+        kept = numpy.bincount(
+                cohort_index[retained], minlength=len(keys))
+        fractions[:, years] = numpy.where(
+                total > 0,
+                kept / numpy.maximum(total, 1).astype(numpy.float64),
+                numpy.nan)
+    cohorts = [(int(key // width), int(key % width)) for key in keys]
+    return cohorts, fractions
+
+
+def section_transitions(columns, reason=CHANGED):
+    """ Counts, how often academics, who left a section for ``reason``
+    (changed by default), next entered another section.
+
+    Returns ``(section ids, matrix)``, where ``matrix[i, j]`` is the
+    number of moves from ``i``-th to ``j``-th section.
+    """
+    numpy = _numpy()
+    if not len(columns):
+        return [], numpy.zeros((0, 0), dtype=numpy.int64)
+    sections, section_index = numpy.unique(
+            columns.section, return_inverse=True)
+    order = numpy.lexsort((columns.entered, columns.student))
+    student = columns.student[order]
+    index = section_index.reshape(-1)[order]
+    moved = (
+            (student[:-1] == student[1:]) &
+            (columns.reason[order][:-1] == reason) &
+            (index[:-1] != index[1:]))
+    matrix = numpy.bincount(
+            index[:-1][moved] * len(sections) + index[1:][moved],
+            minlength=len(sections) ** 2).reshape(
+                len(sections), len(sections))
+    return [int(section) for section in sections], matrix
+
+
+def survival_table(columns, max_years=None, today=None):
+    """ Computes life table of studying: for each full year ``n`` the
+    number of academics ``at_risk`` (studied at least ``n`` years),
+    who ``left`` during the year, who were ``censored`` (still study),
+    and Kaplan-Meier ``survival`` probability to study at least
+    ``n + 1`` years. Academics without leaving date, who left, are
+    skipped.
+
+    Returns the list of dictionaries.
+    """
+    numpy = _numpy()
+    columns = columns.select(columns.known())
+    if not len(columns):
+        return []
+    years = (columns.durations(_today(today)) // YEAR_DAYS).astype(
+            numpy.int64)
+    years = numpy.maximum(years, 0)
+    if max_years is not None:
+        years = numpy.minimum(years, max_years)
+    length = int(years.max()) + 1
+    has_left = columns.left >= 0
+    left = numpy.bincount(years[has_left], minlength=length)
+    censored = numpy.bincount(years[~has_left], minlength=length)
+    at_risk = numpy.cumsum((left + censored)[::-1])[::-1]
+    survival = numpy.cumprod(1.0 - left / numpy.maximum(
+        at_risk, 1).astype(numpy.float64))
+    return [
+            {
+                u'years': n,
+                u'at_risk': int(at_risk[n]),
+                u'left': int(left[n]),
+                u'censored': int(censored[n]),
+                u'survival': float(survival[n]),
+            }
+            for n in range(length)]
+
+
+def report(max_years=6, today=None):
+    """ Loads all academics and returns retention, transitions and
+    survival prepared for rendering: ``years`` (0..``max_years``),
+    ``retention`` (the list of dictionaries with ``year``, section
+    ``title`` and ``fractions``), ``sections`` (titles),
+    ``transitions`` (the list of ``(from title, counts)`` pairs) and
+    ``survival`` (see :func:`survival_table`).
+    """
+    from nmadb_academics import models
+    columns = AcademicColumns.load()
+    titles = dict(models.Section.objects.values_list(u'id', u'title'))
+    cohorts, fractions = retention(columns, max_years, today)
+    section_ids, matrix = section_transitions(columns)
+    return {
+            u'years': list(range(max_years + 1)),
+            u'retention': [
+                {
+                    u'year': year,
+                    u'title': titles[section_id],
+                    u'fractions': [
+                        None if value != value else value
+                        for value in fractions[i].tolist()],
+                }
+                for i, (year, section_id) in enumerate(cohorts)],
+            u'sections': [titles[section_id] for section_id in section_ids],
+            u'transitions': [
+                (titles[section_id], matrix[i].tolist())
+                for i, section_id in enumerate(section_ids)],
+            u'survival': survival_table(columns, today=today),
+            }
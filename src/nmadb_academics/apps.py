@@ -0,0 +1,18 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+from django.apps import AppConfig
+
+
+class AcademicsConfig(AppConfig):
+    """ Connects signal receivers, which maintain academic roster,
+    search index and achievement rankings, and close academics of
+    abolished sections.
+    """
+
+    name = 'nmadb_academics'
+
+    def ready(self):
+        # pylint: disable=W0612
+        from nmadb_academics import leaving, rankings, roster, search
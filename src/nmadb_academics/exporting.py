@@ -0,0 +1,285 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Export of ``sheet_mapping`` columns with a bounded number of queries.
+
+Mapping paths are analysed up front: foreign keys on the path are
+loaded with ``select_related`` and methods, which are known to query
+database, get a prefetch and are resolved from the prefetched data.
+Objects are then fetched in primary key ordered chunks, so that the
+prefetches are done once per chunk, and written to streaming response
+row by row.
+"""
+
+
+import csv
+import datetime
+import numbers
+from xml.sax import saxutils
+
+from django.db import models
+from django.db.models.fields import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+from django.utils.translation import ugettext as _
+
+from django_db_utils import utils as db_utils
+from nmadb_students import models as students_models
+from nmadb_academics import queries
+
+
+CHUNK_SIZE = queries.CHUNK_SIZE
+
+
+# Methods, which query database: (model, method name) is mapped to
+# (function creating prefetch for the given path, function resolving
+# the value from prefetched data).
+PREFETCHED_METHODS = {
+    (students_models.Student, u'current_school'): (
+        queries.prefetch_current_school,
+        queries.current_school,
+        ),
+    (students_models.Student, queries.USED_PHONES_ATTR): (
+        queries.prefetch_used_phones,
+        lambda student: db_utils.join(
+            queries.used_phones(student), 'number'),
+        ),
+    (students_models.Student, queries.USED_EMAILS_ATTR): (
+        queries.prefetch_used_emails,
+        lambda student: db_utils.join(
+            queries.used_emails(student), 'address'),
+        ),
+    }
+
+
+def _prefetched_method(model, attribute):
+    """ Returns the ``PREFETCHED_METHODS`` entry of the model method or
+    None.
+    """
+    for (method_model, name), value in PREFETCHED_METHODS.items():
+        if attribute == name and issubclass(model, method_model):
+            return value
+    return None
+
+
+class ExportPlan(object):
+    """ Related objects, which have to be loaded to export the sheet
+    mapping of the model.
+    """
+
+    def __init__(self, model, sheet_mapping):
+        self.model = model
+        self.sheet_mapping = sheet_mapping
+        self.select_related = []
+        self.prefetch_related = []
+        self.resolvers = []
+        prefetched = set()
+        for _caption, path in sheet_mapping:
+            current = model
+            lookup = []
+            resolvers = {}
+            for i, attribute in enumerate(path):
+                try:
+                    field = current._meta.get_field(attribute)
+                except FieldDoesNotExist:
+                    method = _prefetched_method(current, attribute)
+                    if method is not None:
+                        prefetch, resolver = method
+                        key = tuple(lookup + [attribute])
+                        if key not in prefetched:
+                            prefetched.add(key)
+                            self.prefetch_related.append(
+                                    prefetch(u'__'.join(lookup)))
+                        resolvers[i] = resolver
+                    break
+                if not isinstance(field, models.ForeignKey):
+                    break
+                lookup.append(attribute)
+                if u'__'.join(lookup) not in self.select_related:
+                    self.select_related.append(u'__'.join(lookup))
+                current = field.rel.to
+            self.resolvers.append(resolvers)
+
+    def apply(self, queryset):
+        """ Adds related object loading to queryset.
+        """
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def row(self, obj):
+        """ Returns the list of the object values.
+        """
+        row = []
+        for (_caption, path), resolvers in zip(
+                self.sheet_mapping, self.resolvers):
+            value = obj
+            for i, attribute in enumerate(path):
+                if value is None:
+                    break
+                if i in resolvers:
+                    value = resolvers[i](value)
+                else:
+                    value = getattr(value, attribute)
+                    if callable(value):
+                        value = value()
+            row.append(value)
+        return row
+
+    def captions(self):
+        """ Returns the list of column captions.
+        """
+        return [caption for caption, _path in self.sheet_mapping]
+
+
+def iter_sheet_rows(queryset, sheet_mapping, chunk_size=CHUNK_SIZE):
+    """ Yields exported rows of the queryset objects.
+    """
+    plan = ExportPlan(queryset.model, sheet_mapping)
+    for chunk in queries.iter_chunks(plan.apply(queryset), chunk_size):
+        for obj in chunk:
+            yield plan.row(obj)
+
+
+def encode(value):
+    """ Converts exported value to CSV cell.
+    """
+    if value is None:
+        return ''
+    return unicode(value).encode('utf-8')
+
+
+class _Echo(object):
+    """ File-like object, which returns written value instead of
+    storing it.
+    """
+
+    def write(self, value):
+        """ Returns the value.
+        """
+        return value
+
+
+def iter_csv(captions, rows, sheet_name):
+    """ Yields lines of CSV document.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow([encode(caption) for caption in captions])
+    for row in rows:
+        yield writer.writerow([encode(value) for value in row])
+
+
+FODS_HEADER = (
+        u'<?xml version="1.0" encoding="UTF-8"?>\n'
+        u'<office:document '
+        u'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        u'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+        u'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+        u'office:version="1.2" office:mimetype='
+        u'"application/vnd.oasis.opendocument.spreadsheet">\n'
+        u'<office:body><office:spreadsheet>\n'
+        u'<table:table table:name={0}>\n')
+FODS_FOOTER = (
+        u'</table:table>\n'
+        u'</office:spreadsheet></office:body></office:document>\n')
+
+
+def fods_cell(value):
+    """ Returns OpenDocument table cell of the value.
+    """
+    if value is None:
+        return u'<table:table-cell/>'
+    elif (isinstance(value, numbers.Number) and
+            not isinstance(value, bool)):
+        return (
+                u'<table:table-cell office:value-type="float" '
+                u'office:value="{0}"><text:p>{0}</text:p>'
+                u'</table:table-cell>').format(value)
+    elif isinstance(value, datetime.date):
+        return (
+                u'<table:table-cell office:value-type="date" '
+                u'office:date-value="{0}"><text:p>{0}</text:p>'
+                u'</table:table-cell>').format(value.isoformat())
+    else:
+        return (
+                u'<table:table-cell office:value-type="string">'
+                u'<text:p>{0}</text:p></table:table-cell>').format(
+                    saxutils.escape(unicode(value)))
+
+
+def fods_row(values):
+    """ Returns OpenDocument table row of the values.
+    """
+    return u'<table:table-row>{0}</table:table-row>\n'.format(
+            u''.join(fods_cell(value) for value in values))
+
+
+def iter_fods(captions, rows, sheet_name):
+    """ Yields parts of flat OpenDocument spreadsheet document.
+    """
+    yield FODS_HEADER.format(
+            saxutils.quoteattr(unicode(sheet_name))).encode('utf-8')
+    yield fods_row([unicode(caption) for caption in captions]).encode(
+            'utf-8')
+    for row in rows:
+        yield fods_row(row).encode('utf-8')
+    yield FODS_FOOTER.encode('utf-8')
+
+
+# Streaming export formats: name is mapped to (file extension, content
+# type, document generator). XLSX and zipped ODS are not included,
+# because zip archive can not be written to a stream without seeking.
+EXPORT_FORMATS = {
+    u'csv': (
+        u'csv', u'text/csv; charset=utf-8', iter_csv),
+    u'fods': (
+        u'fods',
+        u'application/vnd.oasis.opendocument.spreadsheet-flat-xml',
+        iter_fods),
+    }
+
+
+def streaming_export(queryset, sheet_mapping, export_format):
+    """ Returns response, which streams the exported queryset.
+    """
+    extension, content_type, generator = EXPORT_FORMATS[export_format]
+    opts = queryset.model._meta
+    response = StreamingHttpResponse(
+            generator(
+                [caption for caption, _path in sheet_mapping],
+                iter_sheet_rows(queryset, sheet_mapping),
+                opts.verbose_name_plural),
+            content_type=content_type)
+    response['Content-Disposition'] = (
+            'attachment; filename="{0}.{1}"'.format(
+                opts.model_name, extension))
+    return response
+
+
+class SheetExportMixin(object):
+    """ Adds actions, which stream selected objects exported by
+    ``sheet_mapping``.
+    """
+
+    def get_actions(self, request):
+        actions = super(SheetExportMixin, self).get_actions(request)
+        if actions is not None:
+            for name in ('export_sheet_csv', 'export_sheet_fods'):
+                action = self.get_action(name)
+                actions[action[1]] = action
+        return actions
+
+    def export_sheet_csv(self, request, queryset):
+        """ Exports selected objects to CSV file.
+        """
+        return streaming_export(queryset, self.sheet_mapping, u'csv')
+    export_sheet_csv.short_description = _(u'Export selected to CSV')
+
+    def export_sheet_fods(self, request, queryset):
+        """ Exports selected objects to flat OpenDocument spreadsheet.
+        """
+        return streaming_export(queryset, self.sheet_mapping, u'fods')
+    export_sheet_fods.short_description = _(
+            u'Export selected to OpenDocument spreadsheet')
@@ -3,8 +3,10 @@
 
 
 import datetime
+import functools
 
 from django import forms
+from django.db.models.functions import Lower
 from django.utils.translation import ugettext as _
 from django.core import validators
 
@@ -16,7 +18,7 @@ from pysheets.sheet import Sheet
 
 from nmadb_students import models as students_models
 from nmadb_contacts import models as contacts_models
-from nmadb_academics import models
+from nmadb_academics import models, spreadsheets
 
 
 IMPORT_ACADEMICS_REQUIRED_COLUMNS = {
@@ -43,6 +45,33 @@ IMPORT_ACADEMICS_OPTIONAL_COLUMNS = {
     }
 
 
+IMPORT_ACADEMICS_SHEET_NAME = _(u'Academics')
+
+
+IMPORT_ACADEMICS_HELP_TEXT = _(
+        u'Please select spreadsheet file. '
+        u'Required columns are: {0}.'
+        u'Optional columns are: {1}.').format(
+            u','.join(
+                _(u'\u201c{0}\u201d').format(caption)
+                for caption in
+                IMPORT_ACADEMICS_REQUIRED_COLUMNS.values()),
+            u','.join(
+                _(u'\u201c{0}\u201d').format(caption)
+                for caption in
+                IMPORT_ACADEMICS_OPTIONAL_COLUMNS.values()),
+            )
+
+
+# Each name adds at most two values to both ``IN`` lists of the query
+# (see :func:`_lower_variants`), which keeps it under SQLite limit of
+# 999 parameters.
+DUPLICATES_QUERY_CHUNK_SIZE = 200
+
+
+IMPORT_ACADEMICS_BATCH_SIZE = 500
+
+
 name_validator = NamesValidator(
         ALPHABET_LT,
         validation_exception_type=forms.ValidationError,
@@ -58,115 +87,238 @@ phone_number_validator = PhoneNumberValidator(
         validation_exception_type=forms.ValidationError,
         )
 
-def academic_import_validate_row(sheet, row):
-    """ Checks if row is valid.
+
+class AcademicImportLookups(object):
+    """ Reference data used by row validation.
+
+    Schools, sections and municipalities are loaded once, when first
+    needed, and then shared by all rows of the same import, as are the
+    compiled row converters.
     """
-    new_row = {}
-    for column, caption in IMPORT_ACADEMICS_REQUIRED_COLUMNS.items():
+
+    def __init__(self):
+        self._schools = None
+        self._sections = None
+        self._municipalities = None
+        self._converters = {}
+
+    @property
+    def schools(self):
+        """ Schools (with municipalities) by title.
+        """
+        if self._schools is None:
+            self._schools = dict(
+                    (school.title, school)
+                    for school in students_models.School.objects.
+                    select_related('municipality'))
+        return self._schools
+
+    @property
+    def sections(self):
+        """ Sections by lower-cased title.
+        """
+        if self._sections is None:
+            self._sections = dict(
+                    (section.title.lower(), section)
+                    for section in models.Section.objects.all())
+        return self._sections
+
+    @property
+    def municipalities(self):
+        """ Municipalities by code.
+        """
+        if self._municipalities is None:
+            self._municipalities = dict(
+                    (unicode(municipality.code), municipality)
+                    for municipality in
+                    contacts_models.Municipality.objects.all())
+        return self._municipalities
+
+    def load(self):
+        """ Loads all reference data.
+        """
+        return self.schools, self.sections, self.municipalities
+
+    def get_converter(self, captions):
+        """ Returns row converter of given captions, which is created
+        once per distinct set of captions.
+        """
+        key = frozenset(captions)
+        converter = self._converters.get(key)
+        if converter is None:
+            converter = AcademicRowConverter(key, self)
+            self._converters[key] = converter
+        return converter
+
+    def get_school(self, title):
+        """ Returns school with given title.
+        """
         try:
-            new_row[column] = row[caption]
-        except KeyError as e:
-            raise forms.ValidationError(
-                    _(u'Missing column: \u201c{0}\u201d.').format(
-                        e.message))
-    for column, caption in IMPORT_ACADEMICS_OPTIONAL_COLUMNS.items():
+            return self.schools[title]
+        except KeyError:
+            raise students_models.School.DoesNotExist()
+
+    def get_section(self, title):
+        """ Returns section with given title, ignoring case.
+        """
         try:
-            new_row[column] = row[caption]
-        except KeyError as e:
-            pass
+            return self.sections[unicode(title).lower()]
+        except KeyError:
+            raise models.Section.DoesNotExist()
 
-    try:
-        new_row[u'first_name'] = name_validator(
-                new_row[u'first_name'])
-        new_row[u'last_name'] = name_validator(
-                new_row[u'last_name'])
-        for db_key, verbose_name in (
-                students_models.Student.GENDER_CHOICES):
-            if new_row[u'gender'] == verbose_name:
-                new_row[u'gender'] = db_key
-                break
-        else:
-            raise forms.ValidationError(
+    def get_municipality(self, code):
+        """ Returns municipality with given code.
+        """
+        try:
+            return self.municipalities[unicode(code)]
+        except KeyError:
+            raise contacts_models.Municipality.DoesNotExist()
+
+
+def _parse_date(value, _strptime=datetime.datetime.strptime):
+    """ Parses ISO date.
+    """
+    return _strptime(value, u'%Y-%m-%d').date()
+
+
+class AcademicRowConverter(object):
+    """ Converter of rows with given captions, compiled once per sheet.
+
+    Column captions, choice lookups and translated values are resolved
+    when converter is created, so that converting a row is a sequence
+    of dictionary lookups and parser calls. Raises ``ValidationError``
+    listing all missing columns.
+    """
+
+    def __init__(self, captions, lookups):
+        captions = set(captions)
+        missing = [
+                _(u'Missing column: \u201c{0}\u201d.').format(caption)
+                for caption in IMPORT_ACADEMICS_REQUIRED_COLUMNS.values()
+                if caption not in captions]
+        if missing:
+            raise forms.ValidationError(missing)
+        self.lookups = lookups
+        self.columns = [
+                (column, caption)
+                for columns in (
+                    IMPORT_ACADEMICS_REQUIRED_COLUMNS,
+                    IMPORT_ACADEMICS_OPTIONAL_COLUMNS)
+                for column, caption in columns.items()
+                if caption in captions]
+        self.genders = dict(
+                (unicode(verbose_name), db_key)
+                for db_key, verbose_name in
+                students_models.Student.GENDER_CHOICES)
+        self.yes_no = {
+                unicode(_(u'Yes')): True,
+                unicode(_(u'No')): False,
+                }
+
+    def convert(self, row):
+        """ Converts row, which maps column captions to values, to the
+        dictionary of database values.
+
+        All errors of the row are collected and raised together. Raised
+        validation errors do not include the row location.
+        """
+        new_row = dict(
+                (column, row[caption])
+                for column, caption in self.columns)
+        errors = []
+        lookups = self.lookups
+
+        for name_field in (u'first_name', u'last_name'):
+            try:
+                new_row[name_field] = name_validator(new_row[name_field])
+            except forms.ValidationError as e:
+                errors.extend(e.messages)
+        try:
+            new_row[u'gender'] = self.genders[new_row[u'gender']]
+        except KeyError:
+            errors.append(
                     _(u'Unknown gender: \u201c{0}\u201d.').
                     format(new_row[u'gender']))
+        school = None
         try:
-            new_row[u'school'] = students_models.School.objects.get(
-                    title=new_row[u'school'])
+            school = lookups.get_school(new_row[u'school'])
         except students_models.School.DoesNotExist as e:
-            raise forms.ValidationError(
+            errors.append(
                     _(u'School not found: \u201c{0}\u201d.').format(
                         new_row[u'school']))
-        if 'school_id' in new_row:
+        else:
+            new_row[u'school'] = school
+        if school is not None and 'school_id' in new_row:
             try:
                 new_row['school_id'] = int(new_row['school_id'])
             except ValueError:
-                raise forms.ValidationError(
+                errors.append(
                         _(u'School ID have to be a number. '
                         u'\u201c{0.title}\u201d ID is {1}. ').format(
-                            new_row[u'school'], new_row['school_id']))
-            if new_row[u'school'].id != new_row['school_id']:
-                raise forms.ValidationError(
-                        _(u'School ID does not match. '
-                        u'\u201c{0.title}\u201d in DB is {0.id}. '
-                        u'In file is {1}').format(
-                            new_row[u'school'], new_row['school_id']))
-        validators.validate_email(new_row[u'email'])
+                            school, new_row['school_id']))
+            else:
+                if school.id != new_row['school_id']:
+                    errors.append(
+                            _(u'School ID does not match. '
+                            u'\u201c{0.title}\u201d in DB is {0.id}. '
+                            u'In file is {1}').format(
+                                school, new_row['school_id']))
+        try:
+            validators.validate_email(new_row[u'email'])
+        except forms.ValidationError as e:
+            errors.extend(e.messages)
         try:
-            new_row[u'section'] = models.Section.objects.get(
-                    title__iexact=new_row[u'section'])
+            new_row[u'section'] = lookups.get_section(
+                    new_row[u'section'])
         except models.Section.DoesNotExist as e:
-            raise forms.ValidationError(
+            errors.append(
                     _(u'Section not found: \u201c{0}\u201d.').format(
                         new_row[u'section']))
-        for number_field in (u'school_class', u'school_year'):
+        for number_field, low, high, message in (
+                (u'school_class', 6, 12, _(
+                    u'School class have to be between 6 and 12. '
+                    u'Now it is {0}.')),
+                (u'school_year', 2005, 2020, _(
+                    u'School year have to be between 2005 and 2020. '
+                    u'Now it is {0}.')),
+                ):
             try:
                 new_row[number_field] = int(new_row[number_field])
             except ValueError as e:
-                raise forms.ValidationError(
+                errors.append(
                         _(u'Failed to convert to number: '
                         u'\u201c{0}\u201d.').format(
                             new_row[number_field]))
-        if not (6 <= new_row[u'school_class'] and
-                new_row[u'school_class'] <= 12):
-            raise forms.ValidationError(
-                    _(u'School class have to be between 6 and 12. '
-                    u'Now it is {0}.').format(new_row[u'school_class']))
-        if not (2005 <= new_row[u'school_year'] and
-                new_row[u'school_year'] <= 2020):
-            raise forms.ValidationError(
-                    _(u'School year have to be between 2005 and 2020. '
-                    u'Now it is {0}.').format(new_row[u'school_year']))
+            else:
+                if not (low <= new_row[number_field] and
+                        new_row[number_field] <= high):
+                    errors.append(message.format(new_row[number_field]))
         if not (new_row.get(u'main_address') or u'').strip():
-            raise forms.ValidationError(
+            errors.append(
                     _(u'Home address must be not empty.'))
         if not (new_row.get(u'town') or u'').strip():
-            raise forms.ValidationError(
+            errors.append(
                     _(u'Town must be not empty.'))
         if new_row.get(u'phone'):
-            new_row[u'phone'] = unicode(
-                    phone_number_validator(new_row[u'phone']))
+            try:
+                new_row[u'phone'] = unicode(
+                        phone_number_validator(new_row[u'phone']))
+            except forms.ValidationError as e:
+                errors.extend(e.messages)
         else:
             new_row[u'phone'] = None
+        for date_field in (u'birth_date', u'entered'):
+            try:
+                new_row[date_field] = _parse_date(new_row[date_field])
+            except ValueError:
+                errors.append(
+                        _(u'Invalid date: \u201c{0}\u201d.').format(
+                            new_row[date_field]))
         try:
-            new_row[u'birth_date'] = datetime.datetime.strptime(
-                    new_row[u'birth_date'], u'%Y-%m-%d').date()
-        except ValueError:
-            raise forms.ValidationError(
-                    _(u'Invalid date: \u201c{0}\u201d.').format(
-                        new_row[u'birth_date']))
-        try:
-            new_row[u'entered'] = datetime.datetime.strptime(
-                    new_row[u'entered'], u'%Y-%m-%d').date()
-        except ValueError:
-            raise forms.ValidationError(
-                    _(u'Invalid date: \u201c{0}\u201d.').format(
-                        new_row[u'entered']))
-        if new_row[u'social_disadvantage_mark'] == _(u'Yes'):
-            new_row[u'social_disadvantage_mark'] = True
-        elif new_row[u'social_disadvantage_mark'] == _(u'No'):
-            new_row[u'social_disadvantage_mark'] = False
-        else:
-            raise forms.ValidationError(
+            new_row[u'social_disadvantage_mark'] = self.yes_no[
+                    new_row[u'social_disadvantage_mark']]
+        except KeyError:
+            errors.append(
                     _(u'Socially supported have to be '
                     u'either \u201cYes\u201d or \u201cNo\u201d. '
                     u'Now it is \u201c{0}\u201d.').format(
@@ -174,86 +326,591 @@ def academic_import_validate_row(sheet, row):
         try:
             if new_row.get(u'municipality_code'):
                 new_row[u'municipality_code'] = (
-                        contacts_models.Municipality.objects.get(
-                            code=new_row[u'municipality_code']))
-            else:
-                new_row[u'municipality_code'] = (
-                        new_row[u'school'].municipality)
+                        lookups.get_municipality(
+                            new_row[u'municipality_code']))
+            elif school is not None:
+                new_row[u'municipality_code'] = school.municipality
         except contacts_models.Municipality.DoesNotExist:
-            raise forms.ValidationError(
+            errors.append(
                     _(u'Failed to determine municipality.'))
+        if errors:
+            raise forms.ValidationError(errors)
+        return new_row
+
+
+def academic_import_clean_row(row, lookups):
+    """ Converts row with the converter of its captions. See
+    :meth:`AcademicRowConverter.convert`.
+    """
+    return lookups.get_converter(row.keys()).convert(row)
+
+
+def academic_import_row_error(error, line, sheet_name):
+    """ Returns validation error, which tells where it occurred.
+    """
+    return forms.ValidationError(
+            _(u'{0} Error occurred in {1} line. '
+            u'Sheet name is {2}.').format(
+                u' '.join(error.messages), line, sheet_name))
+
 
+def academic_import_validate_row(sheet, row, lookups=None):
+    """ Checks if row is valid.
+    """
+    if lookups is None:
+        lookups = AcademicImportLookups()
+    try:
+        return academic_import_clean_row(row, lookups)
     except forms.ValidationError as e:
-        raise forms.ValidationError(
-                _(u'{0} Error occurred in {1} line. '
-                u'Sheet name is {2}.').format(
-                    e.messages[0], len(sheet) + 2, sheet.name))
-    return new_row
+        raise academic_import_row_error(e, len(sheet) + 2, sheet.name)
 
 
-def academic_import_validate_sheet(spreadsheet, name, sheet):
+def academic_import_validate_sheet(
+        spreadsheet, name, sheet, lookups=None):
     """ Creates sheet with correct columns.
     """
+    if lookups is None:
+        lookups = AcademicImportLookups()
     sheet = Sheet(
             captions=(
                 list(IMPORT_ACADEMICS_REQUIRED_COLUMNS.keys()) +
                 list(IMPORT_ACADEMICS_OPTIONAL_COLUMNS.keys())))
-    sheet.add_validator(academic_import_validate_row, 'insert')
+    sheet.add_validator(
+            functools.partial(
+                academic_import_validate_row, lookups=lookups),
+            'insert')
     return sheet, name
 
 
-class ImportAcademicsForm(forms.Form):
-    """ Form for importing new academics.
+def fold_name(name):
+    """ Returns case-folded ``(first_name, last_name)`` pair.
+    """
+    first_name, last_name = name
+    return first_name.lower(), last_name.lower()
+
+
+def _lower_variants(values):
+    """ Returns the set of lower case forms of the values. Besides the
+    fully lower-cased value, the one with only ASCII letters lowered is
+    added, because that is what SQLite ``lower()`` does: there non-ASCII
+    letters are matched only in the case they are given.
     """
+    variants = set()
+    for value in values:
+        variants.add(value.lower())
+        variants.add(u''.join(
+            char.lower() if char < u'\x80' else char for char in value))
+    return variants
 
-    spreadsheet = SpreadSheetField(
-            sheet_name=_(u'Academics'),
+
+def find_existing_names(names):
+    """ Returns the set of given ``(first_name, last_name)`` pairs, for
+    which human with such name already exists in database. Names are
+    compared ignoring case.
+    """
+    names = list(set(names))
+    found = set()
+    for i in range(0, len(names), DUPLICATES_QUERY_CHUNK_SIZE):
+        chunk_names = names[i:i + DUPLICATES_QUERY_CHUNK_SIZE]
+        chunk = {}
+        for name in chunk_names:
+            chunk.setdefault(fold_name(name), []).append(name)
+        query = contacts_models.Human.objects.annotate(
+                lower_first_name=Lower(u'first_name'),
+                lower_last_name=Lower(u'last_name'),
+                ).filter(
+                    lower_first_name__in=_lower_variants(
+                        first for first, last in chunk_names),
+                    lower_last_name__in=_lower_variants(
+                        last for first, last in chunk_names),
+                    ).values_list(u'first_name', u'last_name')
+        for name in query:
+            found.update(chunk.get(fold_name(name), ()))
+    return found
+
+
+class AcademicDuplicateFinder(object):
+    """ Finds imported names, which already exist in database (as given
+    or with first and last names swapped) or are repeated in the
+    imported file.
+
+    Names are compared ignoring case. They can be checked in several
+    batches; repetitions are detected across all of them.
+    """
+
+    def __init__(self):
+        self.found = []
+        self.repeated = []
+        self._seen = set()
+
+    def check(self, names):
+        """ Checks ``(first_name, last_name)`` pairs in the given order.
+        Returns the list of error messages of every pair.
+        """
+        names = list(names)
+        existing = find_existing_names(
+                names + [(last, first) for first, last in names])
+        hits = []
+        for first, last in names:
+            messages = []
+            for name in ((first, last), (last, first)):
+                if name in existing:
+                    full_name = u'{0} {1}'.format(*name)
+                    self.found.append(full_name)
+                    messages.append(
+                            _(u'{0} already exists in database.').format(
+                                full_name))
+            folded = fold_name((first, last))
+            if folded in self._seen or folded[::-1] in self._seen:
+                full_name = u'{0} {1}'.format(first, last)
+                self.repeated.append(full_name)
+                messages.append(
+                        _(u'{0} is repeated in the file.').format(
+                            full_name))
+            self._seen.add(folded)
+            hits.append(messages)
+        return hits
+
+    def errors(self):
+        """ Returns the list of error messages.
+        """
+        errors = []
+        if self.found:
+            errors.append(
+                    _(u'{0} already exists in database.').format(
+                        u', '.join(self.found)))
+        if self.repeated:
+            errors.append(
+                    _(u'{0} is repeated in the file.').format(
+                        u', '.join(self.repeated)))
+        return errors
+
+
+def academic_import_spreadsheet_field(lookups=None):
+    """ Creates spreadsheet field, which validates all sheets against
+    the same lookups.
+    """
+    return SpreadSheetField(
+            sheet_name=IMPORT_ACADEMICS_SHEET_NAME,
             spreadsheet_constructor_args={
                 'validators': {
                     'spreadsheet': [
-                        (academic_import_validate_sheet, 'add_sheet'),
+                        (functools.partial(
+                            academic_import_validate_sheet,
+                            lookups=lookups),
+                         'add_sheet'),
                         ],
                     },
                 },
             label=_(u'Spreadsheet document'),
             required=True,
+            help_text=IMPORT_ACADEMICS_HELP_TEXT,
+            )
+
+
+class StreamSpreadSheetField(forms.FileField):
+    """ Spreadsheet file field, which does not parse the file, but
+    checks if it can be read by :mod:`nmadb_academics.spreadsheets`.
+    """
+
+    def clean(self, data, initial=None):
+        data = super(StreamSpreadSheetField, self).clean(data, initial)
+        if data and (spreadsheets.get_extension(data.name) not in
+                spreadsheets.SUPPORTED_EXTENSIONS):
+            raise forms.ValidationError(
+                    _(u'Unsupported file format. '
+                    u'Supported formats are: {0}.').format(
+                        u', '.join(spreadsheets.SUPPORTED_EXTENSIONS)))
+        return data
+
+
+def academic_import_stream_field():
+    """ Creates spreadsheet field for imports, which read the file
+    later.
+    """
+    return StreamSpreadSheetField(
+            label=_(u'Spreadsheet document'),
+            required=True,
+            help_text=IMPORT_ACADEMICS_HELP_TEXT,
+            )
+
+
+def academic_import_background_field():
+    """ Creates field for choosing to import in background job.
+    """
+    return forms.BooleanField(
+            label=_(u'Import in background'),
+            required=False,
             help_text=_(
-                u'Please select spreadsheet file. '
-                u'Required columns are: {0}.'
-                u'Optional columns are: {1}.').format(
-                    u','.join(
-                        _(u'\u201c{0}\u201d').format(caption)
-                        for caption in
-                        IMPORT_ACADEMICS_REQUIRED_COLUMNS.values()),
-                    u','.join(
-                        _(u'\u201c{0}\u201d').format(caption)
-                        for caption in
-                        IMPORT_ACADEMICS_OPTIONAL_COLUMNS.values()),
-                    )
+                u'The file is only saved now and imported later by '
+                u'background worker. Import progress can be watched '
+                u'in its job page.'),
             )
 
+
+class ImportAcademicsForm(forms.Form):
+    """ Form for importing new academics.
+    """
+
+    spreadsheet = academic_import_spreadsheet_field()
+
     check_duplicates = forms.BooleanField(initial=True)
 
+    background = academic_import_background_field()
+
+    def __init__(self, *args, **kwargs):
+        super(ImportAcademicsForm, self).__init__(*args, **kwargs)
+        self.lookups = AcademicImportLookups()
+        if self.is_background():
+            self.fields['spreadsheet'] = academic_import_stream_field()
+        else:
+            self.fields['spreadsheet'] = academic_import_spreadsheet_field(
+                    self.lookups)
+
+    def is_background(self):
+        """ Returns True if import was requested to run in background.
+        In such case the file is not parsed by form.
+        """
+        field = self.fields['background']
+        return self.is_bound and field.widget.value_from_datadict(
+                self.data, self.files, self.add_prefix('background'))
+
     def clean(self):
         """ Checks for duplicates.
         """
         cleaned_data = super(ImportAcademicsForm, self).clean()
-        if cleaned_data.get(u'check_duplicates', False):
-            found = []
-            for sheet in cleaned_data.get('spreadsheet', ()):
-                for row in sheet:
-                    if contacts_models.Human.objects.filter(
-                            first_name=row[u'first_name'],
-                            last_name=row[u'last_name']).exists():
-                        found.append((u'{0[first_name]} {0[last_name]}'
-                            ).format(row))
-                    if contacts_models.Human.objects.filter(
-                            last_name=row[u'first_name'],
-                            first_name=row[u'last_name']).exists():
-                        found.append((u'{0[last_name]} {0[first_name]}'
-                            ).format(row))
-            if found:
-                raise forms.ValidationError(
-                        _(u'{0} already exists in database.').format(
-                            u', '.join(found)))
+        if (cleaned_data.get(u'check_duplicates', False) and
+                not self.is_background()):
+            duplicates = AcademicDuplicateFinder()
+            duplicates.check(
+                    (row[u'first_name'], row[u'last_name'])
+                    for sheet in cleaned_data.get('spreadsheet', ())
+                    for row in sheet)
+            if duplicates.errors():
+                raise forms.ValidationError(duplicates.errors())
         return cleaned_data
+
+
+class StreamImportAcademicsForm(forms.Form):
+    """ Form for importing large files of new academics.
+
+    The file is not parsed here: it is read, validated and imported in
+    batches by :func:`nmadb_academics.importer.import_spreadsheet`.
+    """
+
+    spreadsheet = academic_import_stream_field()
+
+    check_duplicates = forms.BooleanField(initial=True, required=False)
+
+    background = academic_import_background_field()
+
+    commit_batches = forms.BooleanField(
+            label=_(u'Commit in batches'),
+            required=False,
+            help_text=_(
+                u'Each batch is saved separately, so that the batches '
+                u'imported before an error are kept. Already imported '
+                u'rows are skipped, when the same file is uploaded '
+                u'again. Background imports are always committed in '
+                u'batches.'),
+            )
+
+    batch_size = forms.IntegerField(
+            label=_(u'Batch size'),
+            initial=IMPORT_ACADEMICS_BATCH_SIZE,
+            min_value=1,
+            required=False,
+            )
+
+    def clean_batch_size(self):
+        """ Uses default batch size if it was not given.
+        """
+        return (self.cleaned_data.get(u'batch_size') or
+                IMPORT_ACADEMICS_BATCH_SIZE)
+
+
+class ValidateAcademicsForm(forms.Form):
+    """ Form for checking academics file without importing it.
+    """
+
+    spreadsheet = academic_import_stream_field()
+
+    check_duplicates = forms.BooleanField(initial=True, required=False)
+
+
+IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS = {
+    u'first_name': _(u'First name'),
+    u'last_name': _(u'Last name'),
+    u'competition': _(u'Competition'),
+    u'competition_type': _(u'Competition type'),
+    u'place': _(u'Place'),
+    }
+
+
+IMPORT_ACHIEVEMENTS_OPTIONAL_COLUMNS = {
+    u'student_id': _(u'Student ID'),
+    u'section': _(u'Section'),
+    }
+
+
+IMPORT_ACHIEVEMENTS_SHEET_NAME = _(u'Achievements')
+
+
+# Codes (see ``Achievement.PLACES``) of the places, which can be given
+# by number: 1 is the first place, not the database code of honorable
+# mention.
+ACHIEVEMENT_PLACE_NUMBERS = {
+    1: 4,
+    2: 3,
+    3: 2,
+    }
+
+
+IMPORT_ACHIEVEMENTS_HELP_TEXT = _(
+        u'Please select spreadsheet file. '
+        u'Required columns are: {0}.'
+        u'Optional columns are: {1}. '
+        u'Students are found by ID, if it is given, otherwise by '
+        u'name. If section is given, achievement is assigned to the '
+        u'student academic of that section. Place is given by its '
+        u'title or by number from 1 to 3. Achievements, which already '
+        u'exist, are rejected.').format(
+            u','.join(
+                _(u'\u201c{0}\u201d').format(caption)
+                for caption in
+                IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS.values()),
+            u','.join(
+                _(u'\u201c{0}\u201d').format(caption)
+                for caption in
+                IMPORT_ACHIEVEMENTS_OPTIONAL_COLUMNS.values()),
+            )
+
+
+class AchievementImportLookups(AcademicImportLookups):
+    """ Reference data used by achievement row validation: sections
+    (see :class:`AcademicImportLookups`), students and academics.
+    """
+
+    def __init__(self):
+        super(AchievementImportLookups, self).__init__()
+        self._students = None
+        self._students_by_name = None
+        self._academics = None
+
+    def _load_students(self):
+        """ Loads names of all students with one query.
+        """
+        self._students = {}
+        self._students_by_name = {}
+        for student_id, first_name, last_name in (
+                students_models.Student.objects.values_list(
+                    u'id', u'first_name', u'last_name')):
+            name = (first_name.lower(), last_name.lower())
+            self._students[student_id] = name
+            self._students_by_name.setdefault(name, []).append(student_id)
+
+    @property
+    def students(self):
+        """ Lower-cased ``(first name, last name)`` by student ID.
+        """
+        if self._students is None:
+            self._load_students()
+        return self._students
+
+    @property
+    def students_by_name(self):
+        """ Lists of student IDs by lower-cased ``(first name, last
+        name)``.
+        """
+        if self._students_by_name is None:
+            self._load_students()
+        return self._students_by_name
+
+    @property
+    def academics(self):
+        """ ID of the last entered academic by ``(student ID, section
+        ID)``.
+        """
+        if self._academics is None:
+            self._academics = dict(
+                    ((student_id, section_id), academic_id)
+                    for academic_id, student_id, section_id in
+                    models.Academic.objects.order_by(
+                        u'entered', u'id').values_list(
+                            u'id', u'student_id', u'section_id'))
+        return self._academics
+
+    def load(self):
+        """ Loads all reference data.
+        """
+        return self.sections, self.students, self.academics
+
+    def get_converter(self, captions):
+        """ Returns achievement row converter of given captions, which
+        is created once per distinct set of captions.
+        """
+        key = frozenset(captions)
+        converter = self._converters.get(key)
+        if converter is None:
+            converter = AchievementRowConverter(key, self)
+            self._converters[key] = converter
+        return converter
+
+
+def _cell_text(value):
+    """ Returns stripped text of the cell value.
+    """
+    if value is None:
+        return u''
+    return unicode(value).strip()
+
+
+def _parse_choice_number(value):
+    """ Returns integer of the cell value (spreadsheets may give ``4.0``)
+    or None.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != int(number):
+        return None
+    return int(number)
+
+
+class AchievementRowConverter(object):
+    """ Converter of achievement rows with given captions. Raises
+    ``ValidationError`` listing all missing columns.
+    """
+
+    def __init__(self, captions, lookups):
+        captions = set(captions)
+        missing = [
+                _(u'Missing column: \u201c{0}\u201d.').format(caption)
+                for caption in IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS.values()
+                if caption not in captions]
+        if missing:
+            raise forms.ValidationError(missing)
+        self.lookups = lookups
+        self.columns = [
+                (column, caption)
+                for columns in (
+                    IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS,
+                    IMPORT_ACHIEVEMENTS_OPTIONAL_COLUMNS)
+                for column, caption in columns.items()
+                if caption in captions]
+        self.competition_types = {}
+        for code, title in models.Achievement.COMPETITION_TYPES:
+            self.competition_types[code.lower()] = code
+            self.competition_types[unicode(title).lower()] = code
+        self.places = dict(
+                (unicode(title).lower(), place)
+                for place, title in models.Achievement.PLACES)
+        self.max_competition_length = models.Achievement._meta.get_field(
+                u'competition').max_length
+
+    def get_student(self, new_row, errors):
+        """ Returns ID of the student, who is found by ID or by name.
+        """
+        lookups = self.lookups
+        name = (new_row[u'first_name'].lower(),
+                new_row[u'last_name'].lower())
+        full_name = u'{0} {1}'.format(
+                new_row[u'first_name'], new_row[u'last_name'])
+        if new_row.get(u'student_id'):
+            student_id = _parse_choice_number(new_row[u'student_id'])
+            if student_id not in lookups.students:
+                errors.append(
+                        _(u'Student not found: \u201c{0}\u201d.').format(
+                            new_row[u'student_id']))
+                return None
+            if lookups.students[student_id] != name:
+                errors.append(
+                        _(u'Student {0} is not {1}.').format(
+                            student_id, full_name))
+                return None
+            return student_id
+        student_ids = lookups.students_by_name.get(name, [])
+        if not student_ids:
+            errors.append(
+                    _(u'Student not found: \u201c{0}\u201d.').format(
+                        full_name))
+            return None
+        if len(student_ids) > 1:
+            errors.append(
+                    _(u'There are several students named {0}, please '
+                    u'give student ID.').format(full_name))
+            return None
+        return student_ids[0]
+
+    def convert(self, row):
+        """ Converts row, which maps column captions to values, to the
+        dictionary of achievement field values.
+
+        All errors of the row are collected and raised together.
+        """
+        new_row = dict(
+                (column, _cell_text(row[caption]))
+                for column, caption in self.columns)
+        errors = []
+        student_id = self.get_student(new_row, errors)
+        academic_id = None
+        if new_row.get(u'section'):
+            try:
+                section = self.lookups.get_section(new_row[u'section'])
+            except models.Section.DoesNotExist:
+                errors.append(
+                        _(u'Section not found: \u201c{0}\u201d.').format(
+                            new_row[u'section']))
+            else:
+                if student_id is not None:
+                    academic_id = self.lookups.academics.get(
+                            (student_id, section.id))
+                    if academic_id is None:
+                        errors.append(
+                                _(u'Student is not an academic of '
+                                u'section \u201c{0}\u201d.').format(
+                                    section.title))
+        if not new_row[u'competition']:
+            errors.append(_(u'Competition must be not empty.'))
+        elif len(new_row[u'competition']) > self.max_competition_length:
+            errors.append(
+                    _(u'Competition name is longer than {0} '
+                    u'characters.').format(self.max_competition_length))
+        competition_type = self.competition_types.get(
+                new_row[u'competition_type'].lower())
+        if competition_type is None:
+            errors.append(
+                    _(u'Unknown competition type: \u201c{0}\u201d.').format(
+                        new_row[u'competition_type']))
+        place = self.places.get(new_row[u'place'].lower())
+        if place is None:
+            place = ACHIEVEMENT_PLACE_NUMBERS.get(
+                    _parse_choice_number(new_row[u'place']))
+            if place is None:
+                errors.append(
+                        _(u'Unknown place: \u201c{0}\u201d.').format(
+                            new_row[u'place']))
+        if errors:
+            raise forms.ValidationError(errors)
+        return {
+                u'student_id': student_id,
+                u'academic_id': academic_id,
+                u'competition': new_row[u'competition'],
+                u'competition_type': competition_type,
+                u'place': place,
+                }
+
+
+class ImportAchievementsForm(forms.Form):
+    """ Form for importing achievements.
+
+    The file is validated and imported by
+    :func:`nmadb_academics.importer.import_achievements`.
+    """
+
+    spreadsheet = StreamSpreadSheetField(
+            label=_(u'Spreadsheet document'),
+            required=True,
+            help_text=IMPORT_ACHIEVEMENTS_HELP_TEXT,
+            )
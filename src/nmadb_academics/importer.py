@@ -0,0 +1,539 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Batched persistence of imported academics.
+"""
+
+
+import bisect
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils.translation import ugettext as _
+
+from nmadb_students import models as students_models
+from nmadb_contacts import models as contacts_models
+from nmadb_academics import (
+        forms, models, queries, rankings, roster, search, spreadsheets,
+        validation)
+
+
+BATCH_SIZE = forms.IMPORT_ACADEMICS_BATCH_SIZE
+
+
+class AcademicImporter(object):
+    """ Collects validated import rows and writes them to database in
+    batches.
+
+    Students are multi-table inherited from humans, therefore they
+    (and their school relation) are still saved one by one. Everything
+    else is written with one ``bulk_create`` per model and batch, and
+    ``main_address`` is filled in with a single ``UPDATE`` per batch.
+    Roster rows of the batch are built at once after it is written.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.counter = 0
+        self._rows = []
+
+    def add(self, row):
+        """ Queues row for import. Writes the batch when it is full.
+        """
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ Writes all queued rows.
+        """
+        rows, self._rows = self._rows, []
+        if rows:
+            self._write(rows)
+            self.counter += len(rows)
+
+    def _write(self, rows):
+        """ Writes one batch of rows.
+        """
+        with roster.deferred():
+            self._write_batch(rows)
+
+    def _write_batch(self, rows):
+        """ Writes one batch of rows without refreshing roster.
+        """
+        students = []
+        marks = []
+        academics = []
+        emails = []
+        addresses = []
+        phones = []
+        for row in rows:
+            student = students_models.Student()
+            student.first_name = row[u'first_name']
+            student.last_name = row[u'last_name']
+            student.gender = row[u'gender']
+            student.birth_date = row[u'birth_date']
+            student.school_class = row[u'school_class']
+            student.school_year = row[u'school_year']
+            student.save()
+            student.change_school(row[u'school'], row[u'entered'])
+            students.append(student)
+            if row[u'social_disadvantage_mark']:
+                marks.append(students_models.SocialDisadvantageMark(
+                    student=student,
+                    start=row[u'entered'],
+                    end=None,
+                    ))
+            academics.append(models.Academic(
+                student=student,
+                section=row[u'section'],
+                entered=row[u'entered'],
+                left=None,
+                leaving_reason=None,
+                comment=None,
+                graduation_year=models.get_graduation_year(student),
+                ))
+            emails.append(contacts_models.Email(
+                human=student,
+                address=row[u'email'],
+                ))
+            addresses.append(contacts_models.Address(
+                human=student,
+                town=row[u'town'],
+                address=row[u'main_address'],
+                municipality=row[u'municipality_code'],
+                ))
+            if row[u'phone']:
+                phones.append(contacts_models.Phone(
+                    human=student,
+                    number=row[u'phone'],
+                    ))
+        for model, objects in (
+                (students_models.SocialDisadvantageMark, marks),
+                (models.Academic, academics),
+                (contacts_models.Email, emails),
+                (contacts_models.Address, addresses),
+                (contacts_models.Phone, phones),
+                ):
+            if objects:
+                model.objects.bulk_create(objects)
+        student_ids = [s.pk for s in students]
+        set_main_addresses(student_ids)
+        roster.refresh_students(student_ids)
+        models.academics_changed()
+
+
+def set_main_addresses(student_ids, chunk_size=queries.CHUNK_SIZE):
+    """ Sets ``main_address`` of given students to their address.
+
+    ``bulk_create`` does not return primary keys, so the addresses
+    are matched by human in a correlated ``UPDATE`` per chunk of
+    students (databases limit the number of query parameters).
+    """
+    student_ids = list(student_ids)
+    field = students_models.Student._meta.get_field('main_address')
+    owner = field.model._meta
+    address = contacts_models.Address._meta
+    quote = connection.ops.quote_name
+    cursor = connection.cursor()
+    for i in range(0, len(student_ids), chunk_size):
+        chunk = student_ids[i:i + chunk_size]
+        sql = (
+                u'UPDATE {table} SET {column} = ('
+                u'SELECT MAX({address_table}.{address_pk}) '
+                u'FROM {address_table} '
+                u'WHERE {address_table}.{address_human} = {table}.{pk}) '
+                u'WHERE {pk} IN ({ids})').format(
+                    table=quote(owner.db_table),
+                    column=quote(field.column),
+                    pk=quote(owner.pk.column),
+                    address_table=quote(address.db_table),
+                    address_pk=quote(address.pk.column),
+                    address_human=quote(address.get_field('human').column),
+                    ids=u', '.join([u'%s'] * len(chunk)),
+                    )
+        cursor.execute(sql, chunk)
+
+
+def file_hash(uploaded_file):
+    """ Returns SHA-1 digest of the uploaded file contents.
+    """
+    digest = hashlib.sha1()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_numbered_batches(
+        uploaded_file, lookups=None, check_duplicates=True,
+        batch_size=BATCH_SIZE, workers=None, skip=None):
+    """ Reads uploaded spreadsheet row by row and yields ``(first row,
+    rows)`` pairs of validated batches, which were checked for
+    duplicates, so that memory usage does not depend on the file size.
+    Rows are numbered from 0 in the file order, across all sheets.
+    Rows are validated by ``workers`` processes, in the calling process
+    by default (see :mod:`nmadb_academics.validation`).
+
+    Rows, whose numbers ``skip`` returns True for, are left out; they
+    end the current batch, so that every batch is a range of rows.
+
+    Raises ``ValidationError`` on the first invalid row or batch with
+    duplicates.
+    """
+    if check_duplicates:
+        duplicates = forms.AcademicDuplicateFinder()
+    else:
+        duplicates = None
+
+    def checked(first_row, batch):
+        """ Checks batch for duplicates.
+        """
+        if duplicates is not None:
+            check_batch_duplicates(duplicates, batch)
+        return first_row, batch
+
+    batch = []
+    first_row = 0
+    for number, (sheet_name, line, row, new_row, error) in enumerate(
+            validation.iter_cleaned_rows(
+                uploaded_file, lookups, workers, batch_size)):
+        if skip is not None and skip(number):
+            if batch:
+                yield checked(first_row, batch)
+                batch = []
+            continue
+        if error is not None:
+            raise forms.academic_import_row_error(error, line, sheet_name)
+        if not batch:
+            first_row = number
+        batch.append(new_row)
+        if len(batch) >= batch_size:
+            yield checked(first_row, batch)
+            batch = []
+    if batch:
+        yield checked(first_row, batch)
+
+
+def iter_spreadsheet_batches(
+        uploaded_file, lookups=None, check_duplicates=True,
+        batch_size=BATCH_SIZE, workers=None):
+    """ Yields lists of validated rows, which were checked for
+    duplicates. See :func:`iter_numbered_batches`.
+    """
+    for _first_row, batch in iter_numbered_batches(
+            uploaded_file, lookups, check_duplicates, batch_size,
+            workers):
+        yield batch
+
+
+def check_batch_duplicates(duplicates, batch):
+    """ Checks validated rows with duplicate finder. Raises
+    ``ValidationError`` if duplicates were found.
+    """
+    duplicates.check(
+            (row[u'first_name'], row[u'last_name'])
+            for row in batch)
+    if duplicates.errors():
+        raise ValidationError(duplicates.errors())
+
+
+class CommittedBatches(object):
+    """ Row ranges of the file, which were committed by earlier imports.
+    """
+
+    def __init__(self, digest):
+        self.ranges = list(models.ImportBatch.objects.filter(
+            file_hash=digest).order_by(u'first_row').values_list(
+                u'first_row', u'rows'))
+        self._starts = [first_row for first_row, _rows in self.ranges]
+
+    def find(self, number):
+        """ Returns the index of committed batch, which includes the
+        row, or None.
+        """
+        index = bisect.bisect_right(self._starts, number) - 1
+        if index >= 0 and number < sum(self.ranges[index]):
+            return index
+        return None
+
+
+class PartialImport(object):
+    """ Import, which commits every batch separately, so that a failure
+    keeps the batches imported before it.
+
+    Committed batches are recorded by the file digest and their row
+    range. When the same file is imported again (for example, after a
+    crash or after a duplicate was removed from database), its
+    committed rows are skipped, even if batch size has changed. Each
+    batch is an atomic block: a transaction of its own, or a savepoint
+    if import is run inside a transaction.
+    """
+
+    def __init__(
+            self, lookups=None, check_duplicates=True,
+            batch_size=BATCH_SIZE, workers=None):
+        self.lookups = lookups
+        self.check_duplicates = check_duplicates
+        self.batch_size = batch_size
+        self.workers = workers
+        self.batches = 0
+        self.skipped = 0
+        self.imported = 0
+
+    def run(self, uploaded_file, progress=None):
+        """ Imports uploaded spreadsheet. Calls ``progress`` with this
+        object after every batch and at the end.
+
+        Raises ``ValidationError`` on the first invalid row or batch
+        with duplicates; batches before it stay committed.
+        """
+        digest = file_hash(uploaded_file)
+        committed = CommittedBatches(digest)
+        skipped = set()
+
+        def skip(number):
+            """ Returns True if the row was committed before.
+            """
+            index = committed.find(number)
+            if index is None:
+                return False
+            if index not in skipped:
+                skipped.add(index)
+                self.skipped += 1
+            return True
+
+        for first_row, batch in iter_numbered_batches(
+                uploaded_file, self.lookups, self.check_duplicates,
+                self.batch_size, self.workers, skip):
+            with transaction.atomic():
+                academics = AcademicImporter(len(batch))
+                for row in batch:
+                    academics.add(row)
+                academics.flush()
+                models.ImportBatch.objects.create(
+                        file_hash=digest, first_row=first_row,
+                        rows=len(batch))
+            self.batches += 1
+            self.imported += len(batch)
+            if progress is not None:
+                progress(self)
+        if progress is not None:
+            progress(self)
+        return self
+
+
+VALIDATION_REPORT_CAPTIONS = (
+        _(u'Sheet'),
+        _(u'Line'),
+        _(u'First name'),
+        _(u'Last name'),
+        _(u'Error'),
+        )
+
+
+class ValidationReport(object):
+    """ Errors found by :func:`validate_spreadsheet` or
+    :func:`import_achievements`, one entry per error message.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._errors = []
+
+    def add(self, number, sheet_name, line, first_name, last_name,
+            message):
+        """ Adds error of the row, which is ``number``-th in the file.
+        """
+        self._errors.append(
+                (number, (sheet_name, line, first_name, last_name,
+                          message)))
+
+    def is_valid(self):
+        """ Returns True if no errors were found.
+        """
+        return not self._errors
+
+    def errors(self):
+        """ Returns the list of ``(sheet name, line, first name, last
+        name, message)`` tuples in the file order.
+        """
+        return [
+                error for _number, error in sorted(
+                    self._errors, key=lambda entry: entry[0])]
+
+
+def validate_spreadsheet(
+        uploaded_file, lookups=None, check_duplicates=True,
+        batch_size=BATCH_SIZE, workers=None):
+    """ Validates every row of uploaded spreadsheet and checks it for
+    duplicates without writing anything to database.
+
+    Unlike :func:`iter_spreadsheet_batches` it does not stop on the
+    first error, but collects all errors into returned
+    :class:`ValidationReport`. Raises ``ValidationError`` only if the
+    file cannot be read.
+    """
+    if check_duplicates:
+        duplicates = forms.AcademicDuplicateFinder()
+    else:
+        duplicates = None
+    report = ValidationReport()
+
+    def check(batch):
+        """ Checks batch of ``(number, sheet name, line, first name,
+        last name)`` tuples for duplicates.
+        """
+        if duplicates is None or not batch:
+            return
+        hits = duplicates.check(
+                (first_name, last_name)
+                for _n, _s, _l, first_name, last_name in batch)
+        for entry, messages in zip(batch, hits):
+            for message in messages:
+                report.add(*(entry + (message,)))
+
+    first_name_caption = forms.IMPORT_ACADEMICS_REQUIRED_COLUMNS[
+            u'first_name']
+    last_name_caption = forms.IMPORT_ACADEMICS_REQUIRED_COLUMNS[
+            u'last_name']
+    batch = []
+    for sheet_name, line, row, cleaned, error in (
+            validation.iter_cleaned_rows(
+                uploaded_file, lookups, workers, batch_size)):
+        number = report.rows
+        report.rows += 1
+        if error is not None:
+            for message in error.messages:
+                report.add(
+                        number, sheet_name, line,
+                        row.get(first_name_caption),
+                        row.get(last_name_caption),
+                        message)
+            continue
+        batch.append((
+            number, sheet_name, line,
+            cleaned[u'first_name'], cleaned[u'last_name']))
+        if len(batch) >= batch_size:
+            check(batch)
+            batch = []
+    check(batch)
+    return report
+
+
+def import_spreadsheet(
+        uploaded_file, lookups=None, check_duplicates=True,
+        batch_size=BATCH_SIZE, workers=None):
+    """ Imports uploaded spreadsheet in batches.
+
+    Returns the number of imported academics. Raises
+    ``ValidationError`` on the first invalid row or batch with
+    duplicates, therefore it should be called inside a transaction.
+    """
+    academics = AcademicImporter(batch_size)
+    for batch in iter_spreadsheet_batches(
+            uploaded_file, lookups, check_duplicates, batch_size,
+            workers):
+        for row in batch:
+            academics.add(row)
+        academics.flush()
+    return academics.counter
+
+
+def _achievement_key(student_id, competition, competition_type, place):
+    """ Returns the key, by which duplicate achievements are found.
+    """
+    return student_id, competition.lower(), competition_type, place
+
+
+def check_achievement_duplicates(
+        report, achievements, entries, chunk_size=queries.CHUNK_SIZE):
+    """ Adds errors of achievements, which already exist in database
+    (the same student, competition, type and place) or are repeated in
+    the file, to the report. ``entries`` are ``(number, sheet name,
+    line, first name, last name)`` tuples of the achievements.
+    """
+    student_ids = list(set(
+            achievement.student_id for achievement in achievements))
+    existing = set()
+    for i in range(0, len(student_ids), chunk_size):
+        existing.update(
+                _achievement_key(*values)
+                for values in models.Achievement.objects.filter(
+                    student_id__in=student_ids[i:i + chunk_size]
+                    ).values_list(
+                        u'student_id', u'competition',
+                        u'competition_type', u'place'))
+    seen = set()
+    for achievement, entry in zip(achievements, entries):
+        key = _achievement_key(
+                achievement.student_id, achievement.competition,
+                achievement.competition_type, achievement.place)
+        if key in existing:
+            report.add(*(entry + (
+                _(u'Achievement already exists in database.'),)))
+        elif key in seen:
+            report.add(*(entry + (
+                _(u'Achievement is repeated in the file.'),)))
+        seen.add(key)
+
+
+def import_achievements(
+        uploaded_file, lookups=None, batch_size=BATCH_SIZE):
+    """ Validates every row of uploaded achievements spreadsheet and, if
+    all rows are valid, creates achievements with one ``bulk_create``
+    per batch.
+
+    Returns ``(report, count)``: :class:`ValidationReport` of all found
+    errors and the number of created achievements (0, if any row is
+    invalid). Raises ``ValidationError`` if the file cannot be read.
+    Should be called inside a transaction.
+    """
+    if lookups is None:
+        lookups = forms.AchievementImportLookups()
+    first_name_caption = forms.IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS[
+            u'first_name']
+    last_name_caption = forms.IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS[
+            u'last_name']
+    report = ValidationReport()
+    achievements = []
+    entries = []
+    for sheet_name, rows in spreadsheets.read_spreadsheet(
+            uploaded_file, forms.IMPORT_ACHIEVEMENTS_SHEET_NAME):
+        converter = None
+        for line, row in rows:
+            number = report.rows
+            report.rows += 1
+            try:
+                converter = lookups.get_converter(row.keys())
+                cleaned = converter.convert(row)
+            except ValidationError as e:
+                for message in e.messages:
+                    report.add(
+                            number, sheet_name, line,
+                            row.get(first_name_caption),
+                            row.get(last_name_caption),
+                            message)
+                if converter is None:
+                    # Missing columns are reported once per sheet.
+                    break
+                continue
+            achievements.append(models.Achievement(**cleaned))
+            entries.append((
+                number, sheet_name, line, row.get(first_name_caption),
+                row.get(last_name_caption)))
+    check_achievement_duplicates(report, achievements, entries)
+    if not report.is_valid():
+        return report, 0
+    for i in range(0, len(achievements), batch_size):
+        models.Achievement.objects.bulk_create(
+                achievements[i:i + batch_size])
+    # Achievements created in bulk do not send signals.
+    student_ids = list(set(
+            achievement.student_id for achievement in achievements))
+    for i in range(0, len(student_ids), batch_size):
+        search.index_achievements(models.Achievement.objects.filter(
+            student_id__in=student_ids[i:i + batch_size]))
+    rankings.refresh_achievements(achievements)
+    return report, len(achievements)
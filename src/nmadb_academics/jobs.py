@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Background academics import jobs.
+
+Jobs are queued in database and run by ``run_import_jobs`` management
+command, several of which can work at the same time. Running job
+records its progress after every batch. Jobs left running by a crashed
+worker are returned to the queue once they have made no progress for
+``NMADB_ACADEMICS_IMPORT_JOB_TIMEOUT`` seconds; batches committed
+before the crash are skipped when such job is run again.
+"""
+
+
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from nmadb_academics import forms, importer, models, validation
+
+
+log = logging.getLogger(__name__)
+
+
+class JobReset(Exception):
+    """ Raised, when running job was reset as stale and can be claimed
+    by another worker.
+    """
+
+
+def enqueue(
+        uploaded_file, check_duplicates=True,
+        batch_size=importer.BATCH_SIZE):
+    """ Creates pending import job for uploaded file.
+    """
+    return models.ImportJob.objects.create(
+            spreadsheet=uploaded_file,
+            check_duplicates=check_duplicates,
+            batch_size=batch_size,
+            )
+
+
+def get_timeout():
+    """ Returns the number of seconds without progress, after which
+    running job is considered abandoned, configured by
+    ``NMADB_ACADEMICS_IMPORT_JOB_TIMEOUT`` setting (default one hour).
+    """
+    return getattr(settings, 'NMADB_ACADEMICS_IMPORT_JOB_TIMEOUT', 3600)
+
+
+def reset_stale_jobs(timeout=None):
+    """ Marks running jobs, which have made no progress for more than
+    ``timeout`` seconds, as pending again. Returns the number of reset
+    jobs.
+    """
+    if timeout is None:
+        timeout = get_timeout()
+    stale = models.ImportJob.objects.filter(
+            status=u'R',
+            updated__lt=timezone.now() - datetime.timedelta(
+                seconds=timeout))
+    count = stale.update(status=u'P', started=None, updated=None)
+    if count:
+        log.warning(u'%s stale import jobs were reset.', count)
+    return count
+
+
+def claim_next_job():
+    """ Marks the oldest pending job as running and returns it. Returns
+    None if there are no pending jobs.
+    """
+    pending = models.ImportJob.objects.filter(status=u'P')
+    for job_id in pending.order_by(u'created').values_list(
+            u'id', flat=True)[:10]:
+        now = timezone.now()
+        claimed = pending.filter(id=job_id).update(
+                status=u'R', started=now, updated=now)
+        if claimed:
+            return models.ImportJob.objects.get(id=job_id)
+    return None
+
+
+def running_job(job):
+    """ Returns the queryset of the job, while it is run by the worker,
+    which claimed it: updates of it change nothing once the job was
+    reset or claimed again.
+    """
+    return models.ImportJob.objects.filter(
+            id=job.id, status=u'R', started=job.started)
+
+
+def record_progress(job, partial):
+    """ Records progress of the job and the time of it, which keeps the
+    job from being reset as stale. Raises :class:`JobReset` if the job
+    is no longer run by this worker.
+    """
+    job.batches = partial.batches
+    job.skipped_batches = partial.skipped
+    job.imported = partial.imported
+    job.updated = timezone.now()
+    if not running_job(job).update(
+            batches=job.batches,
+            skipped_batches=job.skipped_batches,
+            imported=job.imported,
+            updated=job.updated):
+        raise JobReset(job.id)
+
+
+def run_job(job, workers=None):
+    """ Runs import job, validating rows with ``workers`` processes
+    (by default :func:`nmadb_academics.validation.get_workers`).
+
+    Each batch is committed separately and progress is recorded after
+    it, so that it is visible while the job is still running. If the
+    job fails, committed batches are kept and skipped, when the job is
+    run again or the same file is imported again.
+
+    If the job was reset as stale meanwhile, it is stopped after the
+    current batch and left to the worker, which claims it again.
+    """
+    if workers is None:
+        workers = validation.get_workers()
+    partial = importer.PartialImport(
+            forms.AcademicImportLookups(), job.check_duplicates,
+            job.batch_size, workers)
+    try:
+        job.spreadsheet.open(u'rb')
+        partial.run(job.spreadsheet, lambda p: record_progress(job, p))
+    except JobReset:
+        log.warning(u'Import job %s was reset while running.', job.id)
+        return job
+    except ValidationError as e:
+        job.status = u'F'
+        job.errors = u'\n'.join(e.messages)
+    except Exception as e:    # pylint: disable=W0703
+        log.exception(u'Import job %s failed.', job.id)
+        job.status = u'F'
+        job.errors = unicode(e)
+    else:
+        job.status = u'D'
+    finally:
+        job.spreadsheet.close()
+    job.finished = timezone.now()
+    if not running_job(job).update(
+            status=job.status, errors=job.errors, finished=job.finished):
+        log.warning(u'Import job %s was reset while running.', job.id)
+    return job
@@ -0,0 +1,157 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Set based closing of academics: end of school year graduation and
+leaving of abolished sections.
+
+Academics are marked as left with one ``UPDATE``. It does not send
+signals, therefore caches, roster and search index of the changed
+academics are refreshed here.
+"""
+
+
+import datetime
+
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from nmadb_academics import models, queries, roster
+
+
+CHUNK_SIZE = queries.CHUNK_SIZE
+
+FINISHED = u'F'
+
+GRADUATION_CLASS = 12
+
+
+def get_school_year(date=None):
+    """ Returns the year, in which the school year of the date (today by
+    default) ends. School year starts in September.
+    """
+    if date is None:
+        date = datetime.date.today()
+    if date.month >= 9:
+        return date.year + 1
+    else:
+        return date.year
+
+
+def open_academics(queryset=None):
+    """ Returns academics of the queryset (all by default), who still
+    study.
+    """
+    if queryset is None:
+        queryset = models.Academic.objects.all()
+    return queryset.filter(leaving_reason=None)
+
+
+def graduating_academics(school_class=GRADUATION_CLASS, date=None):
+    """ Returns academics, who still study and are in the given class
+    during the school year of the date.
+    """
+    return open_academics().filter(
+            graduation_year=get_school_year(date) - school_class + 12)
+
+
+class LeavingSummary(object):
+    """ What :func:`mark_left` changed: the number of academics by
+    section title.
+    """
+
+    def __init__(self, left, leaving_reason, sections):
+        self.left = left
+        self.leaving_reason = leaving_reason
+        self.sections = sections
+
+    @property
+    def total(self):
+        """ The number of changed academics.
+        """
+        return sum(self.sections.values())
+
+    def __unicode__(self):
+        return u', '.join(
+                u'{0}: {1}'.format(title, count)
+                for title, count in sorted(self.sections.items()))
+
+
+def mark_left(queryset, left=None, leaving_reason=FINISHED):
+    """ Marks academics of the queryset, who still study, as left on
+    the given date (today by default) with one ``UPDATE``.
+
+    Returns :class:`LeavingSummary`.
+    """
+    if left is None:
+        left = datetime.date.today()
+    queryset = open_academics(queryset.order_by())
+    academic_ids = []
+    section_ids = {}
+    for academic_id, section_id in queryset.values_list(
+            u'id', u'section_id'):
+        academic_ids.append(academic_id)
+        section_ids[section_id] = section_ids.get(section_id, 0) + 1
+    if academic_ids:
+        queryset.update(left=left, leaving_reason=leaving_reason)
+        models.academics_changed()
+        # Leaving date is searchable.
+        for i in range(0, len(academic_ids), CHUNK_SIZE):
+            roster.refresh(models.Academic.objects.filter(
+                id__in=academic_ids[i:i + CHUNK_SIZE]))
+    titles = dict(models.Section.objects.filter(
+        id__in=list(section_ids)).values_list(u'id', u'title'))
+    return LeavingSummary(
+            left, leaving_reason,
+            dict(
+                (titles[section_id], count)
+                for section_id, count in section_ids.items()))
+
+
+def graduate(left=None, school_class=GRADUATION_CLASS):
+    """ Marks academics of the graduating class as finished. Returns
+    :class:`LeavingSummary`.
+    """
+    return mark_left(
+            graduating_academics(school_class, left), left, FINISHED)
+
+
+def abolished_section_academics(section):
+    """ Returns academics of the abolished section, who entered before
+    its abolition.
+    """
+    return models.Academic.objects.filter(
+            section=section, entered__lte=section.abolished)
+
+
+def close_section(section, leaving_reason=FINISHED):
+    """ Marks academics of the abolished section, who still study, as
+    left on the abolition date. Returns :class:`LeavingSummary`.
+    """
+    return mark_left(
+            abolished_section_academics(section), section.abolished,
+            leaving_reason)
+
+
+@receiver(pre_save, sender=models.Section)
+def section_pre_save(sender, instance, **kwargs):
+    """ Remembers the abolition date of the changed section, so that
+    academics are closed only when the section is abolished, not every
+    time an abolished section is saved.
+    """
+    instance._abolished_before = None
+    if instance.pk and not kwargs.get(u'raw'):
+        instance._abolished_before = models.Section.objects.filter(
+                pk=instance.pk).values_list(
+                    u'abolished', flat=True).first()
+
+
+@receiver(post_save, sender=models.Section)
+def section_saved(sender, instance, **kwargs):
+    """ Closes academics of the section, when it is abolished.
+    """
+    if kwargs.get(u'raw'):
+        return
+    if (instance.abolished is not None and
+            getattr(instance, u'_abolished_before', None) is None):
+        close_section(instance)
@@ -0,0 +1 @@
+#!/usr/bin/python
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+import datetime
+
+from django.core.management.base import NoArgsCommand
+from django.db import connection
+
+from nmadb_academics import models
+
+
+EXPLAIN_PREFIXES = {
+    'sqlite': u'EXPLAIN QUERY PLAN ',
+    'postgresql': u'EXPLAIN ',
+    'mysql': u'EXPLAIN ',
+    }
+
+
+def filter_querysets():
+    """ Returns ``(description, queryset)`` pairs of the queries made
+    by academic and achievement changelist filters.
+    """
+    year = datetime.date.today().year
+    academics = models.Academic.objects.all()
+    achievements = models.Achievement.objects.all()
+    section = models.Section.objects.order_by(u'id').first()
+    return (
+            (u'Academics entered in {0}'.format(year),
+             academics.filter(
+                 entered__gte=datetime.date(year, 1, 1),
+                 entered__lte=datetime.date(year, 12, 31))),
+            (u'First and last entered academic',
+             academics.order_by(u'entered')[:1]),
+            (u'Academics, who finished',
+             academics.filter(leaving_reason=u'F')),
+            (u'Academics, who study',
+             academics.filter(leaving_reason=None)),
+            (u'Academics of section, who study',
+             academics.filter(section=section, leaving_reason=None)),
+            (u'Academics ordered by student and section',
+             academics.order_by(u'student_id', u'section_id')[:100]),
+            (u'National achievements',
+             achievements.filter(competition_type=u'N')),
+            (u'National first place achievements',
+             achievements.filter(competition_type=u'N', place=4)),
+            )
+
+
+class Command(NoArgsCommand):
+    """ Prints query plans of changelist filter queries.
+
+    Run it before and after applying index migrations to check, that
+    filters use indexes instead of sequential scans.
+    """
+
+    help = u'Prints query plans of academic changelist filter queries.'
+
+    def handle_noargs(self, **options):
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor, u'EXPLAIN ')
+        cursor = connection.cursor()
+        for description, queryset in filter_querysets():
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(prefix + sql, params)
+            self.stdout.write(u'{0}:'.format(description))
+            for row in cursor.fetchall():
+                self.stdout.write(u'    ' + u' '.join(
+                    unicode(column) for column in row))
+            self.stdout.write(u'')
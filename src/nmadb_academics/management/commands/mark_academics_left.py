@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+import datetime
+from optparse import make_option
+
+from django.core.management.base import CommandError, NoArgsCommand
+from django.db import transaction
+
+from nmadb_academics import leaving, models
+
+
+class Command(NoArgsCommand):
+    """ Marks academics, who still study, as left with one ``UPDATE``.
+
+    By default graduates the academics of the 12th class at the end of
+    the current school year. With ``--section`` all academics of the
+    section are closed; with ``--abolished`` academics of all abolished
+    sections are closed on the abolition date.
+    """
+
+    help = u'Marks academics, who still study, as left.'
+
+    option_list = NoArgsCommand.option_list + (
+            make_option(
+                '--date',
+                dest='date',
+                default=None,
+                help=u'Leaving date in YYYY-MM-DD format (default '
+                     u'today).'),
+            make_option(
+                '--reason',
+                dest='reason',
+                default=leaving.FINISHED,
+                help=u'Leaving reason code (default \u201c{0}\u201d).'.format(
+                    leaving.FINISHED)),
+            make_option(
+                '--class',
+                type='int',
+                dest='school_class',
+                default=leaving.GRADUATION_CLASS,
+                help=u'Current class of academics, who leave (default '
+                     u'{0}).'.format(leaving.GRADUATION_CLASS)),
+            make_option(
+                '--section',
+                dest='section',
+                default=None,
+                help=u'Abbreviation of the section, all academics of '
+                     u'which leave.'),
+            make_option(
+                '--abolished',
+                action='store_true',
+                dest='abolished',
+                default=False,
+                help=u'Close academics of abolished sections.'),
+            make_option(
+                '--dry-run',
+                action='store_true',
+                dest='dry_run',
+                default=False,
+                help=u'Only count academics, who would leave.'),
+            )
+
+    def handle_noargs(self, **options):
+        if options['reason'] not in dict(models.Academic.LEAVING_REASON):
+            raise CommandError(
+                    u'Unknown leaving reason: {0}.'.format(options['reason']))
+        left = None
+        if options['date']:
+            try:
+                left = datetime.datetime.strptime(
+                        options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(
+                        u'Invalid date: {0}.'.format(options['date']))
+        if options['abolished']:
+            targets = [
+                    (leaving.abolished_section_academics(section),
+                     section.abolished)
+                    for section in models.Section.objects.exclude(
+                        abolished=None)]
+        elif options['section']:
+            try:
+                section = models.Section.objects.get(
+                        abbreviation=options['section'])
+            except models.Section.DoesNotExist:
+                raise CommandError(
+                        u'Section not found: {0}.'.format(options['section']))
+            targets = [(models.Academic.objects.filter(section=section), left)]
+        else:
+            targets = [(
+                leaving.graduating_academics(options['school_class'], left),
+                left)]
+        if options['dry_run']:
+            count = sum(
+                    leaving.open_academics(queryset).count()
+                    for queryset, _left in targets)
+            self.stdout.write(u'{0} academics would leave.'.format(count))
+            return
+        with transaction.atomic():
+            for queryset, target_left in targets:
+                summary = leaving.mark_left(
+                        queryset, target_left, options['reason'])
+                self.stdout.write(
+                        u'{0} academics marked as left on {1} '
+                        u'({2}).'.format(
+                            summary.total, summary.left, unicode(summary)))
@@ -0,0 +1,32 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from nmadb_academics import rankings, roster, search
+
+
+class Command(NoArgsCommand):
+    """ Rebuilds academic roster, search index and achievement rankings
+    from scratch.
+
+    Signals keep them current, so they only have to be rebuilt after
+    migrating, or after students, contacts or schools were changed
+    without sending signals (for example, with ``QuerySet.update``).
+    """
+
+    help = (
+            u'Rebuilds academic roster, search index and achievement '
+            u'rankings from scratch.')
+
+    def handle_noargs(self, **options):
+        with transaction.atomic():
+            academics = roster.rebuild()
+            achievements = search.rebuild_achievements()
+            summaries = rankings.rebuild()
+        self.stdout.write(
+                u'Roster of {0} academics, search index of {1} '
+                u'achievements and {2} achievement summaries '
+                u'rebuilt.'.format(academics, achievements, summaries))
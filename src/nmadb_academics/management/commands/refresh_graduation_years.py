@@ -0,0 +1,27 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from nmadb_academics import models
+
+
+class Command(NoArgsCommand):
+    """ Recomputes graduation years of all academics.
+
+    Graduation year does not depend on the current date, so it only
+    has to be refreshed after students were changed without sending
+    signals (for example, with ``QuerySet.update``). Running it at the
+    beginning of every school year is a cheap consistency check.
+    """
+
+    help = u'Recomputes graduation years of all academics.'
+
+    def handle_noargs(self, **options):
+        with transaction.atomic():
+            count = models.refresh_graduation_years()
+        self.stdout.write(
+                u'Graduation years of {0} academics refreshed.'.format(
+                    count))
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+import time
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+from django.db import close_old_connections
+
+from nmadb_academics import jobs
+
+
+class Command(NoArgsCommand):
+    """ Runs queued academics import jobs.
+
+    Before claiming a job, running jobs, which have made no progress for
+    longer than ``--timeout`` seconds, are returned to the queue,
+    because their worker must have crashed.
+    """
+
+    help = u'Runs queued academics import jobs.'
+
+    option_list = NoArgsCommand.option_list + (
+            make_option(
+                '--once',
+                action='store_true',
+                dest='once',
+                default=False,
+                help=u'Exit when there are no pending jobs.'),
+            make_option(
+                '--sleep',
+                type='int',
+                dest='sleep',
+                default=5,
+                help=u'Seconds to wait for new jobs.'),
+            make_option(
+                '--workers',
+                type='int',
+                dest='workers',
+                default=None,
+                help=u'Number of processes validating rows '
+                     u'(default NMADB_ACADEMICS_IMPORT_WORKERS setting).'),
+            make_option(
+                '--timeout',
+                type='int',
+                dest='timeout',
+                default=None,
+                help=u'Seconds without progress, after which running '
+                     u'job is reset to pending (default '
+                     u'NMADB_ACADEMICS_IMPORT_JOB_TIMEOUT setting or one '
+                     u'hour).'),
+            )
+
+    def handle_noargs(self, **options):
+        while True:
+            close_old_connections()
+            jobs.reset_stale_jobs(options['timeout'])
+            job = jobs.claim_next_job()
+            if job is not None:
+                self.stdout.write(u'Running import job {0}.'.format(job.id))
+                job = jobs.run_job(job, options['workers'])
+                self.stdout.write(
+                        u'Import job {0.id} finished with status '
+                        u'{1}: {0.imported} academics imported.'.format(
+                            job, job.get_status_display()))
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_students', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Section',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('title', models.CharField(unique=True, max_length=45, verbose_name='title')),
+                ('abbreviation', models.CharField(unique=True, max_length=4, verbose_name='abbreviation')),
+                ('established', models.DateField(verbose_name='established')),
+                ('abolished', models.DateField(null=True, verbose_name='abolished', blank=True)),
+            ],
+            options={
+                'ordering': ['title'],
+                'verbose_name': 'section',
+                'verbose_name_plural': 'sections',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='Academic',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('entered', models.DateField(verbose_name='entered')),
+                ('left', models.DateField(null=True, verbose_name='left', blank=True)),
+                ('leaving_reason', models.CharField(blank=True, max_length=3, null=True, verbose_name='leaving reason', choices=[('F', 'finished'), ('W', 'withdrew'), ('R', 'removed'), ('C', 'changed'), ('U', 'unknown')])),
+                ('comment', models.TextField(null=True, verbose_name='comment', blank=True)),
+                ('section', models.ForeignKey(verbose_name='section', to='nmadb_academics.Section')),
+                ('student', models.ForeignKey(verbose_name='student', to='nmadb_students.Student')),
+            ],
+            options={
+                'verbose_name': 'academic',
+                'verbose_name_plural': 'academics',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('competition', models.CharField(max_length=128, verbose_name='competition')),
+                ('competition_type', models.CharField(max_length=3, verbose_name='type', choices=[('R', 'regional'), ('N', 'national'), ('I', 'international')])),
+                ('place', models.CharField(max_length=3, verbose_name='place', choices=[(0, 'other'), (1, 'honorable mention'), (2, 'third'), (3, 'second'), (4, 'first')])),
+                ('academic', models.ForeignKey(blank=True, to='nmadb_academics.Academic', help_text="Set if achievement is from academic's field.", null=True, verbose_name='academic')),
+                ('student', models.ForeignKey(verbose_name='student', to='nmadb_students.Student')),
+            ],
+            options={
+                'verbose_name': 'achievement',
+                'verbose_name_plural': 'achievements',
+            },
+            bases=(models.Model,),
+        ),
+    ]
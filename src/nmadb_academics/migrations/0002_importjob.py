@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('spreadsheet', models.FileField(upload_to='nmadb_academics/imports/%Y/%m', verbose_name='spreadsheet')),
+                ('check_duplicates', models.BooleanField(default=True, verbose_name='check duplicates')),
+                ('status', models.CharField(default='P', max_length=1, verbose_name='status', db_index=True, choices=[('P', 'pending'), ('R', 'running'), ('D', 'done'), ('F', 'failed')])),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('started', models.DateTimeField(null=True, verbose_name='started', blank=True)),
+                ('finished', models.DateTimeField(null=True, verbose_name='finished', blank=True)),
+                ('batches', models.PositiveIntegerField(default=0, verbose_name='imported batches')),
+                ('imported', models.PositiveIntegerField(default=0, verbose_name='imported academics')),
+                ('errors', models.TextField(null=True, verbose_name='errors', blank=True)),
+            ],
+            options={
+                'ordering': ['-created'],
+                'verbose_name': 'import job',
+                'verbose_name_plural': 'import jobs',
+            },
+            bases=(models.Model,),
+        ),
+    ]
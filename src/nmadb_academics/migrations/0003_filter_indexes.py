@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='academic',
+            options={'verbose_name': 'academic', 'verbose_name_plural': 'academics'},
+        ),
+        migrations.AlterField(
+            model_name='academic',
+            name='entered',
+            field=models.DateField(verbose_name='entered', db_index=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='academic',
+            index_together=set([('section', 'leaving_reason'), ('student', 'section')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='achievement',
+            index_together=set([('competition_type', 'place')]),
+        ),
+    ]
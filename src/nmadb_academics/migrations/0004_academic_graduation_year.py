@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def fill_graduation_years(apps, schema_editor):
+    """ Copies graduation years to academics from their students.
+    """
+    Academic = apps.get_model('nmadb_academics', 'Academic')
+    years = {}
+    for academic_id, school_year, school_class in (
+            Academic.objects.values_list(
+                'id', 'student__school_year', 'student__school_class')):
+        if school_year is not None and school_class is not None:
+            years.setdefault(
+                    school_year - school_class + 12, []).append(academic_id)
+    for year, ids in years.items():
+        for i in range(0, len(ids), 500):
+            Academic.objects.filter(id__in=ids[i:i + 500]).update(
+                    graduation_year=year)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0003_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academic',
+            name='graduation_year',
+            field=models.IntegerField(help_text='The year, in which school year student finishes the 12th class. Copied from student for filtering.', verbose_name='graduation year', null=True, editable=False, db_index=True, blank=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(
+            fill_graduation_years,
+            lambda apps, schema_editor: None,
+        ),
+    ]
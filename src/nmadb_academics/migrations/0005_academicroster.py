@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_students', '__first__'),
+        ('nmadb_academics', '0004_academic_graduation_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcademicRoster',
+            fields=[
+                ('academic', models.OneToOneField(related_name='roster', primary_key=True, serialize=False, to='nmadb_academics.Academic', verbose_name='academic')),
+                ('first_name', models.CharField(max_length=255, verbose_name='first name', db_index=True)),
+                ('last_name', models.CharField(max_length=255, verbose_name='last name', db_index=True)),
+                ('old_last_name', models.CharField(max_length=255, verbose_name='old last name', blank=True)),
+                ('section_title', models.CharField(max_length=45, verbose_name='section')),
+                ('phones', models.TextField(verbose_name='phone numbers', blank=True)),
+                ('emails', models.TextField(verbose_name='email addresses', blank=True)),
+                ('school_title', models.CharField(db_index=True, max_length=255, verbose_name='current school', blank=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.SET_NULL, verbose_name='current school', blank=True, to='nmadb_students.School', null=True)),
+            ],
+            options={
+                'verbose_name': 'academic roster entry',
+                'verbose_name_plural': 'academic roster',
+            },
+            bases=(models.Model,),
+        ),
+    ]
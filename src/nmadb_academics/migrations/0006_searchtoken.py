@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+from nmadb_academics.search import tokenize
+
+
+def index_objects(apps, schema_editor):
+    """ Fills search index of existing academics and achievements, so
+    that admin search works right after migrating.
+    """
+    Academic = apps.get_model('nmadb_academics', 'Academic')
+    Achievement = apps.get_model('nmadb_academics', 'Achievement')
+    SearchToken = apps.get_model('nmadb_academics', 'SearchToken')
+    StudyRelation = apps.get_model('nmadb_students', 'StudyRelation')
+    academic_ids = list(Academic.objects.values_list('id', flat=True))
+    for i in range(0, len(academic_ids), 500):
+        academics = list(Academic.objects.filter(
+            id__in=academic_ids[i:i + 500]).select_related(
+                'student', 'section'))
+        schools = {}
+        for student_id, school_title in StudyRelation.objects.filter(
+                student_id__in=set(
+                    academic.student_id for academic in academics)
+                ).values_list('student_id', 'school__title'):
+            schools.setdefault(student_id, []).append(school_title)
+        SearchToken.objects.bulk_create([
+            SearchToken(kind='A', object_id=academic.id, token=token)
+            for academic in academics
+            for token in tokenize(
+                academic.id,
+                academic.student.first_name,
+                academic.student.last_name,
+                academic.student.old_last_name,
+                academic.section.title,
+                academic.entered,
+                academic.left,
+                *schools.get(academic.student_id, []))])
+    achievement_ids = list(Achievement.objects.values_list('id', flat=True))
+    for i in range(0, len(achievement_ids), 500):
+        SearchToken.objects.bulk_create([
+            SearchToken(kind='H', object_id=achievement.id, token=token)
+            for achievement in Achievement.objects.filter(
+                id__in=achievement_ids[i:i + 500]).select_related(
+                    'student')
+            for token in tokenize(
+                achievement.id,
+                achievement.student.first_name,
+                achievement.student.last_name,
+                achievement.student.old_last_name,
+                achievement.competition)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_students', '__first__'),
+        ('nmadb_academics', '0005_academicroster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('kind', models.CharField(max_length=1, verbose_name='kind', choices=[('A', 'academic'), ('H', 'achievement')])),
+                ('object_id', models.PositiveIntegerField(verbose_name='object ID')),
+                ('token', models.CharField(max_length=64, verbose_name='token', db_index=True)),
+            ],
+            options={
+                'verbose_name': 'search token',
+                'verbose_name_plural': 'search tokens',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='searchtoken',
+            index_together=set([('kind', 'object_id')]),
+        ),
+        migrations.RunPython(
+            index_objects,
+            lambda apps, schema_editor: None,
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0006_searchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportBatch',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('content_hash', models.CharField(unique=True, max_length=40, verbose_name='content hash')),
+                ('rows', models.PositiveIntegerField(verbose_name='rows')),
+                ('imported', models.DateTimeField(auto_now_add=True, verbose_name='imported')),
+            ],
+            options={
+                'ordering': ['-imported'],
+                'verbose_name': 'import batch',
+                'verbose_name_plural': 'import batches',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='batch_size',
+            field=models.PositiveIntegerField(default=500, verbose_name='batch size'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='skipped_batches',
+            field=models.PositiveIntegerField(default=0, help_text='Batches, which were imported before.', verbose_name='skipped batches'),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def convert_places(apps, schema_editor):
+    """ Copies text places to the integer column with one ``UPDATE`` per
+    distinct value. Values, which are not numbers, become "other".
+    """
+    Achievement = apps.get_model('nmadb_academics', 'Achievement')
+    for place in Achievement.objects.order_by().values_list(
+            'place', flat=True).distinct():
+        try:
+            number = int(place)
+        except (TypeError, ValueError):
+            number = 0
+        Achievement.objects.filter(place=place).update(place_number=number)
+
+
+def restore_places(apps, schema_editor):
+    """ Copies integer places back to the text column.
+    """
+    Achievement = apps.get_model('nmadb_academics', 'Achievement')
+    for number in Achievement.objects.order_by().values_list(
+            'place_number', flat=True).distinct():
+        Achievement.objects.filter(place_number=number).update(
+                place=unicode(number))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0007_import_batches'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='achievement',
+            index_together=set([]),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='place_number',
+            field=models.PositiveSmallIntegerField(null=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(
+            convert_places,
+            restore_places,
+        ),
+        migrations.RemoveField(
+            model_name='achievement',
+            name='place',
+        ),
+        migrations.RenameField(
+            model_name='achievement',
+            old_name='place_number',
+            new_name='place',
+        ),
+        migrations.AlterField(
+            model_name='achievement',
+            name='place',
+            field=models.PositiveSmallIntegerField(db_index=True, verbose_name='place', choices=[(0, 'other'), (1, 'honorable mention'), (2, 'third'), (3, 'second'), (4, 'first')]),
+            preserve_default=True,
+        ),
+        migrations.AlterIndexTogether(
+            name='achievement',
+            index_together=set([('competition_type', 'place')]),
+        ),
+        migrations.CreateModel(
+            name='AchievementSummary',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('kind', models.CharField(max_length=1, verbose_name='kind', choices=[('T', 'student'), ('S', 'section'), ('H', 'school')])),
+                ('object_id', models.PositiveIntegerField(verbose_name='object ID')),
+                ('regional', models.PositiveIntegerField(default=0, verbose_name='regional')),
+                ('national', models.PositiveIntegerField(default=0, verbose_name='national')),
+                ('international', models.PositiveIntegerField(default=0, verbose_name='international')),
+                ('best_place', models.PositiveSmallIntegerField(verbose_name='best place', choices=[(0, 'other'), (1, 'honorable mention'), (2, 'third'), (3, 'second'), (4, 'first')])),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='score')),
+            ],
+            options={
+                'verbose_name': 'achievement summary',
+                'verbose_name_plural': 'achievement summaries',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='achievementsummary',
+            unique_together=set([('kind', 'object_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='achievementsummary',
+            index_together=set([('kind', 'score'), ('kind', 'best_place')]),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def delete_batches(apps, schema_editor):
+    """ Deletes batches recorded by content hash: they cannot be tied to
+    files and rows.
+    """
+    ImportBatch = apps.get_model('nmadb_academics', 'ImportBatch')
+    ImportBatch.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0008_achievement_place_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_batches, delete_batches),
+        migrations.RemoveField(
+            model_name='importbatch',
+            name='content_hash',
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='file_hash',
+            field=models.CharField(default='', max_length=40, verbose_name='file hash'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='first_row',
+            field=models.PositiveIntegerField(default=0, help_text='Rows are numbered from 0 in the file order.', verbose_name='first row'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='importbatch',
+            unique_together=set([('file_hash', 'first_row')]),
+        ),
+    ]
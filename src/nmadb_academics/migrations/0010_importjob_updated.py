@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def copy_started(apps, schema_editor):
+    """ Running jobs are considered to have made progress, when they
+    were started.
+    """
+    ImportJob = apps.get_model('nmadb_academics', 'ImportJob')
+    ImportJob.objects.update(updated=models.F('started'))
+
+
+def noop(apps, schema_editor):
+    """ Nothing to undo: the column is removed.
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nmadb_academics', '0009_import_batch_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='updated',
+            field=models.DateTimeField(help_text='The last time the running job made progress.', null=True, verbose_name='updated', blank=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(copy_started, noop),
+    ]
@@ -1,7 +1,11 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
-from nmadb_students.models import Student
+from nmadb_students.models import School, Student
 
 
 class Section(models.Model):
@@ -39,6 +43,19 @@ class Section(models.Model):
         return unicode(self.title)
 
 
+class AcademicManager(models.Manager):
+    """ Loads student and section, which are shown in academic label,
+    together with academics. Used for related objects too, so that
+    ``achievement.academic`` is loaded with one query.
+    """
+
+    use_for_related_fields = True
+
+    def get_queryset(self):
+        return super(AcademicManager, self).get_queryset().select_related(
+                u'student', u'section')
+
+
 class Academic(models.Model):
     """ Information about academic.
     """
@@ -65,6 +82,7 @@ class Academic(models.Model):
             )
 
     entered = models.DateField(
+            db_index=True,
             verbose_name=_(u'entered'),
             )
 
@@ -88,17 +106,258 @@ class Academic(models.Model):
             verbose_name=_(u'comment'),
             )
 
-    class Meta(object):
-        ordering = [u'student', u'section',]
+    graduation_year = models.IntegerField(
+            blank=True,
+            null=True,
+            db_index=True,
+            editable=False,
+            verbose_name=_(u'graduation year'),
+            help_text=_(
+                u'The year, in which school year student finishes the '
+                u'12th class. Copied from student for filtering.'),
+            )
+
+    objects = AcademicManager()
 
     def __unicode__(self):
         return u'{0.student} {0.section}'.format(self)
 
     class Meta(object):
+        # No default ordering: the ordering by student and section was
+        # always overridden by the second ``Meta`` class, before they
+        # were merged.
+        index_together = [
+                (u'section', u'leaving_reason'),
+                (u'student', u'section'),
+                ]
         verbose_name = _(u'academic')
         verbose_name_plural = _(u'academics')
 
 
+def get_graduation_year(student):
+    """ Returns the year, in which the student finishes the 12th class.
+
+    The student is in class ``school_class`` during the school year,
+    which ends in ``school_year``, therefore the value does not change
+    when the school year changes.
+    """
+    if student.school_year is None or student.school_class is None:
+        return None
+    return student.school_year - student.school_class + 12
+
+
+def refresh_graduation_years(queryset=None):
+    """ Recomputes graduation years of academics from their students
+    with one ``UPDATE`` per distinct year.
+    """
+    if queryset is None:
+        queryset = Academic.objects.all()
+    years = {}
+    for academic_id, school_year, school_class in queryset.values_list(
+            u'id', u'student__school_year', u'student__school_class'):
+        if school_year is None or school_class is None:
+            year = None
+        else:
+            year = school_year - school_class + 12
+        years.setdefault(year, []).append(academic_id)
+    for year, ids in years.items():
+        for i in range(0, len(ids), 500):
+            Academic.objects.filter(id__in=ids[i:i + 500]).update(
+                    graduation_year=year)
+    return sum(len(ids) for ids in years.values())
+
+
+@receiver(pre_save)
+def academic_pre_save(sender, instance, **kwargs):
+    """ Copies graduation year from student, when academic (or its
+    proxy) is saved.
+    """
+    if issubclass(sender, Academic):
+        instance.graduation_year = get_graduation_year(instance.student)
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, **kwargs):
+    """ Updates graduation year of student academics.
+    """
+    if kwargs.get(u'created'):
+        return
+    Academic.objects.filter(student=instance).update(
+            graduation_year=get_graduation_year(instance))
+
+
+ENTERED_RANGE_CACHE_KEY = u'nmadb_academics.entered_range'
+STATISTICS_CACHE_KEY = u'nmadb_academics.statistics'
+
+
+def get_cache_timeout():
+    """ Returns the number of seconds, for which values computed from
+    academics are cached, configured by ``NMADB_ACADEMICS_CACHE_TIMEOUT``
+    setting (default 5 minutes).
+
+    Caches are invalidated by the process, which changes academics.
+    Processes, which do not share its cache backend (for example web
+    workers with local memory cache and ``run_import_jobs``), see the
+    change only after the timeout.
+    """
+    return getattr(settings, 'NMADB_ACADEMICS_CACHE_TIMEOUT', 300)
+
+
+def get_entered_range():
+    """ Returns the dates, when the first and the last academics
+    entered, or ``(None, None)`` if there are no academics.
+
+    The result is cached until academics change (see
+    :func:`get_cache_timeout`).
+    """
+    entered_range = cache.get(ENTERED_RANGE_CACHE_KEY)
+    if entered_range is None:
+        aggregate = Academic.objects.aggregate(
+                first=models.Min(u'entered'),
+                last=models.Max(u'entered'))
+        entered_range = (aggregate[u'first'], aggregate[u'last'])
+        cache.set(
+                ENTERED_RANGE_CACHE_KEY, entered_range, get_cache_timeout())
+    return entered_range
+
+
+def academics_changed():
+    """ Invalidates caches, which depend on academics. Has to be called
+    after changes, which do not send signals (bulk create, update).
+    """
+    cache.delete_many([ENTERED_RANGE_CACHE_KEY, STATISTICS_CACHE_KEY])
+
+
+@receiver((post_save, post_delete))
+def academic_changed(sender, **kwargs):
+    """ Invalidates caches, when academic (or its proxy) or section
+    changes.
+    """
+    if issubclass(sender, (Academic, Section)):
+        academics_changed()
+
+
+class AcademicRoster(models.Model):
+    """ Snapshot of academic data shown in workbook: student, contact
+    and school fields flattened to one row per academic.
+
+    Maintained by :mod:`nmadb_academics.roster`.
+    """
+
+    academic = models.OneToOneField(
+            Academic,
+            primary_key=True,
+            related_name=u'roster',
+            verbose_name=_(u'academic'),
+            )
+
+    first_name = models.CharField(
+            max_length=255,
+            db_index=True,
+            verbose_name=_(u'first name'),
+            )
+
+    last_name = models.CharField(
+            max_length=255,
+            db_index=True,
+            verbose_name=_(u'last name'),
+            )
+
+    old_last_name = models.CharField(
+            max_length=255,
+            blank=True,
+            verbose_name=_(u'old last name'),
+            )
+
+    section_title = models.CharField(
+            max_length=45,
+            verbose_name=_(u'section'),
+            )
+
+    phones = models.TextField(
+            blank=True,
+            verbose_name=_(u'phone numbers'),
+            )
+
+    emails = models.TextField(
+            blank=True,
+            verbose_name=_(u'email addresses'),
+            )
+
+    school = models.ForeignKey(
+            School,
+            blank=True,
+            null=True,
+            on_delete=models.SET_NULL,
+            verbose_name=_(u'current school'),
+            )
+
+    school_title = models.CharField(
+            max_length=255,
+            blank=True,
+            db_index=True,
+            verbose_name=_(u'current school'),
+            )
+
+    def __unicode__(self):
+        return u'{0.first_name} {0.last_name} {0.section_title}'.format(
+                self)
+
+    class Meta(object):
+        verbose_name = _(u'academic roster entry')
+        verbose_name_plural = _(u'academic roster')
+
+
+class SearchToken(models.Model):
+    """ Entry of admin search index: folded word, which occurs in the
+    searched fields of the object.
+
+    Maintained by :mod:`nmadb_academics.search`.
+    """
+
+    KINDS = (
+            (u'A', _(u'academic'),),
+            (u'H', _(u'achievement'),),
+            )
+
+    kind = models.CharField(
+            max_length=1,
+            choices=KINDS,
+            verbose_name=_(u'kind'),
+            )
+
+    object_id = models.PositiveIntegerField(
+            verbose_name=_(u'object ID'),
+            )
+
+    token = models.CharField(
+            max_length=64,
+            db_index=True,
+            verbose_name=_(u'token'),
+            )
+
+    def __unicode__(self):
+        return u'{0.kind} {0.object_id} {0.token}'.format(self)
+
+    class Meta(object):
+        index_together = [
+                (u'kind', u'object_id'),
+                ]
+        verbose_name = _(u'search token')
+        verbose_name_plural = _(u'search tokens')
+
+
+class AchievementManager(models.Manager):
+    """ Loads student and academic label data together with
+    achievements.
+    """
+
+    def get_queryset(self):
+        return super(AchievementManager, self).get_queryset(
+                ).select_related(
+                    u'student', u'academic__student', u'academic__section')
+
+
 class Achievement(models.Model):
     """ Academics achievements information.
     """
@@ -141,15 +400,212 @@ class Achievement(models.Model):
             choices=COMPETITION_TYPES,
             )
 
-    place = models.CharField(
-            max_length=3,
+    place = models.PositiveSmallIntegerField(
             choices=PLACES,
+            db_index=True,
             verbose_name=_(u'place'),
             )
 
+    objects = AchievementManager()
+
     def __unicode__(self):
         return u'{0.competition_type} {0.place}'.format(self)
 
     class Meta(object):
+        index_together = [
+                (u'competition_type', u'place'),
+                ]
         verbose_name = _(u'achievement')
         verbose_name_plural = _(u'achievements')
+
+
+class ImportJob(models.Model):
+    """ Academics import, which is run by background worker.
+    """
+
+    STATUSES = (
+            (u'P', _(u'pending'),),
+            (u'R', _(u'running'),),
+            (u'D', _(u'done'),),
+            (u'F', _(u'failed'),),
+            )
+
+    spreadsheet = models.FileField(
+            upload_to=u'nmadb_academics/imports/%Y/%m',
+            verbose_name=_(u'spreadsheet'),
+            )
+
+    check_duplicates = models.BooleanField(
+            default=True,
+            verbose_name=_(u'check duplicates'),
+            )
+
+    status = models.CharField(
+            max_length=1,
+            choices=STATUSES,
+            default=u'P',
+            db_index=True,
+            verbose_name=_(u'status'),
+            )
+
+    created = models.DateTimeField(
+            auto_now_add=True,
+            verbose_name=_(u'created'),
+            )
+
+    started = models.DateTimeField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'started'),
+            )
+
+    updated = models.DateTimeField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'updated'),
+            help_text=_(u'The last time the running job made progress.'),
+            )
+
+    finished = models.DateTimeField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'finished'),
+            )
+
+    batch_size = models.PositiveIntegerField(
+            default=500,
+            verbose_name=_(u'batch size'),
+            )
+
+    batches = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'imported batches'),
+            )
+
+    skipped_batches = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'skipped batches'),
+            help_text=_(u'Batches, which were imported before.'),
+            )
+
+    imported = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'imported academics'),
+            )
+
+    errors = models.TextField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'errors'),
+            )
+
+    def __unicode__(self):
+        return u'{0.spreadsheet.name} ({0.created})'.format(self)
+
+    def is_finished(self):
+        """ Returns True if job is done or failed.
+        """
+        return self.status in (u'D', u'F')
+
+    class Meta(object):
+        ordering = [u'-created',]
+        verbose_name = _(u'import job')
+        verbose_name_plural = _(u'import jobs')
+
+
+class ImportBatch(models.Model):
+    """ Committed batch of imported rows: a range of rows of the file.
+    The rows are skipped, when the same file is imported again.
+    """
+
+    file_hash = models.CharField(
+            max_length=40,
+            verbose_name=_(u'file hash'),
+            )
+
+    first_row = models.PositiveIntegerField(
+            verbose_name=_(u'first row'),
+            help_text=_(u'Rows are numbered from 0 in the file order.'),
+            )
+
+    rows = models.PositiveIntegerField(
+            verbose_name=_(u'rows'),
+            )
+
+    imported = models.DateTimeField(
+            auto_now_add=True,
+            verbose_name=_(u'imported'),
+            )
+
+    def __unicode__(self):
+        return u'{0.file_hash} {0.first_row}+{0.rows} ({0.imported})'.format(
+                self)
+
+    class Meta(object):
+        ordering = [u'-imported',]
+        unique_together = ((u'file_hash', u'first_row'),)
+        verbose_name = _(u'import batch')
+        verbose_name_plural = _(u'import batches')
+
+
+class AchievementSummary(models.Model):
+    """ Achievements of a student, section or school: counts by
+    competition type, the best place and weighted score.
+
+    Maintained by :mod:`nmadb_academics.rankings`.
+    """
+
+    KINDS = (
+            (u'T', _(u'student'),),
+            (u'S', _(u'section'),),
+            (u'H', _(u'school'),),
+            )
+
+    kind = models.CharField(
+            max_length=1,
+            choices=KINDS,
+            verbose_name=_(u'kind'),
+            )
+
+    object_id = models.PositiveIntegerField(
+            verbose_name=_(u'object ID'),
+            )
+
+    regional = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'regional'),
+            )
+
+    national = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'national'),
+            )
+
+    international = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'international'),
+            )
+
+    best_place = models.PositiveSmallIntegerField(
+            choices=Achievement.PLACES,
+            verbose_name=_(u'best place'),
+            )
+
+    score = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'score'),
+            )
+
+    def __unicode__(self):
+        return u'{0.kind} {0.object_id} {0.score}'.format(self)
+
+    class Meta(object):
+        unique_together = [
+                (u'kind', u'object_id'),
+                ]
+        index_together = [
+                (u'kind', u'score'),
+                (u'kind', u'best_place'),
+                ]
+        verbose_name = _(u'achievement summary')
+        verbose_name_plural = _(u'achievement summaries')
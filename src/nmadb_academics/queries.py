@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Prefetching of student data, which is shown next to academics, and
+chunked iteration of querysets with prefetches.
+"""
+
+
+from django.db.models import Prefetch
+
+from nmadb_students import models as students_models
+from nmadb_contacts import models as contacts_models
+
+
+CHUNK_SIZE = 500
+
+STUDY_RELATIONS_ATTR = u'prefetched_study_relations'
+USED_PHONES_ATTR = u'used_phones'
+USED_EMAILS_ATTR = u'used_emails'
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """ Yields lists of objects fetched in primary key order.
+    """
+    queryset = queryset.order_by(u'pk')
+    last_pk = None
+    while True:
+        if last_pk is None:
+            chunk = list(queryset[:chunk_size])
+        else:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def _lookup(student_path, name):
+    """ Returns lookup of the student relation. Empty path means, that
+    students themselves are queried.
+    """
+    if student_path:
+        return u'{0}__{1}'.format(student_path, name)
+    return name
+
+
+def prefetch_current_school(student_path=u'student'):
+    """ Returns prefetch of student study relations (newest first) for
+    :func:`current_school`.
+    """
+    return Prefetch(
+            _lookup(student_path, u'studyrelation_set'),
+            queryset=students_models.StudyRelation.objects.select_related(
+                u'school').order_by(u'-entered', u'-id'),
+            to_attr=STUDY_RELATIONS_ATTR)
+
+
+def prefetch_used_phones(student_path=u'student'):
+    """ Returns prefetch of used student phones for :func:`used_phones`.
+    """
+    return Prefetch(
+            _lookup(student_path, u'phone_set'),
+            queryset=contacts_models.Phone.objects.exclude(used=False),
+            to_attr=USED_PHONES_ATTR)
+
+
+def prefetch_used_emails(student_path=u'student'):
+    """ Returns prefetch of used student emails for :func:`used_emails`.
+    """
+    return Prefetch(
+            _lookup(student_path, u'email_set'),
+            queryset=contacts_models.Email.objects.exclude(used=False),
+            to_attr=USED_EMAILS_ATTR)
+
+
+def prefetch_used_contacts(student_path=u'student'):
+    """ Returns prefetches of used student phones and emails.
+    """
+    return [
+            prefetch_used_phones(student_path),
+            prefetch_used_emails(student_path),
+            ]
+
+
+def current_school(student):
+    """ Returns current school of the student, using prefetched study
+    relations if available.
+    """
+    relations = getattr(student, STUDY_RELATIONS_ATTR, None)
+    if relations is None:
+        return student.current_school()
+    elif relations:
+        return relations[0].school
+    else:
+        return None
+
+
+def schools(student):
+    """ Returns all schools of the student, newest first, using
+    prefetched study relations if available.
+    """
+    relations = getattr(student, STUDY_RELATIONS_ATTR, None)
+    if relations is None:
+        relations = student.studyrelation_set.select_related(
+                u'school').order_by(u'-entered', u'-id')
+    return [relation.school for relation in relations]
+
+
+def used_phones(student):
+    """ Returns used phones of the student.
+    """
+    phones = getattr(student, USED_PHONES_ATTR, None)
+    if phones is None:
+        phones = student.phone_set.exclude(used=False)
+    return phones
+
+
+def used_emails(student):
+    """ Returns used emails of the student.
+    """
+    emails = getattr(student, USED_EMAILS_ATTR, None)
+    if emails is None:
+        emails = student.email_set.exclude(used=False)
+    return emails
@@ -0,0 +1,235 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Maintenance of :class:`~nmadb_academics.models.AchievementSummary`.
+
+Summaries of the students, sections and schools are recomputed with a
+grouped query, when their achievements change, so that leaderboards
+are indexed lookups by ``(kind, score)``. A student belongs to the
+school shown in academic roster (the current school).
+
+Achievements created in bulk do not send signals, therefore code,
+which creates them, has to call :func:`refresh_achievements`.
+"""
+
+
+from django.db.models import Count
+from django.db.models.signals import (
+        post_save, post_delete, pre_save, pre_delete)
+from django.dispatch import receiver
+
+from nmadb_students import models as students_models
+from nmadb_academics import models, queries
+
+
+STUDENT = u'T'
+SECTION = u'S'
+SCHOOL = u'H'
+
+TYPE_FIELDS = {
+        u'R': u'regional',
+        u'N': u'national',
+        u'I': u'international',
+        }
+
+TYPE_WEIGHTS = {
+        u'R': 1,
+        u'N': 3,
+        u'I': 9,
+        }
+
+KIND_MODELS = {
+        STUDENT: students_models.Student,
+        SECTION: models.Section,
+        SCHOOL: students_models.School,
+        }
+
+
+def score(competition_type, place):
+    """ Returns score of one achievement: weight of the competition
+    type multiplied by place points (1 for "other", 5 for the first).
+    """
+    return TYPE_WEIGHTS.get(competition_type, 0) * (place + 1)
+
+
+def _grouped(queryset, key, distinct=False):
+    """ Returns ``(key, competition type, place, count)`` tuples of the
+    achievements queryset grouped by key. ``distinct`` has to be set,
+    if the key is reached through a join, which can repeat achievements.
+    """
+    return [
+            (entry[key], entry[u'competition_type'], entry[u'place'],
+             entry[u'count'])
+            for entry in queryset.order_by().values(
+                key, u'competition_type', u'place').annotate(
+                    count=Count(u'id', distinct=distinct))]
+
+
+def compute(kind, object_ids):
+    """ Returns unsaved summaries of the given objects, which have at
+    least one achievement.
+    """
+    if kind == STUDENT:
+        groups = _grouped(
+                models.Achievement.objects.filter(
+                    student_id__in=object_ids),
+                u'student')
+    elif kind == SECTION:
+        groups = _grouped(
+                models.Achievement.objects.filter(
+                    academic__section_id__in=object_ids),
+                u'academic__section')
+    else:
+        # Roster rows of all academics of the student have the same
+        # school, so the join repeats achievements, but not schools.
+        groups = _grouped(
+                models.Achievement.objects.filter(
+                    student__academic__roster__school_id__in=object_ids),
+                u'student__academic__roster__school',
+                distinct=True)
+    summaries = {}
+    for object_id, competition_type, place, count in groups:
+        summary = summaries.get(object_id)
+        if summary is None:
+            summary = summaries[object_id] = models.AchievementSummary(
+                    kind=kind, object_id=object_id, best_place=place)
+        field = TYPE_FIELDS.get(competition_type)
+        if field is not None:
+            setattr(summary, field, getattr(summary, field) + count)
+        summary.best_place = max(summary.best_place, place)
+        summary.score += score(competition_type, place) * count
+    return list(summaries.values())
+
+
+def refresh(kind, object_ids, chunk_size=queries.CHUNK_SIZE):
+    """ Recomputes summaries of the given objects. Returns the number of
+    objects, which have achievements.
+    """
+    object_ids = [object_id for object_id in set(object_ids) if object_id]
+    counter = 0
+    for i in range(0, len(object_ids), chunk_size):
+        chunk = object_ids[i:i + chunk_size]
+        summaries = compute(kind, chunk)
+        models.AchievementSummary.objects.filter(
+                kind=kind, object_id__in=chunk).delete()
+        models.AchievementSummary.objects.bulk_create(summaries)
+        counter += len(summaries)
+    return counter
+
+
+def achievement_keys(student_ids, academic_ids):
+    """ Returns dictionary of object ids by kind, whose summaries depend
+    on achievements of the given students and academics.
+    """
+    student_ids = set(student_ids)
+    academic_ids = set(
+            academic_id for academic_id in academic_ids if academic_id)
+    return {
+            STUDENT: student_ids,
+            SECTION: set(
+                models.Academic.objects.filter(
+                    id__in=academic_ids).values_list(
+                        u'section_id', flat=True)
+                if academic_ids else []),
+            SCHOOL: set(
+                models.AcademicRoster.objects.filter(
+                    academic__student_id__in=student_ids).exclude(
+                        school=None).values_list(u'school_id', flat=True)
+                if student_ids else []),
+            }
+
+
+def refresh_keys(keys):
+    """ Recomputes summaries of :func:`achievement_keys` result.
+    """
+    for kind, object_ids in keys.items():
+        if object_ids:
+            refresh(kind, object_ids)
+
+
+def refresh_achievements(achievements):
+    """ Recomputes summaries, which depend on the achievements (for
+    example, created with ``bulk_create``).
+    """
+    refresh_keys(achievement_keys(
+        [achievement.student_id for achievement in achievements],
+        [achievement.academic_id for achievement in achievements]))
+
+
+def rebuild():
+    """ Recomputes all summaries. Returns the number of summaries.
+    """
+    models.AchievementSummary.objects.all().delete()
+    achievements = models.Achievement.objects.order_by()
+    return (
+            refresh(STUDENT, achievements.values_list(
+                u'student_id', flat=True).distinct()) +
+            refresh(SECTION, achievements.exclude(
+                academic=None).values_list(
+                    u'academic__section_id', flat=True).distinct()) +
+            refresh(SCHOOL, models.AcademicRoster.objects.exclude(
+                school=None).order_by().values_list(
+                    u'school_id', flat=True).distinct()))
+
+
+def top(kind, limit=10):
+    """ Returns ``(object, summary)`` pairs of the given kind with the
+    highest scores.
+    """
+    summaries = list(models.AchievementSummary.objects.filter(
+        kind=kind).order_by(u'-score', u'-best_place')[:limit])
+    objects = KIND_MODELS[kind].objects.in_bulk(
+            [summary.object_id for summary in summaries])
+    return [
+            (objects[summary.object_id], summary)
+            for summary in summaries
+            if summary.object_id in objects]
+
+
+@receiver(pre_save)
+def achievement_pre_save(sender, instance, **kwargs):
+    """ Remembers student and academic of the changed achievement (or
+    its proxy), so that their old summaries are recomputed too.
+    """
+    if issubclass(sender, models.Achievement) and instance.pk:
+        instance._ranking_ids = list(
+                models.Achievement.objects.filter(
+                    pk=instance.pk).values_list(
+                        u'student_id', u'academic_id'))
+
+
+@receiver(post_save)
+def achievement_saved(sender, instance, **kwargs):
+    """ Recomputes summaries of the achievement (or its proxy).
+    """
+    if issubclass(sender, models.Achievement):
+        ids = getattr(instance, u'_ranking_ids', [])
+        ids.append((instance.student_id, instance.academic_id))
+        refresh_keys(achievement_keys(
+            [student_id for student_id, _academic_id in ids],
+            [academic_id for _student_id, academic_id in ids]))
+
+
+@receiver(pre_delete)
+def object_pre_delete(sender, instance, **kwargs):
+    """ Remembers summaries, which depend on deleted achievement or
+    academic, while its roster row still exists.
+    """
+    if issubclass(sender, models.Achievement):
+        instance._ranking_keys = achievement_keys(
+                [instance.student_id], [instance.academic_id])
+    elif issubclass(sender, models.Academic):
+        instance._ranking_keys = {
+                SCHOOL: set(models.AcademicRoster.objects.filter(
+                    academic_id=instance.id).exclude(
+                        school=None).values_list(u'school_id', flat=True)),
+                }
+
+
+@receiver(post_delete)
+def object_deleted(sender, instance, **kwargs):
+    """ Recomputes summaries remembered by :func:`object_pre_delete`.
+    """
+    if issubclass(sender, (models.Achievement, models.Academic)):
+        refresh_keys(getattr(instance, u'_ranking_keys', {}))
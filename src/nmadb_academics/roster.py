@@ -0,0 +1,178 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Maintenance of :class:`~nmadb_academics.models.AcademicRoster`.
+
+Roster rows are rebuilt in chunks with a constant number of queries
+per chunk. Signal receivers refresh rows of the changed students;
+code, which changes many students at once, should wrap the changes in
+:func:`deferred`, so that each student is refreshed only once.
+"""
+
+
+import contextlib
+import threading
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from django_db_utils import utils as db_utils
+from nmadb_students import models as students_models
+from nmadb_contacts import models as contacts_models
+from nmadb_academics import models, queries, rankings, search
+
+
+_state = threading.local()
+
+
+def build(academic):
+    """ Returns unsaved roster row of the academic, whose student,
+    section, current school and used contacts are already loaded.
+    """
+    student = academic.student
+    school = queries.current_school(student)
+    return models.AcademicRoster(
+            academic_id=academic.id,
+            first_name=student.first_name,
+            last_name=student.last_name,
+            old_last_name=student.old_last_name or u'',
+            section_title=academic.section.title,
+            phones=db_utils.join(queries.used_phones(student), 'number'),
+            emails=db_utils.join(queries.used_emails(student), 'address'),
+            school=school,
+            school_title=school.title if school else u'',
+            )
+
+
+def refresh(academics, chunk_size=queries.CHUNK_SIZE):
+    """ Rebuilds roster rows and search tokens of the academics
+    queryset. Returns the number of refreshed rows.
+    """
+    academics = academics.select_related(
+            u'student', u'section').prefetch_related(
+                queries.prefetch_current_school(),
+                *queries.prefetch_used_contacts())
+    counter = 0
+    for chunk in queries.iter_chunks(academics, chunk_size):
+        rows = models.AcademicRoster.objects.filter(
+                academic_id__in=[academic.id for academic in chunk])
+        old_schools = dict(rows.values_list(u'academic_id', u'school_id'))
+        rows.delete()
+        new_rows = [build(academic) for academic in chunk]
+        models.AcademicRoster.objects.bulk_create(new_rows)
+        search.index_academics(chunk)
+        # School rankings follow the current school of students.
+        changed_schools = set()
+        for row in new_rows:
+            old_school = old_schools.get(row.academic_id)
+            if old_school != row.school_id:
+                changed_schools.update((old_school, row.school_id))
+        rankings.refresh(rankings.SCHOOL, changed_schools)
+        counter += len(chunk)
+    return counter
+
+
+def rebuild():
+    """ Rebuilds the whole roster and academics search index. Returns
+    the number of rows.
+    """
+    models.AcademicRoster.objects.all().delete()
+    models.SearchToken.objects.filter(kind=search.ACADEMIC).delete()
+    return refresh(models.Academic.objects.all())
+
+
+def refresh_students(student_ids):
+    """ Rebuilds roster rows of the students academics, or postpones it
+    until the end of :func:`deferred` block.
+    """
+    pending = getattr(_state, u'pending', None)
+    if pending is not None:
+        pending.update(student_ids)
+        return
+    student_ids = list(student_ids)
+    for i in range(0, len(student_ids), queries.CHUNK_SIZE):
+        refresh(models.Academic.objects.filter(
+            student_id__in=student_ids[i:i + queries.CHUNK_SIZE]))
+
+
+@contextlib.contextmanager
+def deferred():
+    """ Collects students, whose roster rows have to be refreshed, and
+    refreshes them at once when the block exits without error.
+    """
+    if getattr(_state, u'pending', None) is not None:
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+        student_ids = _state.pending
+    finally:
+        _state.pending = None
+    refresh_students(student_ids)
+
+
+@receiver(post_save)
+def academic_saved(sender, instance, **kwargs):
+    """ Refreshes roster row of the academic (or its proxy).
+    """
+    if issubclass(sender, models.Academic):
+        refresh_students([instance.student_id])
+
+
+@receiver(post_delete)
+def academic_deleted(sender, instance, **kwargs):
+    """ Removes roster row of the academic (or its proxy). The row is
+    deleted by cascade too, but when student is deleted, contact
+    receivers may have rebuilt it in the meantime.
+    """
+    if issubclass(sender, models.Academic):
+        models.AcademicRoster.objects.filter(
+                academic_id=instance.id).delete()
+
+
+@receiver(post_save, sender=students_models.Student)
+def student_saved(sender, instance, **kwargs):
+    """ Refreshes roster rows of the student. Just created students do
+    not have academics yet.
+    """
+    if not kwargs.get(u'created'):
+        refresh_students([instance.pk])
+
+
+@receiver(post_save, sender=contacts_models.Phone)
+@receiver(post_delete, sender=contacts_models.Phone)
+@receiver(post_save, sender=contacts_models.Email)
+@receiver(post_delete, sender=contacts_models.Email)
+def contact_changed(sender, instance, **kwargs):
+    """ Refreshes roster rows of the phone or email owner.
+    """
+    refresh_students([instance.human_id])
+
+
+@receiver(post_save, sender=students_models.StudyRelation)
+@receiver(post_delete, sender=students_models.StudyRelation)
+def study_relation_changed(sender, instance, **kwargs):
+    """ Refreshes roster rows of the student, who changed school.
+    """
+    refresh_students([instance.student_id])
+
+
+@receiver(post_save, sender=models.Section)
+def section_saved(sender, instance, **kwargs):
+    """ Refreshes roster rows of the section academics, because its
+    title could have changed.
+    """
+    if not kwargs.get(u'created'):
+        refresh(models.Academic.objects.filter(section=instance))
+
+
+@receiver(post_save, sender=students_models.School)
+def school_saved(sender, instance, **kwargs):
+    """ Refreshes roster rows of the school students academics, because
+    its title could have changed.
+    """
+    if not kwargs.get(u'created'):
+        refresh(models.Academic.objects.filter(
+            student__studyrelation__school=instance).distinct())
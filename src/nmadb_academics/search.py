@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Admin search index of academics and achievements.
+
+Searched fields are split into words, which are folded to lower case
+ASCII (Lithuanian letters lose their diacritics, so that “Šiaulių”
+is found by “siauliu”) and stored in
+:class:`~nmadb_academics.models.SearchToken`. Search term matches an
+object, if every its word is a prefix of some object token, so that
+admin search is a few indexed prefix lookups instead of ``icontains``
+over joined tables.
+
+Academic tokens are rebuilt together with roster rows (see
+:mod:`nmadb_academics.roster`); achievement tokens are maintained by
+receivers in this module.
+"""
+
+
+import re
+import unicodedata
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from nmadb_students import models as students_models
+from nmadb_academics import models, queries
+
+
+ACADEMIC = u'A'
+ACHIEVEMENT = u'H'
+
+TOKEN_LENGTH = models.SearchToken._meta.get_field('token').max_length
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(text):
+    """ Returns lower case text without diacritics.
+    """
+    decomposed = unicodedata.normalize(u'NFKD', unicode(text).lower())
+    return u''.join(
+            char for char in decomposed
+            if not unicodedata.combining(char))
+
+
+def tokenize(*values):
+    """ Returns the set of folded words of given values. Dates are
+    split to year, month and day; None values are skipped.
+    """
+    tokens = set()
+    for value in values:
+        if value is None:
+            continue
+        if hasattr(value, u'isoformat'):
+            value = value.isoformat()
+        for word in WORD_RE.findall(fold(value)):
+            tokens.add(word[:TOKEN_LENGTH])
+    return tokens
+
+
+def academic_tokens(academic):
+    """ Returns tokens of the academic, whose student (with prefetched
+    study relations) and section are loaded.
+    """
+    student = academic.student
+    return tokenize(
+            academic.id,
+            student.first_name,
+            student.last_name,
+            student.old_last_name,
+            academic.section.title,
+            academic.entered,
+            academic.left,
+            *[school.title for school in queries.schools(student)])
+
+
+def achievement_tokens(achievement):
+    """ Returns tokens of the achievement, whose student is loaded.
+    """
+    student = achievement.student
+    return tokenize(
+            achievement.id,
+            student.first_name,
+            student.last_name,
+            student.old_last_name,
+            achievement.competition)
+
+
+def index(kind, objects, get_tokens):
+    """ Replaces tokens of given objects with two queries (plus those,
+    needed to split bulk create).
+    """
+    models.SearchToken.objects.filter(
+            kind=kind, object_id__in=[obj.id for obj in objects]).delete()
+    models.SearchToken.objects.bulk_create([
+        models.SearchToken(kind=kind, object_id=obj.id, token=token)
+        for obj in objects
+        for token in get_tokens(obj)])
+
+
+def index_academics(academics):
+    """ Replaces tokens of the loaded academics.
+    """
+    index(ACADEMIC, academics, academic_tokens)
+
+
+def index_achievements(achievements, chunk_size=queries.CHUNK_SIZE):
+    """ Rebuilds tokens of achievements queryset. Returns the number of
+    indexed achievements.
+    """
+    counter = 0
+    for chunk in queries.iter_chunks(
+            achievements.select_related(u'student'), chunk_size):
+        index(ACHIEVEMENT, chunk, achievement_tokens)
+        counter += len(chunk)
+    return counter
+
+
+def rebuild_achievements():
+    """ Rebuilds achievements index. Returns the number of indexed
+    achievements.
+    """
+    models.SearchToken.objects.filter(kind=ACHIEVEMENT).delete()
+    return index_achievements(models.Achievement.objects.all())
+
+
+def filter_queryset(queryset, kind, search_term):
+    """ Filters queryset by search term. Each word of the term is
+    resolved to the set of object ids with a subquery.
+    """
+    for word in tokenize(search_term):
+        queryset = queryset.filter(pk__in=models.SearchToken.objects.filter(
+            kind=kind, token__startswith=word).values(u'object_id'))
+    return queryset
+
+
+class IndexedSearchMixin(object):
+    """ Resolves admin search with the search index of
+    ``search_index_kind``. ``search_fields`` are still needed to show
+    the search box.
+    """
+
+    search_index_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_queryset(
+                queryset, self.search_index_kind, search_term), False
+
+
+@receiver(post_save, sender=models.Achievement)
+def achievement_saved(sender, instance, **kwargs):
+    """ Reindexes the achievement.
+    """
+    index(ACHIEVEMENT, [instance], achievement_tokens)
+
+
+@receiver(post_delete, sender=models.Academic)
+def academic_deleted(sender, instance, **kwargs):
+    """ Removes tokens of deleted academic.
+    """
+    models.SearchToken.objects.filter(
+            kind=ACADEMIC, object_id=instance.id).delete()
+
+
+@receiver(post_delete, sender=models.Achievement)
+def achievement_deleted(sender, instance, **kwargs):
+    """ Removes tokens of deleted achievement.
+    """
+    models.SearchToken.objects.filter(
+            kind=ACHIEVEMENT, object_id=instance.id).delete()
+
+
+def connect_proxy(proxy):
+    """ Connects the receivers of this module to the proxy of academic
+    or achievement: signals of objects changed through proxy are sent
+    with the proxy as sender.
+    """
+    if issubclass(proxy, models.Achievement):
+        post_save.connect(achievement_saved, sender=proxy)
+        post_delete.connect(achievement_deleted, sender=proxy)
+    elif issubclass(proxy, models.Academic):
+        post_delete.connect(academic_deleted, sender=proxy)
+
+
+@receiver(post_save, sender=students_models.Student)
+def student_saved(sender, instance, **kwargs):
+    """ Reindexes achievements of the student, whose name could have
+    changed. Academics are reindexed together with roster.
+    """
+    if not kwargs.get(u'created'):
+        index_achievements(
+                models.Achievement.objects.filter(student=instance))
@@ -0,0 +1,269 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Lazy, row at a time reading of uploaded spreadsheet documents.
+
+Every reader yields ``(sheet_name, rows)`` pairs, where ``rows`` is an
+iterator of ``(line, row)`` pairs: ``line`` is the line number in the
+sheet and ``row`` maps the captions of the first non-empty line to the
+cell values. All rows of the sheet have the same captions: missing
+trailing cells are empty strings.
+
+Malformed files raise ``ValidationError`` either when the reader is
+created or while its rows are iterated.
+"""
+
+
+import csv
+import datetime
+import os
+import zipfile
+from xml.etree import cElementTree
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import ugettext as _
+
+
+SUPPORTED_EXTENSIONS = (u'.csv', u'.ods', u'.xls')
+
+
+READING_ERRORS = (
+        csv.Error,
+        UnicodeDecodeError,
+        zipfile.BadZipfile,
+        cElementTree.ParseError,
+        )
+
+
+ODS_NAMESPACES = {
+    u'table': u'urn:oasis:names:tc:opendocument:xmlns:table:1.0',
+    u'office': u'urn:oasis:names:tc:opendocument:xmlns:office:1.0',
+    u'text': u'urn:oasis:names:tc:opendocument:xmlns:text:1.0',
+    }
+
+
+def _ods_name(name):
+    """ Converts ``prefix:name`` to ElementTree name.
+    """
+    prefix, name = name.split(u':')
+    return u'{{{0}}}{1}'.format(ODS_NAMESPACES[prefix], name)
+
+
+ODS_TABLE = _ods_name(u'table:table')
+ODS_TABLE_NAME = _ods_name(u'table:name')
+ODS_ROW = _ods_name(u'table:table-row')
+ODS_ROWS_REPEATED = _ods_name(u'table:number-rows-repeated')
+ODS_CELL = _ods_name(u'table:table-cell')
+ODS_COVERED_CELL = _ods_name(u'table:covered-table-cell')
+ODS_COLUMNS_REPEATED = _ods_name(u'table:number-columns-repeated')
+ODS_VALUE_TYPE = _ods_name(u'office:value-type')
+ODS_VALUE = _ods_name(u'office:value')
+ODS_DATE_VALUE = _ods_name(u'office:date-value')
+ODS_PARAGRAPH = _ods_name(u'text:p')
+
+
+def get_extension(file_name):
+    """ Returns lower-cased extension of the file name.
+    """
+    return os.path.splitext(file_name or u'')[1].lower()
+
+
+def read_spreadsheet(uploaded_file, default_sheet_name):
+    """ Returns lazy reader of the uploaded file. Format is determined
+    from file extension.
+
+    ``default_sheet_name`` is used for formats without sheet names.
+    """
+    extension = get_extension(uploaded_file.name)
+    if extension == u'.csv':
+        reader = read_csv(uploaded_file, default_sheet_name)
+    elif extension == u'.ods':
+        reader = read_ods(uploaded_file)
+    elif extension == u'.xls':
+        reader = read_xls(uploaded_file)
+    else:
+        raise ValueError(u'Unsupported spreadsheet format: {0}'.format(
+            extension))
+    return _checked(
+            (sheet_name, _checked(rows)) for sheet_name, rows in reader)
+
+
+def _checked(iterator):
+    """ Yields items of the iterator converting errors of malformed file
+    to ``ValidationError``.
+    """
+    try:
+        for item in iterator:
+            yield item
+    except READING_ERRORS as e:
+        raise ValidationError(
+                _(u'Failed to read spreadsheet: {0}').format(e))
+
+
+def _with_captions(lines):
+    """ Converts ``(line, values)`` pairs to ``(line, row)`` pairs using
+    the first non-empty line as captions.
+    """
+    captions = None
+    for line, values in lines:
+        if not any(values):
+            continue
+        if captions is None:
+            captions = [
+                    (i, value.strip())
+                    for i, value in enumerate(values)
+                    if value.strip()]
+        else:
+            yield line, dict(
+                    (caption, values[i] if i < len(values) else u'')
+                    for i, caption in captions)
+
+
+def read_csv(uploaded_file, sheet_name, encoding='utf-8-sig'):
+    """ Reads comma separated values file as a single sheet. By default
+    it is decoded as UTF-8 with optional byte order mark, which is added
+    by spreadsheet programs.
+    """
+    uploaded_file.seek(0)
+    lines = (
+            (i, [value.decode(encoding) for value in values])
+            for i, values in enumerate(csv.reader(uploaded_file), 1))
+    yield sheet_name, _with_captions(lines)
+
+
+def _ods_cell_value(cell):
+    """ Returns the value of OpenDocument table cell as string.
+    """
+    value_type = cell.get(ODS_VALUE_TYPE)
+    if value_type == u'date':
+        return cell.get(ODS_DATE_VALUE)[:10]
+    elif value_type in (u'float', u'percentage', u'currency'):
+        return cell.get(ODS_VALUE)
+    else:
+        return u'\n'.join(
+                u''.join(paragraph.itertext())
+                for paragraph in cell.iter(ODS_PARAGRAPH))
+
+
+def _ods_row_values(row):
+    """ Returns the list of row values with repeated cells expanded and
+    trailing empty cells removed.
+    """
+    cells = []
+    for cell in row:
+        if cell.tag not in (ODS_CELL, ODS_COVERED_CELL):
+            continue
+        repeated = int(cell.get(ODS_COLUMNS_REPEATED, 1))
+        cells.append((_ods_cell_value(cell), repeated))
+    while cells and not cells[-1][0]:
+        cells.pop()
+    values = []
+    for value, repeated in cells:
+        values.extend([value] * repeated)
+    return values
+
+
+def _ods_lines(table, events):
+    """ Yields ``(line, values)`` pairs of the table, which start event
+    was just consumed, and removes the parsed rows from the tree.
+    """
+    line = 0
+    parents = []
+    for event, element in events:
+        if event == 'start':
+            parents.append(element)
+            continue
+        if element.tag == ODS_TABLE:
+            return
+        parents.pop()
+        if element.tag == ODS_ROW:
+            values = _ods_row_values(element)
+            repeated = int(element.get(ODS_ROWS_REPEATED, 1))
+            (parents[-1] if parents else table).remove(element)
+            if values:
+                for _i in range(repeated):
+                    line += 1
+                    yield line, values
+            else:
+                line += repeated
+
+
+def read_ods(uploaded_file):
+    """ Reads OpenDocument spreadsheet. ``content.xml`` is parsed
+    incrementally, so only the current row is kept in memory.
+    """
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as document:
+        try:
+            content = document.open(u'content.xml')
+        except KeyError:
+            raise ValidationError(
+                    _(u'File is not an OpenDocument spreadsheet.'))
+        events = iter(cElementTree.iterparse(
+            content, events=('start', 'end')))
+        for event, element in events:
+            if event == 'start' and element.tag == ODS_TABLE:
+                rows = _with_captions(_ods_lines(element, events))
+                yield element.get(ODS_TABLE_NAME), rows
+                for _row in rows:
+                    pass
+
+
+def _xls_cell_value(book, cell):
+    """ Returns the value of Excel cell as string.
+    """
+    import xlrd
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return datetime.date(
+                *xlrd.xldate_as_tuple(cell.value, book.datemode)[:3]
+                ).isoformat()
+    elif cell.ctype == xlrd.XL_CELL_NUMBER:
+        if cell.value == int(cell.value):
+            return unicode(int(cell.value))
+        return unicode(cell.value)
+    elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+        return u''
+    else:
+        return unicode(cell.value)
+
+
+def read_xls(uploaded_file):
+    """ Reads Excel workbook. Sheets are loaded one at a time and
+    unloaded after they were read.
+
+    The format cannot be parsed incrementally: file uploaded to disk is
+    memory mapped by ``xlrd``, smaller files are read into memory.
+    """
+    try:
+        import xlrd
+    except ImportError:
+        raise ValidationError(
+                _(u'Excel files are not supported, because xlrd is not '
+                  u'installed.'))
+    uploaded_file.seek(0)
+    try:
+        if hasattr(uploaded_file, u'temporary_file_path'):
+            book = xlrd.open_workbook(
+                    uploaded_file.temporary_file_path(), on_demand=True)
+        else:
+            book = xlrd.open_workbook(
+                    file_contents=uploaded_file.read(), on_demand=True)
+    except xlrd.XLRDError as e:
+        raise ValidationError(
+                _(u'Failed to read spreadsheet: {0}').format(e))
+    try:
+        for index in range(book.nsheets):
+            sheet = book.sheet_by_index(index)
+            lines = (
+                    (i + 1, [
+                        _xls_cell_value(book, cell)
+                        for cell in sheet.row(i)])
+                    for i in range(sheet.nrows))
+            rows = _with_captions(lines)
+            yield sheet.name, rows
+            for _row in rows:
+                pass
+            book.unload_sheet(index)
+    finally:
+        book.release_resources()
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Section and cohort statistics computed with grouped queries.
+
+The result is cached until academics or sections change (see
+:func:`nmadb_academics.models.academics_changed`), but at most for
+:func:`nmadb_academics.models.get_cache_timeout` seconds.
+"""
+
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.utils.translation import ugettext as _
+
+from nmadb_academics import models
+
+
+STUDYING = u'N'
+
+STATUSES = [STUDYING] + [
+        code for code, _title in models.Academic.LEAVING_REASON]
+
+
+def _entered_year_sql():
+    """ Returns SQL expression of the year, in which academic entered.
+    """
+    opts = models.Academic._meta
+    quote = connection.ops.quote_name
+    return connection.ops.date_extract_sql(
+            u'year', u'{0}.{1}'.format(
+                quote(opts.db_table),
+                quote(opts.get_field('entered').column)))
+
+
+def _grouped(*fields):
+    """ Returns academic counts grouped by given fields, which may
+    include entry ``year``.
+    """
+    return models.Academic.objects.order_by().extra(
+            select={u'year': _entered_year_sql()}).values(
+                *fields).annotate(count=Count(u'id'))
+
+
+def status_titles():
+    """ Returns ``(code, title)`` pairs of :data:`STATUSES`.
+    """
+    titles = dict(models.Academic.LEAVING_REASON)
+    titles[STUDYING] = _(u'studies')
+    return [(code, titles[code]) for code in STATUSES]
+
+
+def compute_statistics():
+    """ Computes statistics with four grouped queries.
+
+    Returns dictionary with ``years`` (the list of entry years) and
+    ``sections``: the list of dictionaries with section ``title``,
+    ``by_year`` (counts in the order of years), ``total``,
+    ``by_status`` (counts in the order of :data:`STATUSES`) and
+    ``average_days`` (average time from entering to leaving of the
+    academics, who left, or None).
+    """
+    sections = dict(
+            (section.id, {
+                u'title': section.title,
+                u'years': {},
+                u'statuses': {},
+                u'days': 0,
+                u'left': 0,
+                })
+            for section in models.Section.objects.all())
+    years = set()
+    for entry in _grouped(u'section', u'year'):
+        year = int(entry[u'year'])
+        years.add(year)
+        sections[entry[u'section']][u'years'][year] = entry[u'count']
+    for entry in _grouped(u'section', u'leaving_reason'):
+        sections[entry[u'section']][u'statuses'][
+                entry[u'leaving_reason'] or STUDYING] = entry[u'count']
+    # Academics enter and leave on a few dates, so distinct date
+    # pairs are few even when academics are many.
+    for entry in models.Academic.objects.order_by().filter(
+            left__isnull=False).values(
+                u'section', u'entered', u'left').annotate(
+                    count=Count(u'id')):
+        section = sections[entry[u'section']]
+        section[u'days'] += (
+                (entry[u'left'] - entry[u'entered']).days * entry[u'count'])
+        section[u'left'] += entry[u'count']
+    years = sorted(years)
+    result = []
+    for section_id in sorted(
+            sections, key=lambda key: sections[key][u'title']):
+        section = sections[section_id]
+        result.append({
+            u'title': section[u'title'],
+            u'by_year': [
+                section[u'years'].get(entered_year, 0)
+                for entered_year in years],
+            u'total': sum(section[u'years'].values()),
+            u'by_status': [
+                section[u'statuses'].get(code, 0) for code in STATUSES],
+            u'average_days': (
+                float(section[u'days']) / section[u'left']
+                if section[u'left'] else None),
+            })
+    return {
+            u'years': years,
+            u'sections': result,
+            }
+
+
+def get_statistics():
+    """ Returns cached statistics (see :func:`compute_statistics`) with
+    translated ``statuses`` titles.
+    """
+    statistics = cache.get(models.STATISTICS_CACHE_KEY)
+    if statistics is None:
+        statistics = compute_statistics()
+        cache.set(
+                models.STATISTICS_CACHE_KEY, statistics,
+                models.get_cache_timeout())
+    return dict(statistics, statuses=status_titles())
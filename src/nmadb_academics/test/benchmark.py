@@ -0,0 +1,600 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Query count regression checks and timings of the admin and import
+paths.
+
+Run with ``make benchmark``. The sizes are configured with environment
+variables:
+
++   ``NMADB_BENCHMARK_FIXTURES`` – number of generated students and
+    academics (default 10000);
++   ``NMADB_BENCHMARK_SIZES`` – comma separated numbers of imported
+    rows (default ``100,1000,10000``);
++   ``NMADB_BENCHMARK_OUTPUT`` – JSON file, to which results are
+    written (default ``var/benchmark.json``).
+"""
+
+
+import datetime
+import json
+import math
+import os
+import time
+import unittest
+
+from nmadb_academics.test import utils
+from nmadb_academics.test.utils import create, name
+
+from django.contrib import admin
+from django.contrib.auth import models as auth_models
+from django.core import urlresolvers
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import client
+from django.test.utils import CaptureQueriesContext
+
+from nmadb_students import models as students_models
+from nmadb_contacts import models as contacts_models
+from nmadb_academics import (
+        analytics, exporting, forms, importer, leaving, models, rankings,
+        roster, search, statistics)
+from nmadb_academics import admin as academics_admin
+
+
+FIXTURES = int(os.environ.get('NMADB_BENCHMARK_FIXTURES', '10000'))
+SIZES = [
+        int(size)
+        for size in os.environ.get(
+            'NMADB_BENCHMARK_SIZES', '100,1000,10000').split(',')]
+OUTPUT = os.environ.get('NMADB_BENCHMARK_OUTPUT', 'var/benchmark.json')
+
+SCHOOLS = 20
+SECTIONS = 5
+
+RESULTS = []
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database and writes results.
+    """
+    utils.teardown_databases()
+    directory = os.path.dirname(OUTPUT)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(OUTPUT, 'w') as fp:
+        json.dump({
+            'date': datetime.datetime.now().isoformat(),
+            'fixtures': FIXTURES,
+            'results': RESULTS,
+            }, fp, indent=2, sort_keys=True)
+
+
+def measure(name, size, function, *args, **kwargs):
+    """ Calls function, records its query count and duration and
+    returns the query count.
+    """
+    with CaptureQueriesContext(connection) as context:
+        start = time.time()
+        function(*args, **kwargs)
+        duration = time.time() - start
+    RESULTS.append({
+        'name': name,
+        'size': size,
+        'queries': len(context.captured_queries),
+        'seconds': duration,
+        })
+    return len(context.captured_queries)
+
+
+class _Rollback(Exception):
+    """ Raised to roll back the changes made by benchmark.
+    """
+
+
+def rolled_back(function, *args, **kwargs):
+    """ Calls function in transaction, which is rolled back.
+    """
+    try:
+        with transaction.atomic():
+            function(*args, **kwargs)
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+
+class Fixtures(object):
+    """ Generated students with academics, contacts and achievements.
+    """
+
+    def __init__(self, count):
+        self.municipality = create(contacts_models.Municipality)
+        self.schools = [
+                create(
+                    students_models.School,
+                    title=u'School {0}'.format(i),
+                    municipality=self.municipality)
+                for i in range(SCHOOLS)]
+        self.sections = [
+                create(
+                    models.Section,
+                    title=u'Section {0}'.format(i),
+                    abbreviation=u'S{0}'.format(i),
+                    established=datetime.date(2000, 1, 1))
+                for i in range(SECTIONS)]
+        academics = []
+        emails = []
+        phones = []
+        achievements = []
+        for i in range(count):
+            entered = datetime.date(2005 + i % 10, 9, 1)
+            student = create(
+                    students_models.Student,
+                    first_name=name(u'Vardas', i),
+                    last_name=name(u'Pavardė', i),
+                    birth_date=datetime.date(1995, 1, 1),
+                    school_class=6 + i % 7,
+                    school_year=2006 + i % 10)
+            student.change_school(self.schools[i % SCHOOLS], entered)
+            academics.append(models.Academic(
+                student=student,
+                section=self.sections[i % SECTIONS],
+                entered=entered,
+                left=(entered.replace(year=entered.year + 2)
+                      if i % 3 else None),
+                leaving_reason=(
+                    models.Academic.LEAVING_REASON[i % 5][0]
+                    if i % 3 else None),
+                graduation_year=models.get_graduation_year(student),
+                ))
+            emails.append(contacts_models.Email(
+                human=student,
+                address=u'student{0}@example.com'.format(i)))
+            phones.append(contacts_models.Phone(
+                human=student,
+                number=u'+3706{0:07d}'.format(i)))
+        models.Academic.objects.bulk_create(academics)
+        contacts_models.Email.objects.bulk_create(emails)
+        contacts_models.Phone.objects.bulk_create(phones)
+        for academic in models.Academic.objects.all()[:count // 2]:
+            achievements.append(models.Achievement(
+                student_id=academic.student_id,
+                academic=academic,
+                competition=u'Olympiad',
+                competition_type=u'RNI'[academic.id % 3],
+                place=academic.id % 5,
+                ))
+        models.Achievement.objects.bulk_create(achievements)
+        roster.rebuild()
+        search.rebuild_achievements()
+        rankings.rebuild()
+
+    def import_rows(self, count):
+        """ Generates validated import rows.
+        """
+        return [
+                {
+                    u'first_name': name(u'Naujas', i),
+                    u'last_name': name(u'Naujokas', i),
+                    u'gender': students_models.Student.GENDER_CHOICES[
+                        i % 2][0],
+                    u'birth_date': datetime.date(2000, 1, 1),
+                    u'school_class': 6 + i % 7,
+                    u'school_year': 2014,
+                    u'school': self.schools[i % SCHOOLS],
+                    u'social_disadvantage_mark': bool(i % 2),
+                    u'section': self.sections[i % SECTIONS],
+                    u'entered': datetime.date(2014, 9, 1),
+                    u'email': u'new{0}@example.com'.format(i),
+                    u'main_address': u'Gatvė {0}'.format(i),
+                    u'town': u'Vilnius',
+                    u'phone': (
+                        u'+3706{0:07d}'.format(i) if i % 2 else None),
+                    u'municipality_code': self.municipality,
+                    }
+                for i in range(count)]
+
+
+_FIXTURES = []
+
+
+def get_fixtures():
+    """ Returns fixtures shared by all benchmarks.
+    """
+    if not _FIXTURES:
+        _FIXTURES.append(Fixtures(FIXTURES))
+    return _FIXTURES[0]
+
+
+def bulk_queries(model, count):
+    """ Returns number of queries used by ``bulk_create`` of ``count``
+    objects, which depends on database parameters limit.
+    """
+    fields = model._meta.local_concrete_fields
+    batch_size = max(
+            connection.ops.bulk_batch_size(fields, [None] * count), 1)
+    return int(math.ceil(float(count) / batch_size))
+
+
+class ImportBenchmark(unittest.TestCase):
+    """ Benchmarks of academics import.
+    """
+
+    def setUp(self):
+        self.fixtures = get_fixtures()
+
+    def student_queries(self):
+        """ Returns number of queries, which are needed to save one
+        student with school. These are the only per row queries.
+        """
+        def save_student():
+            """ Saves student as importer does.
+            """
+            row = self.fixtures.import_rows(1)[0]
+            student = students_models.Student(
+                    first_name=row[u'first_name'],
+                    last_name=row[u'last_name'],
+                    gender=row[u'gender'],
+                    birth_date=row[u'birth_date'],
+                    school_class=row[u'school_class'],
+                    school_year=row[u'school_year'])
+            student.save()
+            student.change_school(row[u'school'], row[u'entered'])
+        with CaptureQueriesContext(connection) as context:
+            rolled_back(save_student)
+        return len(context.captured_queries)
+
+    def test_import_academics(self):
+        """ Import writes everything except students in bulk.
+        """
+        per_row = self.student_queries()
+        for size in SIZES:
+            rows = self.fixtures.import_rows(size)
+
+            def run():
+                """ Imports rows.
+                """
+                academics = importer.AcademicImporter()
+                for row in rows:
+                    academics.add(row)
+                academics.flush()
+
+            queries = measure(
+                    'import_academics', size, rolled_back, run)
+            batches = int(math.ceil(float(size) / importer.BATCH_SIZE))
+            per_batch = 1 + sum(
+                    bulk_queries(model, importer.BATCH_SIZE)
+                    for model in (
+                        students_models.SocialDisadvantageMark,
+                        models.Academic,
+                        contacts_models.Email,
+                        contacts_models.Address,
+                        contacts_models.Phone,
+                        ))
+            # Roster: academics, three prefetches, old schools, delete,
+            # bulk create and the check for the next chunk; search
+            # index: delete and bulk create of tokens (at most 16 per
+            # academic); school rankings: students, achievements and
+            # delete of summaries.
+            per_batch += 11 + bulk_queries(
+                    models.AcademicRoster, importer.BATCH_SIZE
+                    ) + bulk_queries(
+                        models.SearchToken, 16 * importer.BATCH_SIZE)
+            self.assertLessEqual(
+                    queries, size * per_row + batches * per_batch + 2)
+
+    def test_import_achievements(self):
+        """ Achievements import does not depend on the number of rows,
+        which fit into one batch.
+        """
+        captions = [
+                forms.IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS[column]
+                for column in (
+                    u'first_name', u'last_name', u'competition',
+                    u'competition_type', u'place')] + [
+                forms.IMPORT_ACHIEVEMENTS_OPTIONAL_COLUMNS[u'section']]
+        counts = []
+        for size in (10, min(FIXTURES, importer.BATCH_SIZE)):
+            rows = [
+                    (academic.student.first_name,
+                     academic.student.last_name,
+                     u'Olympiad', u'N', i % 5, academic.section.title)
+                    for i, academic in enumerate(
+                        models.Academic.objects.filter(
+                            achievement__isnull=True)[:size])]
+            spreadsheet = SimpleUploadedFile(
+                    'achievements.csv',
+                    ''.join(exporting.iter_csv(captions, rows, None)))
+            result = []
+
+            def run():
+                """ Imports achievements.
+                """
+                result.extend(importer.import_achievements(spreadsheet))
+
+            counts.append(measure(
+                u'import_achievements', len(rows), rolled_back, run))
+            report, counter = result
+            self.assertEqual(report.errors(), [])
+            self.assertEqual(counter, len(rows))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_check_duplicates(self):
+        """ Duplicates are checked with chunked queries.
+        """
+        for size in SIZES:
+            existing = [
+                    (name(u'Vardas', i), name(u'Pavardė', i))
+                    for i in range(min(size, FIXTURES) // 2)]
+            names = existing + [
+                    (name(u'Naujas', i), name(u'Naujokas', i))
+                    for i in range(size - len(existing))]
+            duplicates = forms.AcademicDuplicateFinder()
+            queries = measure(
+                    'check_duplicates', size, duplicates.check, names)
+            self.assertEqual(len(duplicates.found), len(existing))
+            self.assertLessEqual(
+                    queries,
+                    int(math.ceil(
+                        2.0 * size / forms.DUPLICATES_QUERY_CHUNK_SIZE)))
+
+
+class ChangelistBenchmark(unittest.TestCase):
+    """ Benchmarks of admin changelists. Query count of a changelist
+    page must not depend on the number of shown objects.
+    """
+
+    def setUp(self):
+        self.fixtures = get_fixtures()
+        if not auth_models.User.objects.filter(username='admin').exists():
+            auth_models.User.objects.create_superuser(
+                    'admin', 'admin@example.com', 'admin')
+        self.client = client.Client()
+        self.client.login(username='admin', password='admin')
+
+    def check_changelist(self, model, filters):
+        """ Renders changelist with every filter and with different
+        page sizes.
+        """
+        model_admin = admin.site._registry[model]
+        url = urlresolvers.reverse('admin:{0}_{1}_changelist'.format(
+            model._meta.app_label, model._meta.model_name))
+        list_per_page = model_admin.list_per_page
+        try:
+            for query in [u''] + list(filters):
+                counts = []
+                for per_page in (1, 50):
+                    model_admin.list_per_page = per_page
+                    response = []
+                    counts.append(measure(
+                        u'changelist {0} {1}'.format(
+                            model._meta.model_name, query),
+                        per_page,
+                        lambda: response.append(
+                            self.client.get(url + u'?' + query))))
+                    self.assertEqual(response[0].status_code, 200)
+                self.assertEqual(counts[0], counts[1], query)
+        finally:
+            model_admin.list_per_page = list_per_page
+
+    def test_academic_changelist(self):
+        """ AcademicAdmin changelist.
+        """
+        self.check_changelist(models.Academic, (
+            u'leaving_reason__exact=F',
+            u'section__id__exact={0}'.format(
+                self.fixtures.sections[0].id),
+            u'q=Vardas',
+            u'q=pavarde',
+            ))
+
+    def test_workbook_changelist(self):
+        """ AcademicWorkbookAdmin changelist.
+        """
+        self.check_changelist(academics_admin.AcademicWorkbookProxy, (
+            u'section__id__exact={0}'.format(
+                self.fixtures.sections[0].id),
+            u'status=N',
+            u'status=F',
+            u'class=8',
+            u'class=13',
+            u'year_entered=2010',
+            u'q=Vardas',
+            ))
+
+    def test_workbook_changelist_without_roster(self):
+        """ AcademicWorkbookAdmin changelist before roster is built.
+        """
+        models.AcademicRoster.objects.all().delete()
+        try:
+            self.check_changelist(
+                    academics_admin.AcademicWorkbookProxy, (
+                        u'section__id__exact={0}'.format(
+                            self.fixtures.sections[0].id),
+                        ))
+        finally:
+            roster.rebuild()
+
+    def test_student_change_page(self):
+        """ Student page with achievements inline does not depend on
+        the number of achievements.
+        """
+        academics = list(models.Academic.objects.filter(
+            achievement__isnull=True)[:2])
+        counts = []
+        try:
+            for academic, size in zip(academics, (1, 20)):
+                models.Achievement.objects.bulk_create([
+                    models.Achievement(
+                        student_id=academic.student_id,
+                        academic=academic,
+                        competition=u'Olympiad',
+                        competition_type=u'N',
+                        place=i % 5)
+                    for i in range(size)])
+                url = urlresolvers.reverse(
+                        'admin:nmadb_students_student_change',
+                        args=(academic.student_id,))
+                response = []
+                counts.append(measure(
+                    u'student change page', size,
+                    lambda: response.append(self.client.get(url))))
+                self.assertEqual(response[0].status_code, 200)
+        finally:
+            models.Achievement.objects.filter(
+                    academic__in=academics).delete()
+        self.assertEqual(counts[0], counts[1])
+
+    def test_achievement_changelist(self):
+        """ AchievementAdmin changelist.
+        """
+        self.check_changelist(models.Achievement, (
+            u'competition_type__exact=N',
+            u'place__exact=4',
+            u'q=Vardas',
+            ))
+
+
+class StatisticsBenchmark(unittest.TestCase):
+    """ Benchmarks of statistics dashboard.
+    """
+
+    def setUp(self):
+        self.fixtures = get_fixtures()
+
+    def test_statistics(self):
+        """ Statistics are computed with grouped queries and cached.
+        """
+        models.academics_changed()
+        count = models.Academic.objects.count()
+        self.assertLessEqual(
+                measure(u'statistics', count, statistics.get_statistics),
+                4)
+        self.assertEqual(
+                measure(
+                    u'statistics cached', count,
+                    statistics.get_statistics),
+                0)
+        self.assertEqual(
+                sum(section[u'total'] for section in
+                    statistics.get_statistics()[u'sections']),
+                count)
+
+    def test_rankings(self):
+        """ Leaders are read from summaries with two queries.
+        """
+        count = models.AchievementSummary.objects.count()
+        for kind in (rankings.STUDENT, rankings.SECTION, rankings.SCHOOL):
+            self.assertEqual(
+                    measure(u'rankings top', count, rankings.top, kind),
+                    2)
+        [(student, summary)] = rankings.top(rankings.STUDENT, 1)
+        self.assertEqual(
+                summary.score,
+                sum(
+                    rankings.score(competition_type, place)
+                    for competition_type, place in (
+                        models.Achievement.objects.filter(
+                            student=student).values_list(
+                                u'competition_type', u'place'))))
+
+
+@unittest.skipUnless(analytics.is_available(), u'NumPy is not installed')
+class AnalyticsBenchmark(unittest.TestCase):
+    """ Benchmarks of columnar analytics.
+    """
+
+    def setUp(self):
+        self.fixtures = get_fixtures()
+
+    def test_report(self):
+        """ All academics are loaded with one query.
+        """
+        count = models.Academic.objects.count()
+        self.assertEqual(
+                measure(
+                    u'analytics columns', count,
+                    analytics.AcademicColumns.load),
+                1)
+        self.assertLessEqual(
+                measure(u'analytics report', count, analytics.report),
+                2)
+
+
+class LeavingBenchmark(unittest.TestCase):
+    """ Benchmarks of bulk leaving.
+    """
+
+    def setUp(self):
+        self.fixtures = get_fixtures()
+
+    def test_mark_left(self):
+        """ Academics are marked as left with one ``UPDATE``; roster and
+        search index are refreshed with a constant number of queries
+        per chunk.
+        """
+        for size in SIZES:
+            ids = list(leaving.open_academics().values_list(
+                u'id', flat=True)[:size])
+            summaries = []
+
+            def run():
+                """ Marks academics as left.
+                """
+                summaries.append(leaving.mark_left(
+                    models.Academic.objects.filter(id__in=ids),
+                    datetime.date(2015, 6, 30)))
+                self.assertEqual(
+                        leaving.open_academics(
+                            models.Academic.objects.filter(
+                                id__in=ids)).count(),
+                        0)
+
+            used = measure(u'mark_left', len(ids), rolled_back, run)
+            self.assertEqual(summaries[0].total, len(ids))
+            chunks = int(math.ceil(float(len(ids)) / leaving.CHUNK_SIZE))
+            # Roster refresh of a chunk as in import, see
+            # ImportBenchmark.test_import_academics.
+            per_chunk = 11 + bulk_queries(
+                    models.AcademicRoster, leaving.CHUNK_SIZE
+                    ) + bulk_queries(
+                        models.SearchToken, 16 * leaving.CHUNK_SIZE)
+            # Selected academics, update, section titles and the check.
+            self.assertLessEqual(used, 4 + chunks * per_chunk)
+
+
+class ExportBenchmark(unittest.TestCase):
+    """ Benchmarks of sheet exports.
+    """
+
+    def setUp(self):
+        self.fixtures = get_fixtures()
+
+    def test_export_sheets(self):
+        """ Exports all academics and achievements with a constant
+        number of queries per chunk.
+        """
+        for model in (
+                models.Academic,
+                academics_admin.AcademicWorkbookProxy,
+                models.Achievement):
+            model_admin = admin.site._registry[model]
+            queryset = model.objects.all()
+            count = queryset.count()
+            plan = exporting.ExportPlan(model, model_admin.sheet_mapping)
+            queries = measure(
+                    u'export {0}'.format(model._meta.model_name),
+                    count,
+                    list,
+                    exporting.iter_sheet_rows(
+                        queryset, model_admin.sheet_mapping))
+            chunks = count // exporting.CHUNK_SIZE + 1
+            self.assertLessEqual(
+                    queries, chunks * (1 + len(plan.prefetch_related)))
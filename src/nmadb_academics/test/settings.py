@@ -0,0 +1,47 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Settings for running tests and benchmarks on local SQLite database.
+"""
+
+
+import tempfile
+
+
+DEBUG = False
+
+SECRET_KEY = 'nmadb-academics-test'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        },
+    }
+
+INSTALLED_APPS = (
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.admin',
+    'nmadb_utils',
+    'nmadb_contacts',
+    'nmadb_students',
+    'nmadb_academics',
+    )
+
+MIDDLEWARE_CLASSES = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    )
+
+ROOT_URLCONF = 'nmadb_academics.test.urls'
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='nmadb-academics-')
+
+USE_TZ = True
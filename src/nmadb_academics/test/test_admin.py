@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of admin filters and actions.
+"""
+
+
+import datetime
+import unittest
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.contrib import admin
+from django.contrib.auth import models as auth_models
+from django.core import urlresolvers
+
+from nmadb_academics import leaving, models
+from nmadb_academics import admin as academics_admin
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class SchoolYearTest(unittest.TestCase):
+    """ Tests of :func:`nmadb_academics.leaving.get_school_year`.
+    """
+
+    def test_september_starts_school_year(self):
+        self.assertEqual(
+                leaving.get_school_year(datetime.date(2014, 8, 31)), 2014)
+        self.assertEqual(
+                leaving.get_school_year(datetime.date(2014, 9, 1)), 2015)
+        self.assertEqual(
+                leaving.get_school_year(datetime.date(2015, 1, 1)), 2015)
+
+
+class SchoolClassFilterTest(test.TestCase):
+    """ Tests of :class:`nmadb_academics.admin.SchoolClassFilter`.
+    """
+
+    def setUp(self):
+        section = utils.create_section(u'Matematika', u'M')
+        year = leaving.get_school_year()
+        self.academics = {}
+        for school_class in (10, 12, 13):
+            student = utils.create_student(
+                    u'Jonas', utils.name(u'Jonaitis', school_class),
+                    school_class=min(school_class, 12),
+                    school_year=year - max(school_class - 12, 0))
+            self.academics[school_class] = models.Academic.objects.create(
+                    student=student, section=section,
+                    entered=datetime.date(2010, 9, 1))
+
+    def filter(self, value):
+        """ Returns ids of academics in the class.
+        """
+        list_filter = academics_admin.SchoolClassFilter(
+                None, {u'class': value}, models.Academic,
+                admin.site._registry[models.Academic])
+        return list(list_filter.queryset(
+            None, models.Academic.objects.all()).values_list(
+                u'id', flat=True))
+
+    def test_filter(self):
+        for school_class, academic in self.academics.items():
+            self.assertEqual(
+                    self.filter(unicode(school_class)), [academic.id])
+        self.assertEqual(len(self.filter(u'')), 3)
+
+
+class MarkLeftActionTest(test.TestCase):
+    """ Tests of :meth:`nmadb_academics.admin.LeavingActionsMixin.mark_left`
+    sent through the academics changelist.
+    """
+
+    def setUp(self):
+        auth_models.User.objects.create_superuser(
+                'admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        section = utils.create_section(u'Matematika', u'M')
+        self.academics = [
+                models.Academic.objects.create(
+                    student=utils.create_student(
+                        u'Jonas', utils.name(u'Jonaitis', i)),
+                    section=section,
+                    entered=datetime.date(2010, 9, 1))
+                for i in range(3)]
+
+    def post(self, academics, **values):
+        """ Sends the action for the academics.
+        """
+        data = {
+                u'action': u'mark_left',
+                u'_selected_action': [
+                    unicode(academic.id) for academic in academics],
+                u'index': u'0',
+                }
+        data.update(values)
+        return self.client.post(
+                urlresolvers.reverse(
+                    'admin:nmadb_academics_academic_changelist'),
+                data, follow=True)
+
+    def test_mark_left(self):
+        response = self.post(
+                self.academics[:2], left=u'2014-06-30', leaving_reason=u'W')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+                [unicode(message) for message in response.context['messages']],
+                [u'2 academics marked as left on 2014-06-30 '
+                 u'(Matematika: 2).'])
+        self.assertEqual(
+                list(models.Academic.objects.order_by(u'id').values_list(
+                    u'left', u'leaving_reason')),
+                [
+                    (datetime.date(2014, 6, 30), u'W'),
+                    (datetime.date(2014, 6, 30), u'W'),
+                    (None, None),
+                    ])
+
+    def test_defaults(self):
+        self.post(self.academics[:1], left=u'', leaving_reason=u'')
+        academic = models.Academic.objects.get(id=self.academics[0].id)
+        self.assertEqual(academic.left, datetime.date.today())
+        self.assertEqual(academic.leaving_reason, leaving.FINISHED)
+
+    def test_invalid_date(self):
+        response = self.post(self.academics, left=u'2014-13-01')
+        self.assertEqual(
+                [unicode(message) for message in response.context['messages']],
+                [u'Invalid leaving date.'])
+        self.assertFalse(models.Academic.objects.exclude(
+            leaving_reason=None).exists())
+
+
+class SectionSavedTest(test.TestCase):
+    """ Tests of :func:`nmadb_academics.leaving.section_saved`.
+    """
+
+    def setUp(self):
+        self.section = utils.create_section(u'Matematika', u'M')
+        self.academics = {}
+        for i, (entered, left, leaving_reason) in enumerate((
+                (datetime.date(2010, 9, 1), None, None),
+                (datetime.date(2010, 9, 1), datetime.date(2011, 1, 1), u'W'),
+                (datetime.date(2013, 9, 1), None, None),
+                )):
+            self.academics[i] = models.Academic.objects.create(
+                    student=utils.create_student(
+                        u'Jonas', utils.name(u'Jonaitis', i)),
+                    section=self.section,
+                    entered=entered,
+                    left=left,
+                    leaving_reason=leaving_reason)
+
+    def get(self, i):
+        """ Returns ``(left, leaving_reason)`` of the academic.
+        """
+        return models.Academic.objects.filter(
+                id=self.academics[i].id).values_list(
+                    u'left', u'leaving_reason')[0]
+
+    def test_not_abolished(self):
+        self.section.title = u'Matematikos'
+        self.section.save()
+        self.assertEqual(self.get(0), (None, None))
+
+    def test_abolished(self):
+        self.section.abolished = datetime.date(2012, 6, 30)
+        self.section.save()
+        self.assertEqual(
+                self.get(0), (datetime.date(2012, 6, 30), leaving.FINISHED))
+        # Academics, who have already left or entered after abolition,
+        # are not changed.
+        self.assertEqual(self.get(1), (datetime.date(2011, 1, 1), u'W'))
+        self.assertEqual(self.get(2), (None, None))
+
+    def test_abolished_section_saved_again(self):
+        self.section.abolished = datetime.date(2012, 6, 30)
+        self.section.save()
+        models.Academic.objects.filter(id=self.academics[0].id).update(
+                left=None, leaving_reason=None)
+        self.section.title = u'Matematikos'
+        self.section.save()
+        self.assertEqual(self.get(0), (None, None))
@@ -0,0 +1,35 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of columnar analytics.
+"""
+
+
+import datetime
+import unittest
+
+from nmadb_academics import analytics
+
+
+class AcademicColumnsTest(unittest.TestCase):
+    """ Tests of :class:`nmadb_academics.analytics.AcademicColumns`.
+    """
+
+    def setUp(self):
+        if not analytics.is_available():
+            raise unittest.SkipTest(u'NumPy is not installed.')
+
+    def test_unknown_reason(self):
+        columns = analytics.AcademicColumns.from_rows([
+            (1, 1, datetime.date(2010, 9, 1), None, None),
+            (2, 1, datetime.date(2010, 9, 1),
+             datetime.date(2012, 6, 1), u'F'),
+            (3, 1, datetime.date(2010, 9, 1),
+             datetime.date(2012, 6, 1), u'X'),
+            (3, 2, datetime.date(2012, 9, 1), None, u''),
+            ])
+        self.assertEqual(
+                list(columns.reason),
+                [0, analytics.REASONS.index(u'F'), analytics.OTHER, 0])
+        self.assertEqual(list(columns.known()), [True] * 4)
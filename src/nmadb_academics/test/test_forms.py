@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of import row conversion and duplicate detection.
+"""
+
+
+import datetime
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.core.exceptions import ValidationError
+
+from nmadb_students import models as students_models
+from nmadb_academics import forms
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class AcademicRowConverterTest(test.TestCase):
+    """ Tests of :class:`nmadb_academics.forms.AcademicRowConverter`.
+    """
+
+    def setUp(self):
+        self.school = utils.create(
+                students_models.School, title=u'Vilniaus licėjus')
+        self.section = utils.create_section(u'Matematika', u'M')
+        self.lookups = forms.AcademicImportLookups()
+
+    def convert(self, **values):
+        """ Converts valid row updated with given values.
+        """
+        row = utils.academic_import_row(
+                self.school, self.section, **values)
+        return forms.academic_import_clean_row(row, self.lookups)
+
+    def test_convert(self):
+        row = self.convert(section=u'MATEMATIKA', phone=u'')
+        self.assertEqual(row[u'school'], self.school)
+        self.assertEqual(row[u'section'], self.section)
+        self.assertEqual(row[u'municipality_code'], self.school.municipality)
+        self.assertEqual(
+                row[u'gender'],
+                students_models.Student.GENDER_CHOICES[0][0])
+        self.assertEqual(row[u'birth_date'], datetime.date(2000, 1, 1))
+        self.assertEqual(row[u'entered'], datetime.date(2014, 9, 1))
+        self.assertEqual(row[u'school_class'], 10)
+        self.assertEqual(row[u'school_year'], 2014)
+        self.assertIs(row[u'social_disadvantage_mark'], False)
+        self.assertIs(row[u'phone'], None)
+
+    def test_all_errors_of_row(self):
+        with self.assertRaises(ValidationError) as context:
+            self.convert(
+                    school_class=u'x', section=u'Fizika',
+                    entered=u'2014-13-01')
+        self.assertEqual(len(context.exception.messages), 3)
+
+    def test_missing_columns(self):
+        row = utils.academic_import_row(self.school, self.section)
+        del row[unicode(forms.IMPORT_ACADEMICS_REQUIRED_COLUMNS[u'town'])]
+        del row[unicode(forms.IMPORT_ACADEMICS_REQUIRED_COLUMNS[u'email'])]
+        with self.assertRaises(ValidationError) as context:
+            self.lookups.get_converter(row.keys())
+        self.assertEqual(len(context.exception.messages), 2)
+
+    def test_converter_per_captions(self):
+        row = utils.academic_import_row(self.school, self.section)
+        self.assertIs(
+                self.lookups.get_converter(row.keys()),
+                self.lookups.get_converter(reversed(list(row.keys()))))
+
+
+class AcademicDuplicateFinderTest(test.TestCase):
+    """ Tests of :class:`nmadb_academics.forms.AcademicDuplicateFinder`.
+    """
+
+    def setUp(self):
+        utils.create_student(u'Jonas', u'Jonaitis')
+
+    def test_existing_names(self):
+        finder = forms.AcademicDuplicateFinder()
+        hits = finder.check([
+            (u'Jonas', u'Jonaitis'),
+            (u'Jonaitis', u'Jonas'),
+            (u'Petras', u'Petraitis'),
+            ])
+        self.assertEqual([len(messages) for messages in hits], [1, 2, 0])
+        self.assertEqual(finder.found, [u'Jonas Jonaitis'] * 2)
+        self.assertEqual(finder.repeated, [u'Jonaitis Jonas'])
+
+    def test_names_ignore_case(self):
+        finder = forms.AcademicDuplicateFinder()
+        hits = finder.check([
+            (u'JONAS', u'jonaitis'),
+            (u'Ąžuolas', u'Žydrūnas'),
+            (u'žydrūnas', u'ĄŽUOLAS'),
+            ])
+        self.assertEqual([len(messages) for messages in hits], [1, 0, 1])
+        self.assertEqual(finder.found, [u'JONAS jonaitis'])
+        self.assertEqual(finder.repeated, [u'žydrūnas ĄŽUOLAS'])
+
+    def test_stored_names_ignore_case(self):
+        utils.create_student(u'PETRAS', u'McDonald')
+        utils.create_student(u'Žydrūnas', u'Šimkus')
+        finder = forms.AcademicDuplicateFinder()
+        hits = finder.check([
+            (u'Petras', u'MCDONALD'),
+            (u'ŽYDRūNAS', u'Šimkus'),
+            (u'Ona', u'Onaitė'),
+            ])
+        self.assertEqual([len(messages) for messages in hits], [1, 1, 0])
+        self.assertEqual(
+                finder.found, [u'Petras MCDONALD', u'ŽYDRūNAS Šimkus'])
+
+    def test_many_names(self):
+        # Upper-case names need most query parameters.
+        names = [
+                (utils.name(u'VARDAS', i), utils.name(u'PAVARDĖ', i))
+                for i in range(forms.DUPLICATES_QUERY_CHUNK_SIZE)]
+        finder = forms.AcademicDuplicateFinder()
+        hits = finder.check(names + [(u'JONAS', u'JONAITIS')])
+        self.assertEqual(sum(len(messages) for messages in hits), 1)
+
+    def test_repeated_in_file(self):
+        finder = forms.AcademicDuplicateFinder()
+        hits = finder.check([
+            (u'Petras', u'Petraitis'),
+            (u'Ona', u'Onaitė'),
+            ])
+        hits.extend(finder.check([
+            (u'Petraitis', u'Petras'),
+            (u'Ona', u'Onaitė'),
+            ]))
+        self.assertEqual([len(messages) for messages in hits], [0, 0, 1, 1])
+        self.assertEqual(
+                finder.repeated, [u'Petraitis Petras', u'Ona Onaitė'])
+        self.assertEqual(len(finder.errors()), 1)
@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of spreadsheet validation and import.
+"""
+
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.core.exceptions import ValidationError
+
+from nmadb_students import models as students_models
+from nmadb_academics import forms, importer, models
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class ImportTestCase(test.TestCase):
+    """ Creates school and section of the imported rows.
+    """
+
+    def setUp(self):
+        self.school = utils.create(
+                students_models.School, title=u'Vilniaus licėjus')
+        self.section = utils.create_section(u'Matematika', u'M')
+
+    def row(self, first_name, last_name, **values):
+        """ Returns valid row of the student.
+        """
+        return utils.academic_import_row(
+                self.school, self.section,
+                first_name=first_name, last_name=last_name, **values)
+
+
+class ValidateSpreadsheetTest(ImportTestCase):
+    """ Tests of :func:`nmadb_academics.importer.validate_spreadsheet`.
+    """
+
+    def test_report(self):
+        utils.create_student(u'Ona', u'Onaitė')
+        report = importer.validate_spreadsheet(
+                utils.academics_csv_file([
+                    self.row(u'Jonas', u'Jonaitis'),
+                    self.row(u'Petras', u'Petraitis', school_class=u'5'),
+                    self.row(u'Ona', u'Onaitė'),
+                    self.row(u'Jonaitis', u'Jonas'),
+                    ]),
+                batch_size=2)
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.rows, 4)
+        sheet_name = forms.IMPORT_ACADEMICS_SHEET_NAME
+        self.assertEqual(
+                [error[:4] for error in report.errors()],
+                [
+                    (sheet_name, 3, u'Petras', u'Petraitis'),
+                    (sheet_name, 4, u'Ona', u'Onaitė'),
+                    (sheet_name, 5, u'Jonaitis', u'Jonas'),
+                    ])
+        self.assertFalse(models.Academic.objects.exists())
+
+    def test_missing_columns_reported_once(self):
+        row = self.row(u'Jonas', u'Jonaitis')
+        del row[unicode(forms.IMPORT_ACADEMICS_REQUIRED_COLUMNS[u'town'])]
+        report = importer.validate_spreadsheet(
+                utils.academics_csv_file([row, row]))
+        self.assertEqual(len(report.errors()), 1)
+
+    def test_valid(self):
+        report = importer.validate_spreadsheet(
+                utils.academics_csv_file([self.row(u'Jonas', u'Jonaitis')]))
+        self.assertTrue(report.is_valid())
+        self.assertEqual(report.rows, 1)
+
+
+class ImportSpreadsheetTest(ImportTestCase):
+    """ Tests of :func:`nmadb_academics.importer.import_spreadsheet`.
+    """
+
+    def test_import(self):
+        count = importer.import_spreadsheet(
+                utils.academics_csv_file([
+                    self.row(u'Jonas', u'Jonaitis'),
+                    self.row(u'Petras', u'Petraitis'),
+                    self.row(u'Ona', u'Onaitė'),
+                    ]),
+                batch_size=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(
+                sorted(models.Academic.objects.values_list(
+                    u'student__last_name', flat=True)),
+                [u'Jonaitis', u'Onaitė', u'Petraitis'])
+        self.assertEqual(
+                set(models.Academic.objects.values_list(
+                    u'section', flat=True)),
+                set([self.section.id]))
+
+    def test_duplicates_in_file(self):
+        with self.assertRaises(ValidationError):
+            importer.import_spreadsheet(
+                    utils.academics_csv_file([
+                        self.row(u'Jonas', u'Jonaitis'),
+                        self.row(u'Petras', u'Petraitis'),
+                        self.row(u'Jonaitis', u'Jonas'),
+                        ]),
+                    batch_size=2)
+
+
+class PartialImportTest(ImportTestCase):
+    """ Tests of :class:`nmadb_academics.importer.PartialImport`.
+    """
+
+    names = [
+            (u'Jonas', u'Jonaitis'),
+            (u'Petras', u'Petraitis'),
+            (u'Ona', u'Onaitė'),
+            (u'Rūta', u'Rūtaitė'),
+            (u'Tomas', u'Tomaitis'),
+            ]
+
+    def spreadsheet(self, names):
+        """ Returns file of students with given names.
+        """
+        return utils.academics_csv_file([
+            self.row(first_name, last_name)
+            for first_name, last_name in names])
+
+    def test_resume_after_failure(self):
+        existing = utils.create_student(u'Rūta', u'Rūtaitė')
+        spreadsheet = self.spreadsheet(self.names)
+        partial = importer.PartialImport(batch_size=2)
+        with self.assertRaises(ValidationError):
+            partial.run(spreadsheet)
+        self.assertEqual((partial.batches, partial.imported), (1, 2))
+        existing.delete()
+        partial = importer.PartialImport(batch_size=3).run(spreadsheet)
+        self.assertEqual(
+                (partial.skipped, partial.batches, partial.imported),
+                (1, 1, 3))
+        self.assertEqual(models.Academic.objects.count(), 5)
+        self.assertEqual(
+                sorted(models.ImportBatch.objects.values_list(
+                    u'first_row', u'rows')),
+                [(0, 2), (2, 3)])
+        partial = importer.PartialImport(batch_size=1).run(spreadsheet)
+        self.assertEqual((partial.skipped, partial.imported), (2, 0))
+
+    def test_other_file_with_same_rows(self):
+        importer.PartialImport(
+                check_duplicates=False, batch_size=2).run(
+                self.spreadsheet(self.names[:2]))
+        partial = importer.PartialImport(
+                check_duplicates=False, batch_size=2).run(
+                self.spreadsheet(self.names[:3]))
+        self.assertEqual((partial.skipped, partial.imported), (0, 3))
+        self.assertEqual(models.Academic.objects.count(), 5)
+
+
+class SetMainAddressesTest(ImportTestCase):
+    """ Tests of :func:`nmadb_academics.importer.set_main_addresses`.
+    """
+
+    def test_many_students(self):
+        count = importer.import_spreadsheet(
+                utils.academics_csv_file([
+                    self.row(u'Jonas', u'Jonaitis'),
+                    self.row(u'Petras', u'Petraitis'),
+                    ]),
+                check_duplicates=False)
+        self.assertEqual(count, 2)
+        student_ids = list(students_models.Student.objects.values_list(
+            u'id', flat=True))
+        students_models.Student.objects.update(main_address=None)
+        # More than SQLite allows parameters in one query.
+        importer.set_main_addresses(
+                student_ids + list(range(100000, 101200)))
+        self.assertFalse(students_models.Student.objects.filter(
+            main_address=None).exists())
+
+
+class ImportAchievementsTest(test.TestCase):
+    """ Tests of :func:`nmadb_academics.importer.import_achievements`.
+    """
+
+    def setUp(self):
+        self.student = utils.create_student(u'Jonas', u'Jonaitis')
+
+    def spreadsheet(self, places, competition=u'Olimpiada'):
+        """ Returns uploaded file of the student achievements in the
+        national competition.
+        """
+        columns = forms.IMPORT_ACHIEVEMENTS_REQUIRED_COLUMNS
+        captions = [
+                unicode(columns[column])
+                for column in (
+                    u'first_name', u'last_name', u'competition',
+                    u'competition_type', u'place')]
+        return utils.csv_file(
+                [captions] + [
+                    [u'Jonas', u'Jonaitis', competition, u'N', place]
+                    for place in places],
+                u'achievements.csv')
+
+    def test_place_numbers(self):
+        report, count = importer.import_achievements(
+                self.spreadsheet([u'1', u'2', u'3']))
+        self.assertTrue(report.is_valid())
+        self.assertEqual(count, 3)
+        self.assertEqual(
+                sorted(models.Achievement.objects.values_list(
+                    u'place', flat=True)),
+                [2, 3, 4])
+
+    def test_place_titles(self):
+        report, count = importer.import_achievements(
+                self.spreadsheet([u'First', u'honorable mention']))
+        self.assertTrue(report.is_valid())
+        self.assertEqual(
+                sorted(models.Achievement.objects.values_list(
+                    u'place', flat=True)),
+                [1, 4])
+
+    def test_place_codes_rejected(self):
+        report, count = importer.import_achievements(
+                self.spreadsheet([u'0', u'4']))
+        self.assertEqual(count, 0)
+        self.assertEqual(
+                [error[1] for error in report.errors()], [2, 3])
+        self.assertFalse(models.Achievement.objects.exists())
+
+    def test_imported_twice(self):
+        report, count = importer.import_achievements(
+                self.spreadsheet([u'1', u'2']))
+        self.assertEqual(count, 2)
+        report, count = importer.import_achievements(
+                self.spreadsheet([u'1', u'2'], competition=u'OLIMPIADA'))
+        self.assertEqual(count, 0)
+        self.assertEqual(
+                [error[1] for error in report.errors()], [2, 3])
+        self.assertEqual(models.Achievement.objects.count(), 2)
+
+    def test_repeated_in_file(self):
+        report, count = importer.import_achievements(
+                self.spreadsheet([u'1', u'2', u'1']))
+        self.assertEqual(count, 0)
+        self.assertEqual(
+                [error[1:4] for error in report.errors()],
+                [(4, u'Jonas', u'Jonaitis')])
+        self.assertFalse(models.Achievement.objects.exists())
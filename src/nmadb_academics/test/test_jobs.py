@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of background import jobs.
+"""
+
+
+import datetime
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.utils import timezone
+
+from nmadb_students import models as students_models
+from nmadb_academics import importer, jobs, models
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class JobsTest(test.TestCase):
+    """ Tests of job claiming and running.
+    """
+
+    def setUp(self):
+        self.school = utils.create(
+                students_models.School, title=u'Vilniaus licėjus')
+        self.section = utils.create_section(u'Matematika', u'M')
+
+    def enqueue(self, *names, **kwargs):
+        """ Enqueues import of students with given names.
+        """
+        return jobs.enqueue(utils.academics_csv_file([
+            utils.academic_import_row(
+                self.school, self.section,
+                first_name=first_name, last_name=last_name)
+            for first_name, last_name in names]), **kwargs)
+
+    def test_claim_oldest(self):
+        first = self.enqueue((u'Jonas', u'Jonaitis'))
+        second = self.enqueue((u'Petras', u'Petraitis'))
+        models.ImportJob.objects.filter(id=first.id).update(
+                created=timezone.now() - datetime.timedelta(minutes=1))
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual(claimed.status, u'R')
+        self.assertIsNotNone(claimed.started)
+        self.assertEqual(jobs.claim_next_job().id, second.id)
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_reset_stale(self):
+        stale = self.enqueue((u'Jonas', u'Jonaitis'))
+        running = self.enqueue((u'Petras', u'Petraitis'))
+        self.assertEqual(jobs.claim_next_job().id, stale.id)
+        self.assertEqual(jobs.claim_next_job().id, running.id)
+        models.ImportJob.objects.filter(id=stale.id).update(
+                updated=timezone.now() - datetime.timedelta(hours=2))
+        self.assertEqual(jobs.reset_stale_jobs(3600), 1)
+        self.assertEqual(
+                models.ImportJob.objects.get(id=stale.id).status, u'P')
+        self.assertEqual(
+                models.ImportJob.objects.get(id=running.id).status, u'R')
+        self.assertEqual(jobs.claim_next_job().id, stale.id)
+
+    def test_progress_keeps_job_running(self):
+        self.enqueue((u'Jonas', u'Jonaitis'))
+        job = jobs.claim_next_job()
+        long_ago = timezone.now() - datetime.timedelta(hours=2)
+        models.ImportJob.objects.filter(id=job.id).update(
+                started=long_ago, updated=long_ago)
+        job = models.ImportJob.objects.get(id=job.id)
+        jobs.record_progress(job, importer.PartialImport())
+        self.assertEqual(jobs.reset_stale_jobs(3600), 0)
+        self.assertEqual(
+                models.ImportJob.objects.get(id=job.id).status, u'R')
+
+    def test_reset_job_left_to_new_worker(self):
+        self.enqueue((u'Jonas', u'Jonaitis'), (u'Petras', u'Petraitis'))
+        job = jobs.claim_next_job()
+        models.ImportJob.objects.filter(id=job.id).update(
+                updated=timezone.now() - datetime.timedelta(hours=2))
+        jobs.reset_stale_jobs(3600)
+        claimed = jobs.claim_next_job()
+        self.assertRaises(
+                jobs.JobReset,
+                jobs.record_progress, job, importer.PartialImport())
+        jobs.run_job(job, 1)
+        job = models.ImportJob.objects.get(id=job.id)
+        self.assertEqual(job.status, u'R')
+        self.assertEqual(job.started, claimed.started)
+        self.assertIsNone(job.finished)
+
+    def test_rerun_skips_committed_batches(self):
+        self.enqueue(
+                (u'Jonas', u'Jonaitis'),
+                (u'Petras', u'Petraitis'),
+                (u'Ona', u'Onaitė'),
+                batch_size=2)
+        job = jobs.run_job(jobs.claim_next_job(), 1)
+        models.ImportJob.objects.filter(id=job.id).update(
+                status=u'R',
+                updated=timezone.now() - datetime.timedelta(hours=2))
+        jobs.reset_stale_jobs(3600)
+        job = jobs.run_job(jobs.claim_next_job(), 1)
+        self.assertEqual(job.status, u'D')
+        self.assertEqual(job.skipped_batches, 2)
+        self.assertEqual(job.imported, 0)
+        self.assertEqual(models.Academic.objects.count(), 3)
+
+    def test_run(self):
+        self.enqueue(
+                (u'Jonas', u'Jonaitis'),
+                (u'Petras', u'Petraitis'),
+                (u'Ona', u'Onaitė'),
+                batch_size=2)
+        job = jobs.run_job(jobs.claim_next_job(), 1)
+        self.assertEqual(job.status, u'D')
+        job = models.ImportJob.objects.get(id=job.id)
+        self.assertEqual(job.status, u'D')
+        self.assertEqual(job.batches, 2)
+        self.assertEqual(job.imported, 3)
+        self.assertIsNotNone(job.finished)
+        self.assertEqual(models.Academic.objects.count(), 3)
+
+    def test_run_failed(self):
+        self.enqueue(
+                (u'Jonas', u'Jonaitis'),
+                (u'Petras', u'Petraitis'),
+                (u'Jonaitis', u'Jonas'),
+                batch_size=2)
+        job = jobs.run_job(jobs.claim_next_job(), 1)
+        job = models.ImportJob.objects.get(id=job.id)
+        self.assertEqual(job.status, u'F')
+        self.assertIn(u'Jonaitis Jonas', job.errors)
+        self.assertEqual(job.imported, 2)
+        self.assertEqual(models.Academic.objects.count(), 2)
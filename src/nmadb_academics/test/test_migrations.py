@@ -0,0 +1,47 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of migrations.
+"""
+
+
+import importlib
+import os
+import unittest
+
+import django
+from django.db.migrations.loader import MigrationLoader
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Sets up Django with test settings. The tests do not need
+    database.
+    """
+    os.environ.setdefault(
+            'DJANGO_SETTINGS_MODULE', 'nmadb_academics.test.settings')
+    django.setup()
+
+
+class InitialMigrationTest(unittest.TestCase):
+    """ Existing databases were created without migrations, therefore the
+    initial migration has to match their schema, so that it is faked.
+    """
+
+    def test_initial_creates_baseline_models(self):
+        migration = importlib.import_module(
+                'nmadb_academics.migrations.0001_initial').Migration
+        self.assertEqual(
+                [operation.name for operation in migration.operations],
+                ['Section', 'Academic', 'Achievement'])
+        self.assertIn(('nmadb_students', '__first__'), migration.dependencies)
+
+    def test_graph(self):
+        loader = MigrationLoader(None)
+        leaf, = [
+                node for node in loader.graph.leaf_nodes()
+                if node[0] == 'nmadb_academics']
+        plan = loader.graph.forwards_plan(leaf)
+        self.assertLess(
+                plan.index(('nmadb_academics', '0001_initial')),
+                plan.index(('nmadb_academics', '0002_importjob')))
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of achievement summaries.
+"""
+
+
+import datetime
+
+from nmadb_academics.test import utils
+
+from django import test
+
+from nmadb_students import models as students_models
+from nmadb_academics import models, rankings
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class SummaryTest(test.TestCase):
+    """ Tests of summaries maintained by receivers.
+    """
+
+    def setUp(self):
+        self.school = utils.create(students_models.School, title=u'A')
+        self.other_school = utils.create(
+                students_models.School, title=u'B')
+        sections = [
+                utils.create_section(u'Matematika', u'M'),
+                utils.create_section(u'Fizika', u'F'),
+                ]
+        self.students = [
+                utils.create_student(u'Jonas', u'Jonaitis', self.school),
+                utils.create_student(u'Petras', u'Petraitis', self.school),
+                utils.create_student(u'Ona', u'Onaitė', self.other_school),
+                ]
+        for student, student_sections in zip(
+                self.students, (sections, sections[:1], sections[1:])):
+            for section in student_sections:
+                models.Academic.objects.create(
+                        student=student, section=section,
+                        entered=datetime.date(2012, 9, 1))
+        for student, competition_type, place in (
+                (0, u'N', 4),
+                (0, u'R', 2),
+                (1, u'N', 4),
+                (2, u'I', 0),
+                ):
+            utils.create(
+                    models.Achievement,
+                    student=self.students[student],
+                    competition=u'Olimpiada',
+                    competition_type=competition_type,
+                    place=place)
+
+    def summary(self, kind, object_id):
+        """ Returns stored summary.
+        """
+        return models.AchievementSummary.objects.get(
+                kind=kind, object_id=object_id)
+
+    def test_school_counts_each_achievement_once(self):
+        summary = self.summary(rankings.SCHOOL, self.school.id)
+        self.assertEqual(
+                (summary.regional, summary.national, summary.international),
+                (1, 2, 0))
+        self.assertEqual(summary.best_place, 4)
+        self.assertEqual(summary.score, 3 * 5 * 2 + 1 * 3)
+        self.assertEqual(
+                self.summary(rankings.SCHOOL, self.other_school.id).score,
+                9 * 1)
+
+    def test_compute_matches_stored(self):
+        computed, = rankings.compute(rankings.SCHOOL, [self.school.id])
+        stored = self.summary(rankings.SCHOOL, self.school.id)
+        self.assertEqual(
+                (computed.regional, computed.national, computed.score),
+                (stored.regional, stored.national, stored.score))
+
+    def test_top(self):
+        self.assertEqual(
+                [(school, summary.score) for school, summary in
+                 rankings.top(rankings.SCHOOL)],
+                [(self.school, 33), (self.other_school, 9)])
+        self.assertEqual(
+                [student for student, _summary in
+                 rankings.top(rankings.STUDENT)],
+                [self.students[0], self.students[1], self.students[2]])
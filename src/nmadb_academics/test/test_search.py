@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of the admin search index.
+"""
+
+
+import datetime
+import importlib
+import unittest
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.apps import apps
+
+from nmadb_students import models as students_models
+from nmadb_academics import models, search
+from nmadb_academics import admin as academics_admin
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class FoldTest(unittest.TestCase):
+    """ Tests of token folding.
+    """
+
+    def test_fold(self):
+        self.assertEqual(search.fold(u'Šiaulių'), u'siauliu')
+        self.assertEqual(search.fold(u'ŽYDRŪNAS'), u'zydrunas')
+
+    def test_tokenize(self):
+        self.assertEqual(
+                search.tokenize(
+                    u'Jonas Jonaitis', datetime.date(2014, 9, 1), None),
+                set([u'jonas', u'jonaitis', u'2014', u'09', u'01']))
+
+
+class FilterTest(test.TestCase):
+    """ Tests of search by the index maintained with receivers.
+    """
+
+    def setUp(self):
+        school = utils.create(
+                students_models.School,
+                title=u'Šiaulių gimnazija')
+        self.section = utils.create_section(u'Matematika', u'M')
+        self.student = utils.create_student(
+                u'Žydrūnas', u'Petraitis', school)
+        self.academic = models.Academic.objects.create(
+                student=self.student, section=self.section,
+                entered=datetime.date(2014, 9, 1))
+
+    def search(self, kind, term):
+        """ Returns ids of objects found by the term.
+        """
+        model = {
+                search.ACADEMIC: models.Academic,
+                search.ACHIEVEMENT: models.Achievement,
+                }[kind]
+        return list(search.filter_queryset(
+            model.objects.all(), kind, term).values_list(u'id', flat=True))
+
+    def test_academic_found_without_diacritics(self):
+        self.assertEqual(
+                self.search(search.ACADEMIC, u'siauliu zydr'),
+                [self.academic.id])
+        self.assertEqual(
+                self.search(search.ACADEMIC, u'MATEM 2014'),
+                [self.academic.id])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search(search.ACADEMIC, u'siauliu kaun'), [])
+
+    def test_achievement_reindexed(self):
+        achievement = utils.create(
+                models.Achievement,
+                student=self.student,
+                competition=u'Olimpiada')
+        self.assertEqual(
+                self.search(search.ACHIEVEMENT, u'olimp petr'),
+                [achievement.id])
+        self.student.last_name = u'Kazlauskas'
+        self.student.save()
+        self.assertEqual(self.search(search.ACHIEVEMENT, u'petr'), [])
+        self.assertEqual(
+                self.search(search.ACHIEVEMENT, u'kazl'), [achievement.id])
+        achievement.delete()
+        self.assertFalse(models.SearchToken.objects.filter(
+            kind=search.ACHIEVEMENT).exists())
+
+    def test_academic_deleted_through_proxy(self):
+        academics_admin.AcademicWorkbookProxy.objects.get(
+                id=self.academic.id).delete()
+        self.assertFalse(models.SearchToken.objects.filter(
+            kind=search.ACADEMIC).exists())
+
+    def test_filled_by_migration(self):
+        achievement = utils.create(
+                models.Achievement,
+                student=self.student,
+                competition=u'Olimpiada')
+        models.SearchToken.objects.all().delete()
+        importlib.import_module(
+                'nmadb_academics.migrations.0006_searchtoken'
+                ).index_objects(apps, None)
+        self.assertEqual(
+                self.search(search.ACADEMIC, u'siauliu zydr'),
+                [self.academic.id])
+        self.assertEqual(
+                self.search(search.ACHIEVEMENT, u'olimp petr'),
+                [achievement.id])
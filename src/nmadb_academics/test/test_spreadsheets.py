@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of spreadsheet readers.
+"""
+
+
+import StringIO
+import sys
+import unittest
+import zipfile
+
+from nmadb_academics.test import utils
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from nmadb_academics import spreadsheets
+
+
+ODS_CONTENT = u'''<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content
+    xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+    xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+    xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">
+<office:body><office:spreadsheet>
+<table:table table:name="Mokiniai">
+<table:table-row>
+<table:table-cell office:value-type="string">
+<text:p>Vardas</text:p></table:table-cell>
+<table:table-cell office:value-type="string">
+<text:p>Gimė</text:p></table:table-cell>
+<table:table-cell table:number-columns-repeated="1000"/>
+</table:table-row>
+<table:table-row table:number-rows-repeated="2">
+<table:table-cell table:number-columns-repeated="1000"/>
+</table:table-row>
+<table:table-row>
+<table:table-cell office:value-type="string">
+<text:p>Šarūnas</text:p></table:table-cell>
+<table:table-cell office:value-type="date"
+    office:date-value="2000-01-02T00:00:00">
+<text:p>2000-01-02</text:p></table:table-cell>
+</table:table-row>
+<table:table-row table:number-rows-repeated="2">
+<table:table-cell office:value-type="float" office:value="12">
+<text:p>12</text:p></table:table-cell>
+</table:table-row>
+</table:table>
+<table:table table:name="Kiti">
+<table:table-row>
+<table:table-cell office:value-type="string">
+<text:p>Vardas</text:p></table:table-cell>
+</table:table-row>
+<table:table-row>
+<table:table-cell office:value-type="string">
+<text:p>Ona</text:p></table:table-cell>
+</table:table-row>
+</table:table>
+</office:spreadsheet></office:body>
+</office:document-content>
+'''
+
+
+def ods_file(content=ODS_CONTENT, member='content.xml'):
+    """ Returns uploaded OpenDocument spreadsheet with given content.
+    """
+    output = StringIO.StringIO()
+    with zipfile.ZipFile(output, 'w') as document:
+        document.writestr(
+                'mimetype', 'application/vnd.oasis.opendocument.spreadsheet')
+        document.writestr(member, content.encode('utf-8'))
+    return SimpleUploadedFile('academics.ods', output.getvalue())
+
+
+def read(uploaded_file):
+    """ Reads the whole file to the list of ``(sheet name, rows)``.
+    """
+    return [
+            (sheet_name, list(rows))
+            for sheet_name, rows in spreadsheets.read_spreadsheet(
+                uploaded_file, u'Default')]
+
+
+class CSVTest(unittest.TestCase):
+    """ Tests of CSV reader.
+    """
+
+    def test_read(self):
+        uploaded_file = SimpleUploadedFile(
+                'academics.csv',
+                u'\ufeffVardas,Gimė\n\nŠarūnas,2000-01-02\nOna\n'.encode(
+                    'utf-8'))
+        self.assertEqual(read(uploaded_file), [(u'Default', [
+            (3, {u'Vardas': u'Šarūnas', u'Gimė': u'2000-01-02'}),
+            (4, {u'Vardas': u'Ona', u'Gimė': u''}),
+            ])])
+
+    def test_not_utf8(self):
+        uploaded_file = utils.csv_file(
+                [[u'Vardas'], [u'Šarūnas']], encoding='cp1257')
+        with self.assertRaises(ValidationError):
+            read(uploaded_file)
+
+
+class ODSTest(unittest.TestCase):
+    """ Tests of OpenDocument reader.
+    """
+
+    def test_read(self):
+        self.assertEqual(read(ods_file()), [
+            (u'Mokiniai', [
+                (4, {u'Vardas': u'Šarūnas', u'Gimė': u'2000-01-02'}),
+                (5, {u'Vardas': u'12', u'Gimė': u''}),
+                (6, {u'Vardas': u'12', u'Gimė': u''}),
+                ]),
+            (u'Kiti', [(2, {u'Vardas': u'Ona'})]),
+            ])
+
+    def test_not_zip(self):
+        with self.assertRaises(ValidationError):
+            read(SimpleUploadedFile('academics.ods', 'Vardas\nOna\n'))
+
+    def test_without_content(self):
+        with self.assertRaises(ValidationError):
+            read(ods_file(member='styles.xml'))
+
+    def test_malformed_content(self):
+        with self.assertRaises(ValidationError):
+            read(ods_file(ODS_CONTENT[:-200]))
+
+
+class XLSTest(unittest.TestCase):
+    """ Tests of Excel reader.
+    """
+
+    def test_read(self):
+        try:
+            import xlwt
+        except ImportError:
+            raise unittest.SkipTest(u'xlwt is not installed.')
+        book = xlwt.Workbook()
+        sheet = book.add_sheet(u'Mokiniai')
+        for i, values in enumerate((
+                (u'Vardas', u'Klasė'),
+                (),
+                (u'Šarūnas', 12),
+                (u'Ona', 10.5),
+                )):
+            for j, value in enumerate(values):
+                sheet.write(i, j, value)
+        output = StringIO.StringIO()
+        book.save(output)
+        self.assertEqual(
+                read(SimpleUploadedFile('academics.xls', output.getvalue())),
+                [(u'Mokiniai', [
+                    (3, {u'Vardas': u'Šarūnas', u'Klasė': u'12'}),
+                    (4, {u'Vardas': u'Ona', u'Klasė': u'10.5'}),
+                    ])])
+
+    def test_malformed(self):
+        with self.assertRaises(ValidationError):
+            read(SimpleUploadedFile('academics.xls', 'Vardas\nOna\n'))
+
+    def test_without_xlrd(self):
+        xlrd = sys.modules.get('xlrd')
+        sys.modules['xlrd'] = None
+        try:
+            with self.assertRaises(ValidationError):
+                read(SimpleUploadedFile('academics.xls', 'Vardas\nOna\n'))
+        finally:
+            if xlrd is None:
+                del sys.modules['xlrd']
+            else:
+                sys.modules['xlrd'] = xlrd
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of values computed from academics and cached.
+"""
+
+
+import datetime
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from nmadb_academics import leaving, models, statistics
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class CacheTest(test.TestCase):
+    """ Tests of invalidation and expiration of cached values.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.section = utils.create_section(u'Matematika', u'M')
+        self.academic = self.create_academic(datetime.date(2012, 9, 1))
+
+    def create_academic(self, entered):
+        """ Creates academic of the section, who entered on given date.
+        """
+        student = utils.create_student(
+                u'Jonas',
+                utils.name(u'Jonaitis', models.Academic.objects.count()))
+        return models.Academic.objects.create(
+                student=student, section=self.section, entered=entered)
+
+    def by_status(self):
+        """ Returns the number of academics of the section by status.
+        """
+        section, = statistics.get_statistics()[u'sections']
+        return dict(zip(statistics.STATUSES, section[u'by_status']))
+
+    def test_entered_range_invalidated_on_save(self):
+        self.assertEqual(
+                models.get_entered_range(),
+                (datetime.date(2012, 9, 1), datetime.date(2012, 9, 1)))
+        self.create_academic(datetime.date(2010, 9, 1))
+        self.assertEqual(
+                models.get_entered_range(),
+                (datetime.date(2010, 9, 1), datetime.date(2012, 9, 1)))
+        self.academic.delete()
+        self.assertEqual(
+                models.get_entered_range(),
+                (datetime.date(2010, 9, 1), datetime.date(2010, 9, 1)))
+
+    def test_statistics_invalidated_on_bulk_update(self):
+        self.create_academic(datetime.date(2013, 9, 1))
+        self.assertEqual(self.by_status()[statistics.STUDYING], 2)
+        leaving.mark_left(
+                models.Academic.objects.filter(id=self.academic.id),
+                datetime.date(2014, 6, 1))
+        status = self.by_status()
+        self.assertEqual(status[statistics.STUDYING], 1)
+        self.assertEqual(status[leaving.FINISHED], 1)
+
+    def test_cached_values_expire(self):
+        """ Change, which did not invalidate the cache (as if made by
+        another process), is seen after the timeout.
+        """
+        models.get_entered_range()
+        models.Academic.objects.update(entered=datetime.date(2010, 9, 1))
+        self.assertEqual(
+                models.get_entered_range()[0], datetime.date(2012, 9, 1))
+        cache.clear()
+        with override_settings(NMADB_ACADEMICS_CACHE_TIMEOUT=0):
+            models.get_entered_range()
+            statistics.get_statistics()
+            models.Academic.objects.update(
+                    entered=datetime.date(2011, 9, 1), leaving_reason=u'R')
+            self.assertEqual(
+                    models.get_entered_range()[0], datetime.date(2011, 9, 1))
+            self.assertEqual(self.by_status()[u'R'], 1)
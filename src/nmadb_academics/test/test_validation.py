@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Tests of row validation in a pool of worker processes.
+"""
+
+
+from nmadb_academics.test import utils
+
+from django import test
+from django.test.utils import override_settings
+
+from nmadb_students import models as students_models
+from nmadb_academics import validation
+
+
+def setUpModule():      # pylint: disable=C0103
+    """ Creates test database.
+    """
+    utils.setup_databases()
+
+
+def tearDownModule():   # pylint: disable=C0103
+    """ Destroys test database.
+    """
+    utils.teardown_databases()
+
+
+class RowValidatorTest(test.TestCase):
+    """ Tests of :class:`nmadb_academics.validation.RowValidator`.
+    """
+
+    @override_settings(NMADB_ACADEMICS_IMPORT_WORKERS=4)
+    def test_inline_by_default(self):
+        validator = validation.RowValidator()
+        try:
+            self.assertEqual(validator.workers, 1)
+            self.assertEqual(validation.get_workers(), 4)
+        finally:
+            validator.close()
+
+
+class IterCleanedRowsTest(test.TestCase):
+    """ Tests of :func:`nmadb_academics.validation.iter_cleaned_rows`.
+    """
+
+    def setUp(self):
+        school = utils.create(
+                students_models.School, title=u'Vilniaus licėjus')
+        section = utils.create_section(u'Matematika', u'M')
+        self.spreadsheet = utils.academics_csv_file([
+            utils.academic_import_row(
+                school, section,
+                last_name=u'Jonaitis',
+                school_class=u'5' if i % 7 == 3 else u'10',
+                first_name=utils.name(u'Jonas', i))
+            for i in range(50)])
+
+    def clean(self, workers):
+        """ Returns ``(line, first name, is valid)`` tuples.
+        """
+        self.spreadsheet.seek(0)
+        return [
+                (line, row[u'First name'], error is None)
+                for _sheet_name, line, row, _cleaned, error in
+                validation.iter_cleaned_rows(
+                    self.spreadsheet, workers=workers, chunk_size=8)]
+
+    def test_pool_keeps_order(self):
+        results = self.clean(1)
+        self.assertEqual(
+                [line for line, _first_name, _valid in results],
+                list(range(2, 52)))
+        self.assertEqual(
+                [line for line, _first_name, valid in results
+                 if not valid],
+                [i + 2 for i in range(50) if i % 7 == 3])
+        self.assertEqual(self.clean(3), results)
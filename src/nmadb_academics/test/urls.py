@@ -0,0 +1,12 @@
+#!/usr/bin/python
+
+
+from django.conf.urls import patterns, include, url
+from django.contrib import admin
+
+
+urlpatterns = patterns(
+    '',
+    url(r'^admin/', include(admin.site.urls)),
+    url(r'^', include('nmadb_academics.urls')),
+    )
@@ -0,0 +1,167 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Test database setup and fixtures shared by unit tests and
+benchmarks.
+"""
+
+
+import csv
+import datetime
+import os
+import StringIO
+
+os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE', 'nmadb_academics.test.settings')
+
+import django
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import models as django_models
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+        setup_test_environment, teardown_test_environment)
+
+from nmadb_students import models as students_models
+from nmadb_academics import forms, models
+
+
+_DATABASES = []
+
+
+def setup_databases():
+    """ Creates test database. Called from ``setUpModule``.
+    """
+    setup_test_environment()
+    _DATABASES.append(DiscoverRunner(verbosity=0).setup_databases())
+
+
+def teardown_databases():
+    """ Destroys test database. Called from ``tearDownModule``.
+    """
+    DiscoverRunner(verbosity=0).teardown_databases(_DATABASES.pop())
+    teardown_test_environment()
+
+
+_COUNTER = [0]
+
+
+def create(model, **values):
+    """ Creates object filling required fields, which were not given,
+    with generated values.
+    """
+    for field in model._meta.fields:
+        if (field.name in values or field.attname in values or
+                field.null or field.blank or field.has_default() or
+                getattr(field.rel, 'parent_link', False) or
+                isinstance(field, django_models.AutoField) or
+                getattr(field, 'auto_now', False) or
+                getattr(field, 'auto_now_add', False)):
+            continue
+        _COUNTER[0] += 1
+        if field.rel:
+            values[field.name] = create(field.rel.to)
+        elif field.choices:
+            values[field.name] = field.choices[0][0]
+        elif isinstance(field, django_models.DateTimeField):
+            values[field.name] = datetime.datetime.now()
+        elif isinstance(field, django_models.DateField):
+            values[field.name] = datetime.date.today()
+        elif isinstance(field, (
+                django_models.IntegerField, django_models.FloatField,
+                django_models.DecimalField)):
+            values[field.name] = _COUNTER[0]
+        elif isinstance(field, django_models.BooleanField):
+            values[field.name] = False
+        elif isinstance(field, django_models.EmailField):
+            values[field.name] = u'{0}@example.com'.format(_COUNTER[0])
+        else:
+            value = u'{0}{1}'.format(field.name, _COUNTER[0])
+            values[field.name] = value[-(field.max_length or 32):]
+    return model.objects.create(**values)
+
+
+def name(prefix, i):
+    """ Generates name, which consists only of letters.
+    """
+    letters = []
+    while True:
+        i, rest = divmod(i, 26)
+        letters.append(u'abcdefghijklmnopqrstuvwxyz'[rest])
+        if not i:
+            break
+    return prefix + u''.join(letters)
+
+
+def create_section(title, abbreviation, **values):
+    """ Creates section established in 2000.
+    """
+    values.setdefault(u'established', datetime.date(2000, 1, 1))
+    return models.Section.objects.create(
+            title=title, abbreviation=abbreviation, **values)
+
+
+def create_student(
+        first_name, last_name, school=None,
+        entered=datetime.date(2010, 9, 1), **values):
+    """ Creates student, who studies in the school since ``entered``.
+    """
+    student = create(
+            students_models.Student,
+            first_name=first_name,
+            last_name=last_name,
+            birth_date=datetime.date(1998, 1, 1),
+            **values)
+    if school is not None:
+        student.change_school(school, entered)
+    return student
+
+
+def csv_file(rows, file_name='academics.csv', encoding='utf-8'):
+    """ Returns uploaded CSV file of given rows (lists of values).
+    """
+    output = StringIO.StringIO()
+    writer = csv.writer(output)
+    for row in rows:
+        writer.writerow([unicode(value).encode(encoding) for value in row])
+    return SimpleUploadedFile(file_name, output.getvalue())
+
+
+def academic_import_row(school, section, **values):
+    """ Returns valid academics import row, which maps column captions
+    to values. Values are given by column names.
+    """
+    row = {
+            u'first_name': u'Jonas',
+            u'last_name': u'Jonaitis',
+            u'gender': unicode(
+                students_models.Student.GENDER_CHOICES[0][1]),
+            u'birth_date': u'2000-01-01',
+            u'school_class': u'10',
+            u'school_year': u'2014',
+            u'school': school.title,
+            u'social_disadvantage_mark': u'No',
+            u'section': section.title,
+            u'entered': u'2014-09-01',
+            u'email': u'jonas@example.com',
+            u'main_address': u'Gedimino pr. 1',
+            u'town': u'Vilnius',
+            }
+    row.update(values)
+    captions = dict(forms.IMPORT_ACADEMICS_REQUIRED_COLUMNS)
+    captions.update(forms.IMPORT_ACADEMICS_OPTIONAL_COLUMNS)
+    return dict(
+            (unicode(captions[column]), value)
+            for column, value in row.items())
+
+
+def academics_csv_file(rows, file_name='academics.csv'):
+    """ Returns uploaded CSV file of :func:`academic_import_row` rows.
+    """
+    captions = sorted(rows[0])
+    return csv_file(
+            [captions] + [[row[caption] for caption in captions]
+                          for row in rows],
+            file_name)
@@ -5,4 +5,16 @@ urlpatterns = patterns(
     'nmadb_academics.views',
     url(r'^admin/import/$', 'import_academics',
         name='nmadb-academics-import-academic',),
+    url(r'^admin/import/stream/$', 'stream_import_academics',
+        name='nmadb-academics-stream-import-academic',),
+    url(r'^admin/import/validate/$', 'validate_academics',
+        name='nmadb-academics-validate-academic',),
+    url(r'^admin/import/achievements/$', 'import_achievements',
+        name='nmadb-academics-import-achievement',),
+    url(r'^admin/import/job/(?P<job_id>\d+)/$', 'import_job',
+        name='nmadb-academics-import-job',),
+    url(r'^admin/statistics/$', 'academic_statistics',
+        name='nmadb-academics-statistics',),
+    url(r'^admin/analytics/$', 'academic_analytics',
+        name='nmadb-academics-analytics',),
     )
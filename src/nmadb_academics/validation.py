@@ -0,0 +1,143 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+""" Validation of imported spreadsheet rows, optionally in a pool of
+worker processes.
+
+Once lookups are loaded, row validation does not touch database, so
+rows can be cleaned in processes forked with a copy of the lookups.
+Rows are sent to workers in chunks and results are returned in the
+original order, therefore errors keep their line numbers.
+
+Worker processes are forked only by ``run_import_jobs`` (see
+:func:`nmadb_academics.jobs.run_job`); web requests validate rows in
+the serving process.
+"""
+
+
+import multiprocessing
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from nmadb_academics import forms, spreadsheets
+
+
+CHUNK_SIZE = 500
+
+
+def get_workers():
+    """ Returns the number of validation processes of background import
+    jobs configured by ``NMADB_ACADEMICS_IMPORT_WORKERS`` setting (1
+    means validating in the calling process).
+    """
+    return getattr(settings, 'NMADB_ACADEMICS_IMPORT_WORKERS', 1)
+
+
+_worker_lookups = []
+
+
+def _init_worker(lookups):
+    """ Stores lookups inherited by the worker process.
+    """
+    _worker_lookups.append(lookups)
+
+
+def _clean_row(row):
+    """ Cleans row in worker process. Returns ``(cleaned row, None)`` or
+    ``(None, error messages)``, because errors are sent back pickled.
+    """
+    try:
+        return forms.academic_import_clean_row(row, _worker_lookups[0]), None
+    except ValidationError as e:
+        return None, e.messages
+
+
+class RowValidator(object):
+    """ Cleans chunks of ``(sheet name, line, row)`` tuples in a pool of
+    ``workers`` processes, or in the calling process by default.
+    """
+
+    def __init__(self, lookups=None, workers=None):
+        if lookups is None:
+            lookups = forms.AcademicImportLookups()
+        if workers is None:
+            workers = 1
+        self.lookups = lookups
+        self.workers = workers
+        self._pool = None
+        if workers > 1:
+            # Loaded before forking, so that workers do not query
+            # database.
+            lookups.load()
+            self._pool = multiprocessing.Pool(
+                    workers, _init_worker, (lookups,))
+
+    def clean(self, chunk):
+        """ Returns the list of ``(sheet name, line, row, cleaned row,
+        error)`` tuples in the chunk order. Either cleaned row or
+        error is None.
+        """
+        if self._pool is None:
+            results = []
+            for sheet_name, line, row in chunk:
+                try:
+                    results.append((
+                        sheet_name, line, row,
+                        forms.academic_import_clean_row(row, self.lookups),
+                        None))
+                except ValidationError as e:
+                    results.append((sheet_name, line, row, None, e))
+            return results
+        cleaned = self._pool.map(
+                _clean_row,
+                [row for _sheet_name, _line, row in chunk],
+                max(len(chunk) // (self.workers * 4), 1))
+        return [
+                (sheet_name, line, row, new_row,
+                 ValidationError(messages) if messages else None)
+                for (sheet_name, line, row), (new_row, messages)
+                in zip(chunk, cleaned)]
+
+    def close(self):
+        """ Stops worker processes.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+def iter_cleaned_rows(
+        uploaded_file, lookups=None, workers=None, chunk_size=CHUNK_SIZE):
+    """ Reads uploaded spreadsheet and yields ``(sheet name, line, row,
+    cleaned row, error)`` tuples in the file order.
+
+    Sheet captions are checked with its first row: if columns are
+    missing, a single error is yielded for the whole sheet.
+    """
+    validator = RowValidator(lookups, workers)
+    try:
+        chunk = []
+        for sheet_name, rows in spreadsheets.read_spreadsheet(
+                uploaded_file, forms.IMPORT_ACADEMICS_SHEET_NAME):
+            for i, (line, row) in enumerate(rows):
+                if i == 0:
+                    try:
+                        validator.lookups.get_converter(row.keys())
+                    except ValidationError as e:
+                        for result in validator.clean(chunk):
+                            yield result
+                        chunk = []
+                        yield sheet_name, line, row, None, e
+                        break
+                chunk.append((sheet_name, line, row))
+                if len(chunk) >= chunk_size:
+                    for result in validator.clean(chunk):
+                        yield result
+                    chunk = []
+        for result in validator.clean(chunk):
+            yield result
+    finally:
+        validator.close()
@@ -1,14 +1,18 @@
 from django.contrib import admin
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.core import urlresolvers
 from django.utils.translation import ugettext as _
-from django import shortcuts
+from django import http, shortcuts
 from django.contrib import messages
 from annoying.decorators import render_to
 
-from nmadb_academics import forms, models
-from nmadb_students import models as students
-from nmadb_contacts import models as contacts
+from nmadb_academics import (
+        analytics, exporting, forms, importer, jobs, models, rankings,
+        statistics)
+
+
+IMPORT_JOB_REFRESH_INTERVAL = 3
 
 
 @admin.site.admin_view
@@ -19,64 +23,206 @@ def import_academics(request):
     """
     if request.method == 'POST':
         form = forms.ImportAcademicsForm(request.POST, request.FILES)
-        if form.is_valid():
-            counter = 0
+        if form.is_valid() and form.cleaned_data['background']:
+            return enqueue_import(form)
+        elif form.is_valid():
+            academics = importer.AcademicImporter()
             for sheet in form.cleaned_data['spreadsheet']:
                 for row in sheet:
-                    student = students.Student()
-                    student.first_name = row[u'first_name']
-                    student.last_name = row[u'last_name']
-                    student.gender = row[u'gender']
-                    student.birth_date = row[u'birth_date']
-                    student.school_class = row[u'school_class']
-                    student.school_year = row[u'school_year']
-                    student.save()
-                    student.change_school(row[u'school'], row[u'entered'])
-                    if row[u'social_disadvantage_mark']:
-                        mark = students.SocialDisadvantageMark()
-                        mark.student = student
-                        mark.start = row[u'entered']
-                        mark.end = None
-                        mark.save()
-                    academic = models.Academic()
-                    academic.student = student
-                    academic.section = row[u'section']
-                    academic.entered = row[u'entered']
-                    academic.left = None
-                    academic.leaving_reason = None
-                    academic.comment = None
-                    academic.save()
-                    email = contacts.Email()
-                    email.human = student
-                    email.address = row[u'email']
-                    email.save()
-                    address = contacts.Address()
-                    address.human = student
-                    address.town = row[u'town']
-                    address.address = row[u'main_address']
-                    address.municipality = row[u'municipality_code']
-                    address.save()
-                    student.main_address = address
-                    student.save()
-                    if row[u'phone']:
-                        phone = contacts.Phone()
-                        phone.number = row[u'phone']
-                        print phone.number, student
-                        phone.human = student
-                        phone.save()
-                    counter += 1
+                    academics.add(row)
+            academics.flush()
+            counter = academics.counter
             msg = _(u'{0} academics successfully imported.').format(counter)
             messages.success(request, msg)
             return shortcuts.redirect(
                     'admin:nmadb_students_student_changelist')
     else:
         form = forms.ImportAcademicsForm()
-    return {
+    return admin_context(form=form)
+
+
+@admin.site.admin_view
+@render_to('admin/file-form.html')
+def stream_import_academics(request):
+    """ Imports academics from large file to NMADB row by row.
+    """
+    if request.method == 'POST':
+        form = forms.StreamImportAcademicsForm(request.POST, request.FILES)
+        if form.is_valid() and form.cleaned_data['background']:
+            return enqueue_import(form)
+        elif form.is_valid() and form.cleaned_data['commit_batches']:
+            partial = importer.PartialImport(
+                    check_duplicates=form.cleaned_data['check_duplicates'],
+                    batch_size=form.cleaned_data['batch_size'])
+            try:
+                partial.run(form.cleaned_data['spreadsheet'])
+            except ValidationError as e:
+                form.add_error(None, e)
+                if partial.batches:
+                    messages.warning(request, _(
+                        u'{0.batches} batches ({0.imported} academics) '
+                        u'were imported before the error. Uploading the '
+                        u'same file again skips them; remove them from '
+                        u'the file, if you change it.').format(partial))
+            else:
+                msg = _(
+                        u'{0.imported} academics successfully imported, '
+                        u'{0.skipped} already imported batches '
+                        u'skipped.').format(partial)
+                messages.success(request, msg)
+                return shortcuts.redirect(
+                        'admin:nmadb_students_student_changelist')
+        elif form.is_valid():
+            try:
+                with transaction.atomic():
+                    counter = importer.import_spreadsheet(
+                            form.cleaned_data['spreadsheet'],
+                            check_duplicates=form.cleaned_data[
+                                'check_duplicates'],
+                            batch_size=form.cleaned_data['batch_size'])
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                msg = _(u'{0} academics successfully imported.').format(
+                        counter)
+                messages.success(request, msg)
+                return shortcuts.redirect(
+                        'admin:nmadb_students_student_changelist')
+    else:
+        form = forms.StreamImportAcademicsForm()
+    return admin_context(form=form)
+
+
+@admin.site.admin_view
+@render_to('admin/file-form.html')
+def validate_academics(request):
+    """ Checks academics file without importing it. Returns the report
+    of all found errors, if there are any.
+    """
+    if request.method == 'POST':
+        form = forms.ValidateAcademicsForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = importer.validate_spreadsheet(
+                        form.cleaned_data['spreadsheet'],
+                        check_duplicates=form.cleaned_data[
+                            'check_duplicates'])
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                if not report.is_valid():
+                    return validation_report_response(report)
+                msg = _(u'All {0} rows are valid.').format(report.rows)
+                messages.success(request, msg)
+    else:
+        form = forms.ValidateAcademicsForm()
+    return admin_context(form=form)
+
+
+@admin.site.admin_view
+@render_to('admin/file-form.html')
+@transaction.atomic
+def import_achievements(request):
+    """ Imports achievements to NMADB. Returns the report of all found
+    errors, if there are any.
+    """
+    if request.method == 'POST':
+        form = forms.ImportAchievementsForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report, counter = importer.import_achievements(
+                        form.cleaned_data['spreadsheet'])
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                if not report.is_valid():
+                    return validation_report_response(
+                            report, 'achievements-errors.csv')
+                msg = _(
+                        u'{0} achievements successfully imported.').format(
+                            counter)
+                messages.success(request, msg)
+                return shortcuts.redirect(
+                        'admin:nmadb_academics_achievement_changelist')
+    else:
+        form = forms.ImportAchievementsForm()
+    return admin_context(form=form)
+
+
+def validation_report_response(report, filename='academics-errors.csv'):
+    """ Returns CSV file of validation report errors.
+    """
+    response = http.HttpResponse(
+            ''.join(exporting.iter_csv(
+                importer.VALIDATION_REPORT_CAPTIONS,
+                report.errors(),
+                None)),
+            content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = (
+            'attachment; filename="{0}"'.format(filename))
+    return response
+
+
+def enqueue_import(form):
+    """ Creates background job for validated import form and redirects
+    to its page.
+    """
+    job = jobs.enqueue(
+            form.cleaned_data['spreadsheet'],
+            check_duplicates=form.cleaned_data['check_duplicates'],
+            batch_size=form.cleaned_data.get(
+                'batch_size', importer.BATCH_SIZE))
+    return shortcuts.redirect('nmadb-academics-import-job', job.id)
+
+
+@admin.site.admin_view
+@render_to('admin/nmadb_academics/import_job.html')
+def import_job(request, job_id):
+    """ Shows import job progress. The page reloads itself until the
+    job is finished.
+    """
+    job = shortcuts.get_object_or_404(models.ImportJob, id=job_id)
+    return admin_context(
+            job=job,
+            refresh_interval=IMPORT_JOB_REFRESH_INTERVAL,
+            )
+
+
+@admin.site.admin_view
+@render_to('admin/nmadb_academics/statistics.html')
+def academic_statistics(request):
+    """ Shows section and cohort statistics and achievement leaders.
+    """
+    return admin_context(
+            statistics=statistics.get_statistics(),
+            leaders=[
+                (_(u'Top students'), rankings.top(rankings.STUDENT)),
+                (_(u'Top sections'), rankings.top(rankings.SECTION)),
+                (_(u'Top schools'), rankings.top(rankings.SCHOOL)),
+                ],
+            )
+
+
+@admin.site.admin_view
+@render_to('admin/nmadb_academics/analytics.html')
+def academic_analytics(request):
+    """ Shows retention, section transitions and survival of academics.
+    """
+    if not analytics.is_available():
+        messages.error(request, _(u'NumPy is required for analytics.'))
+        return admin_context(report=None)
+    return admin_context(report=analytics.report())
+
+
+def admin_context(**kwargs):
+    """ Returns context for rendering page in admin.
+    """
+    context = {
             'admin_index_url': urlresolvers.reverse('admin:index'),
             'app_url': urlresolvers.reverse(
                 'admin:app_list',
                 kwargs={'app_label': 'nmadb_academics'}),
             'app_label': _(u'NMADB Academics'),
-            'form': form,
             }
-
+    context.update(kwargs)
+    return context